@@ -21,9 +21,11 @@ from fastapi.param_functions import Header
 from fastapi.requests import Request
 from fastapi.responses import HTMLResponse
 
+import app.metrics
 import app.packets
 import app.settings
 import app.state
+import app.usecases.login
 import app.usecases.performance
 import app.utils
 from app import commands
@@ -61,11 +63,8 @@ from app.packets import BasePacket
 from app.packets import ClientPackets
 from app.packets import ReplayAction
 from app.repositories import players as players_repo
-from app.state import services
 from app.usecases.performance import ScoreParams
 
-OSU_API_V2_CHANGELOG_URL = "https://osu.ppy.sh/api/v2/changelog"
-
 BEATMAPS_PATH = Path.cwd() / ".data/osu"
 
 BASE_DOMAIN = app.settings.DOMAIN
@@ -122,6 +121,10 @@ async def bancho_handler(
     # get the player from the specified osu token.
     player = app.state.sessions.players.get(token=osu_token)
 
+    if not player:
+        # we may have restarted with their session snapshotted.
+        player = await app.state.sessions.restore_session(osu_token)
+
     if not player:
         # chances are, we just restarted the server
         # tell their client to reconnect immediately.
@@ -143,13 +146,27 @@ async def bancho_handler(
     # allowing logic to be implemented around the actual handler.
     # NOTE: any unhandled packets will be ignored internally.
 
-    with memoryview(await request.body()) as body_view:
-        for packet in BanchoPacketReader(body_view, packet_map):
+    body = await request.body()
+
+    with memoryview(body) as body_view:
+        reader = BanchoPacketReader(body_view, packet_map)
+
+        for packet in reader:
+            start_time = time.perf_counter_ns()
             await packet.handle(player)
+            app.metrics.observe(
+                "packet_latency",
+                time.perf_counter_ns() - start_time,
+                packet=reader.current_type.name,
+            )
 
     player.last_recv_time = time.time()
 
     response_data = player.dequeue()
+
+    app.metrics.increment("poll_bytes_in", len(body))
+    app.metrics.increment("poll_bytes_out", len(response_data or b""))
+
     return Response(content=response_data)
 
 
@@ -226,6 +243,7 @@ class ChangeAction(BasePacket):
 
         # broadcast it to all online players.
         if not player.restricted:
+            app.state.sessions.players.update_presence(player)
             app.state.sessions.players.enqueue(app.packets.user_stats(player))
 
 
@@ -255,14 +273,12 @@ class SendMessage(BasePacket):
         elif recipient == "#spectator":
             if player.spectating:
                 # we are spectating someone
-                spec_id = player.spectating.id
+                t_chan = player.spectating.spectator_chat
             elif player.spectators:
                 # we are being spectated
-                spec_id = player.id
+                t_chan = player.spectator_chat
             else:
                 return
-
-            t_chan = app.state.sessions.channels[f"#spec_{spec_id}"]
         elif recipient == "#multiplayer":
             if not player.match:
                 # they're not in a match?
@@ -514,37 +530,11 @@ async def login(
         stream=OsuStream(match["stream"] or "stable"),
     )
 
-    if app.settings.DISALLOW_OLD_CLIENTS:
-        osu_client_stream = osu_version.stream.value
-        if osu_client_stream in ("stable", "beta"):
-            osu_client_stream += "40"  # TODO: why?
-
-        allowed_client_versions = set()
-
-        async with services.http_client.get(
-            OSU_API_V2_CHANGELOG_URL,
-            params={"stream": osu_client_stream},
-        ) as resp:
-            for build in (await resp.json())["builds"]:
-                version = date(
-                    int(build["version"][0:4]),
-                    int(build["version"][4:6]),
-                    int(build["version"][6:8]),
-                )
-                allowed_client_versions.add(version)
-
-                if any(entry["major"] for entry in build["changelog_entries"]):
-                    # this build is a major iteration to the client
-                    # don't allow anything older than this
-                    break
-
-        if osu_version.date not in allowed_client_versions:
-            return {
-                "osu_token": "client-too-old",
-                "response_body": (
-                    app.packets.version_update() + app.packets.user_id(-2)
-                ),
-            }
+    if not await app.usecases.login.is_client_version_allowed(osu_version):
+        return {
+            "osu_token": "client-too-old",
+            "response_body": (app.packets.version_update() + app.packets.user_id(-2)),
+        }
 
     running_under_wine = login_data["adapters_str"] == "runningunderwine"
     adapters = [a for a in login_data["adapters_str"][:-1].split(".")]
@@ -670,51 +660,33 @@ async def login(
         },
     )
 
-    # TODO: store adapters individually
-
-    if running_under_wine:
-        hw_checks = "h.uninstall_id = :uninstall"
-        hw_args = {"uninstall": login_data["uninstall_md5"]}
-    else:
-        hw_checks = "h.adapters = :adapters OR h.uninstall_id = :uninstall OR h.disk_serial = :disk_serial"
-        hw_args = {
-            "adapters": login_data["adapters_md5"],
-            "uninstall": login_data["uninstall_md5"],
-            "disk_serial": login_data["disk_signature_md5"],
-        }
-
-    hw_matches = await db_conn.fetch_all(
-        "SELECT u.name, u.priv, h.occurrences "
-        "FROM client_hashes h "
-        "INNER JOIN users u ON h.userid = u.id "
-        "WHERE h.userid != :user_id AND "
-        f"({hw_checks})",
-        {"user_id": user_info["id"], **hw_args},
+    client_details = ClientDetails(
+        osu_version=osu_version,
+        osu_path_md5=login_data["osu_path_md5"],
+        adapters_md5=login_data["adapters_md5"],
+        uninstall_md5=login_data["uninstall_md5"],
+        disk_signature_md5=login_data["disk_signature_md5"],
+        adapters=adapters,
+        running_under_wine=running_under_wine,
+        ip=ip,
     )
 
-    if hw_matches:
-        # we have other accounts with matching hashes
-        if user_info["priv"] & Privileges.VERIFIED:
-            # TODO: this is a normal, registered & verified player.
-            ...
-        else:
-            # this player is not verified yet, this is their first
-            # time connecting in-game and submitting their hwid set.
-            # we will not allow any banned matches; if there are any,
-            # then ask the user to contact staff and resolve manually.
-            if not all(
-                [hw_match["priv"] & Privileges.UNRESTRICTED for hw_match in hw_matches],
-            ):
-                return {
-                    "osu_token": "contact-staff",
-                    "response_body": (
-                        app.packets.notification(
-                            "Your account got flagged by anticheat, it is not restricted. "
-                            "Please create ticket on discord to solve this.",
-                        )
-                        + app.packets.user_id(-1)
-                    ),
-                }
+    if await app.usecases.login.has_restricted_hardware_matches(
+        user_info["id"],
+        user_info["priv"],
+        client_details,
+        db_conn,
+    ):
+        return {
+            "osu_token": "contact-staff",
+            "response_body": (
+                app.packets.notification(
+                    "Your account got flagged by anticheat, it is not restricted. "
+                    "Please create ticket on discord to solve this.",
+                )
+                + app.packets.user_id(-1)
+            ),
+        }
 
     """ All checks passed, player is safe to login """
 
@@ -765,15 +737,12 @@ async def login(
                 },
             )
 
-    client_details = ClientDetails(
-        osu_version=osu_version,
-        osu_path_md5=login_data["osu_path_md5"],
-        adapters_md5=login_data["adapters_md5"],
-        uninstall_md5=login_data["uninstall_md5"],
-        disk_signature_md5=login_data["disk_signature_md5"],
-        adapters=adapters,
-        ip=ip,
-    )
+    if app.settings.MULTI_WORKER and osu_version.stream != "tourney":
+        # the player may still be online through another
+        # worker; let this session overrule the existing one.
+        worker_id = await app.state.bus.fetch_session_worker(user_info["id"])
+        if worker_id is not None and worker_id != app.settings.WORKER_ID:
+            app.state.bus.logout(user_info["id"])
 
     player = Player(
         **user_info,  # {id, name, priv, pw_bcrypt, silence_end, api_key, geoloc?}
@@ -812,19 +781,15 @@ async def login(
         ):
             continue
 
-        # send chan info to all players who can see
-        # the channel (to update their playercounts)
-        chan_info_packet = app.packets.channel_info(
+        data += app.packets.channel_info(
             channel._name,
             channel.topic,
             len(channel.players),
         )
 
-        data += chan_info_packet
-
-        for o in app.state.sessions.players:
-            if channel.can_read(o.priv):
-                o.enqueue(chan_info_packet)
+        # update the playercounts of all players who can see
+        # the channel; these are batched & sent periodically.
+        app.state.sessions.channels.mark_info_outdated(channel)
 
     # tells osu! to reorder channels based on config.
     data += app.packets.channel_info_end()
@@ -849,22 +814,14 @@ async def login(
 
     data += user_data
 
+    # enqueue all unrestricted players to us; this is
+    # maintained as a single prebuilt buffer for logins.
+    data += app.state.sessions.players.presence_snapshot
+
     if not player.restricted:
-        # player is unrestricted, two way data
-        for o in app.state.sessions.players:
-            # enqueue us to them
-            o.enqueue(user_data)
-
-            # enqueue them to us.
-            if not o.restricted:
-                if o is app.state.sessions.bot:
-                    # optimization for bot since it's
-                    # the most frequently requested user
-                    data += app.packets.bot_presence(o)
-                    data += app.packets.bot_stats(o)
-                else:
-                    data += app.packets.user_presence(o)
-                    data += app.packets.user_stats(o)
+        # player is unrestricted, two way data;
+        # enqueue us to all other players too.
+        app.state.sessions.players.enqueue(user_data)
 
         # the player may have been sent mail while offline,
         # enqueue any messages from their respective authors.
@@ -923,17 +880,6 @@ async def login(
 
     else:
         # player is restricted, one way data
-        for o in app.state.sessions.players.unrestricted:
-            # enqueue them to us.
-            if o is app.state.sessions.bot:
-                # optimization for bot since it's
-                # the most frequently requested user
-                data += app.packets.bot_presence(o)
-                data += app.packets.bot_stats(o)
-            else:
-                data += app.packets.user_presence(o)
-                data += app.packets.user_stats(o)
-
         data += app.packets.account_restricted()
         data += app.packets.send_message(
             sender=app.state.sessions.bot.name,
@@ -1136,6 +1082,21 @@ class SendPrivateMessage(BasePacket):
             # target is not bot, send the message normally if online
             if target.online:
                 target.send(msg, sender=player)
+            elif (
+                app.settings.MULTI_WORKER
+                and await app.state.bus.fetch_session_worker(target.id) is not None
+            ):
+                # target is online through another worker
+                app.state.bus.send_to_player(
+                    target.id,
+                    app.packets.send_message(
+                        sender=player.name,
+                        msg=msg,
+                        recipient=target.name,
+                        sender_id=player.id,
+                    ),
+                    sender_id=player.id,
+                )
             else:
                 # inform user they're offline, but
                 # will receive the mail @ next login.
@@ -1641,16 +1602,9 @@ class MatchScoreUpdate(BasePacket):
         if player.match is None:
             return
 
-        slot_id = player.match.get_slot_id(player)
-        assert slot_id is not None
-
-        # if scorev2 is enabled, read an extra 8 bytes.
-        buf = bytearray(b"0\x00\x00")
-        buf += len(self.play_data).to_bytes(4, "little")
-        buf += self.play_data
-        buf[11] = slot_id
-
-        player.match.enqueue(bytes(buf), lobby=False)
+        # the frame is relayed as-is (scorev2 frames' extra
+        # fields included), with only its slot id rewritten.
+        player.match.enqueue_score_update(player, self.play_data)
 
 
 @register(ClientPackets.MATCH_COMPLETE)
@@ -1685,6 +1639,10 @@ class MatchComplete(BasePacket):
         player.match.unready_players(expected=SlotStatus.complete)
 
         player.match.in_progress = False
+
+        # make sure the final score frames arrive before completion
+        player.match.flush_score_updates()
+
         player.match.enqueue(
             app.packets.match_complete(),
             lobby=False,
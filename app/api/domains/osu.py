@@ -47,6 +47,8 @@ from starlette.datastructures import UploadFile as StarletteUploadFile
 import app.packets
 import app.settings
 import app.state
+import app.usecases.direct
+import app.usecases.replays
 import app.utils
 from app.constants import regexes
 from app.constants.clientflags import LastFMFlags
@@ -66,6 +68,7 @@ from app.objects.score import Score
 from app.objects.score import SubmissionStatus
 from app.repositories import maps as maps_repo
 from app.repositories import players as players_repo
+from app.repositories import ratings as ratings_repo
 from app.repositories import scores as scores_repo
 from app.repositories import stats as stats_repo
 from app.utils import escape_enum
@@ -76,7 +79,6 @@ from datetime import datetime
 
 
 BEATMAPS_PATH = SystemPath.cwd() / ".data/osu"
-REPLAYS_PATH = SystemPath.cwd() / ".data/osr"
 SCREENSHOTS_PATH = SystemPath.cwd() / ".data/ss"
 
 
@@ -437,27 +439,6 @@ async def lastFM(
     """
 
 
-# bancho.py supports cheesegull mirrors, chimu.moe and nasuya.xyz.
-# chimu.moe and nasuya.xyz handle things a bit differently than cheesegull,
-# and has some extra features we'll eventually use more of.
-USING_CHIMU = "chimu.moe" in app.settings.MIRROR_URL
-USING_NASUYA = "nasuya.xyz" in app.settings.MIRROR_URL
-
-DIRECT_SET_ID_SPELLING = "SetId" if USING_CHIMU else "SetID"
-
-DIRECT_SET_INFO_FMTSTR = (
-    "{{{setid_spelling}}}.osz|{{Artist}}|{{Title}}|{{Creator}}|"
-    "{{RankedStatus}}|10.0|{{LastUpdate}}|{{{setid_spelling}}}|"
-    "0|{{HasVideo}}|0|0|0|{{diffs}}"  # 0s are threadid, has_story,
-    # filesize, filesize_novid.
-).format(setid_spelling="SetID")
-
-DIRECT_MAP_INFO_FMTSTR = (
-    "[{DifficultyRating:.2f}⭐] {DiffName} "
-    "{{cs: {CS} / od: {OD} / ar: {AR} / hp: {HP}}}@{Mode}"
-)
-
-
 @router.get("/web/osu-search.php")
 async def osuSearchHandler(
     player: Player = Depends(authenticate_player_session(Query, "u", "h")),
@@ -466,82 +447,7 @@ async def osuSearchHandler(
     mode: int = Query(..., alias="m", ge=-1, le=3),  # -1 for all
     page_num: int = Query(..., alias="p"),
 ):
-
-    search_url = f"{app.settings.MIRROR_URL}/api/search"
-    print(search_url)
-    params: dict[str, object] = {"amount": 100, "offset": page_num * 100}
-
-    # eventually we could try supporting these,
-    # but it mostly depends on the mirror.
-    if query not in ("Newest", "Top+Rated", "Most+Played"):
-        params["query"] = query
-
-    if mode != -1:  # -1 for all
-        params["mode"] = mode
-
-    if ranked_status != 4:  # 4 for all
-        # convert to osu!api status
-        params["status"] = RankedStatus.from_osudirect(ranked_status).osu_api
-
-    async with app.state.services.http_client.get(search_url, params=params) as resp:
-        if resp.status != status.HTTP_200_OK:
-            return b"-1\nFailed to retrieve data from the beatmap mirror."
-
-        result = await resp.json()
-
-    lresult = len(result)  # send over 100 if we receive
-    # 100 matches, so the client
-    # knows there are more to get
-    ret = [f"{'101' if lresult == 100 else lresult}"]
-
-    for bmap in result:
-        if bmap["ChildrenBeatmaps"] is None:
-            continue
-
-        # cheesegull doesn't support vids
-        bmap["HasVideo"] = "0"
-
-        diff_sorted_maps = sorted(
-            bmap["ChildrenBeatmaps"],
-            key=lambda m: m["DifficultyRating"],
-        )
-
-        def handle_invalid_characters(s: str) -> str:
-            # XXX: this is a bug that exists on official servers (lmao)
-            # | is used to delimit the set data, so the difficulty name
-            # cannot contain this or it will be ignored. we fix it here
-            # by using a different character.
-            return s.replace("|", "I")
-
-        diffs_str = ",".join(
-            [
-                DIRECT_MAP_INFO_FMTSTR.format(
-                    DifficultyRating=row["DifficultyRating"],
-                    DiffName=handle_invalid_characters(row["DiffName"]),
-                    CS=row["CS"],
-                    OD=row["OD"],
-                    AR=row["AR"],
-                    HP=row["HP"],
-                    Mode=row["Mode"],
-                )
-                for row in diff_sorted_maps
-            ],
-        )
-
-        ret.append(
-            DIRECT_SET_INFO_FMTSTR.format(
-                Artist=handle_invalid_characters(bmap["Artist"]),
-                Title=handle_invalid_characters(bmap["Title"]),
-                Creator=bmap["Creator"],
-                RankedStatus=bmap["RankedStatus"],
-                LastUpdate=bmap["LastUpdate"],
-                HasVideo=bmap["HasVideo"],
-                diffs=diffs_str,
-                **{DIRECT_SET_ID_SPELLING: bmap[DIRECT_SET_ID_SPELLING]},
-            ),
-        )
-
-    return "\n".join(ret).encode()
+    return await app.usecases.direct.search(query, mode, ranked_status, page_num)
 
 
 # TODO: video support (needs db change)
@@ -564,13 +470,29 @@ async def osuSearchSetHandler(
     else:
         return  # invalid args
 
-    # Get all set data.
-    bmapset = await app.state.services.database.fetch_one(
-        "SELECT DISTINCT set_id, artist, "
-        "title, status, creator, last_update "
-        f"FROM maps WHERE {k} = :v",
-        {"v": v},
-    )
+    # the set's data is the same across all of its maps,
+    # so we can use any cached map of the set, or any row.
+    if k == "set_id":
+        cached_set = app.state.cache.beatmapset.get(v)
+        cached_bmap = cached_set.maps[0] if cached_set and cached_set.maps else None
+    else:
+        cached_bmap = app.state.cache.beatmap.get(v)
+
+    if cached_bmap is not None:
+        bmapset = {
+            "set_id": cached_bmap.set_id,
+            "artist": cached_bmap.artist,
+            "title": cached_bmap.title,
+            "status": int(cached_bmap.status),
+            "creator": cached_bmap.creator,
+            "last_update": cached_bmap.last_update,
+        }
+    else:
+        bmapset = await app.state.services.database.fetch_one(
+            "SELECT set_id, artist, title, status, creator, last_update "
+            f"FROM maps WHERE {k} = :v LIMIT 1",
+            {"v": v},
+        )
 
     if not bmapset:
         # TODO: get from osu!
@@ -789,6 +711,7 @@ async def osuSubmitModularSelector(
         score.player.status.mode = score.mode
 
         if not score.player.restricted:
+            app.state.sessions.players.update_presence(score.player)
             app.state.sessions.players.enqueue(app.packets.user_stats(score.player))
 
     # stop here if this is a duplicate score
@@ -811,6 +734,12 @@ async def osuSubmitModularSelector(
             if score.passed:
                 await score.calculate_status()
 
+                # the previous best's placement is only shown in the
+                # vanilla modes' charts, and must be found before the
+                # new score is saved.
+                if score.prev_best and score.mode <= GameMode.VANILLA_MANIA:
+                    await score.prev_best.fetch_rank()
+
                 if score.bmap.status != RankedStatus.Pending:
                     score.rank = await score.calculate_placement()
             else:
@@ -1028,8 +957,7 @@ async def osuSubmitModularSelector(
         MIN_REPLAY_SIZE = 24
 
         if len(replay_data) >= MIN_REPLAY_SIZE:
-            replay_file = REPLAYS_PATH / f"{score.id}.osr"
-            replay_file.write_bytes(replay_data)
+            await app.usecases.replays.save_replay(score.id, replay_data)
         else:
             log(f"{score.player} submitted a score without a replay!", Ansi.LRED)
 
@@ -1158,6 +1086,7 @@ async def osuSubmitModularSelector(
 
     if not score.player.restricted:
         # enqueue new stats info to all other users
+        app.state.sessions.players.update_presence(score.player)
         app.state.sessions.players.enqueue(app.packets.user_stats(score.player))
 
         # update beatmap with new stats
@@ -1177,6 +1106,10 @@ async def osuSubmitModularSelector(
     # update their recent score
     score.player.recent_scores[score.mode] = score
 
+    # let their match know, if it's awaiting their submission
+    if score.player.match is not None:
+        score.player.match.submit_score(score)
+
     """ score submission charts """
 
     # charts are only displayed for passes vanilla gamemodes.
@@ -1190,15 +1123,8 @@ async def osuSubmitModularSelector(
     else:
         # construct and send achievements & ranking charts to the client
         if score.bmap.awards_ranked_pp and not score.player.restricted:
-            achievements = []
-            for ach in app.state.sessions.achievements:
-                if ach in score.player.achievements:
-                    # player already has this achievement.
-                    continue
-
-                if ach.cond(score, score.mode.as_vanilla):
-                    await score.player.unlock_achievement(ach)
-                    achievements.append(ach)
+            achievements = app.state.sessions.achievements.unlocked_by(score)
+            await score.player.unlock_achievements(achievements)
 
             achievements_str = "/".join(repr(ach) for ach in achievements)
         else:
@@ -1279,19 +1205,20 @@ async def getReplay(
     mode: int = Query(..., alias="m", ge=0, le=3),
     score_id: int = Query(..., alias="c", min=0, max=9_223_372_036_854_775_807),
 ):
-    score = await Score.from_sql(score_id)
-    if not score:
+    rec = await scores_repo.fetch_one(score_id)
+    if not rec:
         return
 
-    file = REPLAYS_PATH / f"{score_id}.osr"
-    if not file.exists():
+    replay_data = await app.usecases.replays.fetch_replay(score_id)
+    if replay_data is None:
         return
 
     # increment replay views for this score
-    if player.id != score.player.id:
+    score = Score.from_row(rec)
+    if player.id != score.player_id:
         app.state.loop.create_task(score.increment_replay_views())
 
-    return FileResponse(file)
+    return Response(replay_data)
 
 
 @router.get("/web/osu-rate.php")
@@ -1315,35 +1242,27 @@ async def osuRate(
             return b"not ranked"
 
         # osu! client is checking whether we can rate the map or not.
-        has_previous_rating = (
-            await app.state.services.database.fetch_one(
-                "SELECT 1 FROM ratings WHERE map_md5 = :map_md5 AND userid = :user_id",
-                {"map_md5": map_md5, "user_id": player.id},
-            )
-            is not None
-        )
+        has_previous_rating = await ratings_repo.user_has_rated(player.id, map_md5)
 
         # the client hasn't rated the map, so simply
         # tell them that they can submit a rating.
         if not has_previous_rating:
             return b"ok"
+
+        rec = await ratings_repo.fetch_one(map_md5)
+        assert rec is not None
     else:
-        # the client is submitting a rating for the map.
-        await app.state.services.database.execute(
-            "INSERT INTO ratings VALUES (:user_id, :map_md5, :rating)",
-            {"user_id": player.id, "map_md5": map_md5, "rating": int(rating)},
-        )
+        # the client is submitting a rating for the map;
+        # the map's aggregates are updated alongside it.
+        rec = await ratings_repo.create(player.id, map_md5, int(rating))
 
-    ratings = [
-        row[0]
-        for row in await app.state.services.database.fetch_all(
-            "SELECT rating FROM ratings WHERE map_md5 = :map_md5",
-            {"map_md5": map_md5},
-        )
-    ]
+        # keep the cached map's aggregates in sync.
+        cached = app.state.cache.beatmap.get(map_md5)
+        if cached is not None:
+            cached.set_rating_aggregates(rec["rating_sum"], rec["num_ratings"])
 
     # send back the average rating
-    avg = sum(ratings) / len(ratings)
+    avg = rec["rating_sum"] / rec["num_ratings"]
     return f"alreadyvoted\n{avg}".encode()
 
 
@@ -1492,6 +1411,7 @@ async def getScores(
         player.status.mode = mode
 
         if not player.restricted:
+            app.state.sessions.players.update_presence(player)
             app.state.sessions.players.enqueue(app.packets.user_stats(player))
 
     scoring_metric = "pp" if mode >= GameMode.RELAX_OSU else "score"
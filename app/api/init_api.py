@@ -13,15 +13,16 @@ from fastapi import FastAPI
 from fastapi import status
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 from fastapi.requests import Request
 from fastapi.responses import ORJSONResponse
 from fastapi.responses import Response
-from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import RequestResponseEndpoint
 from starlette.requests import ClientDisconnect
 
 import app.bg_loops
+import app.metrics
 import app.settings
 import app.state
 import app.utils
@@ -140,6 +141,9 @@ def init_events(asgi_app: BanchoAPI) -> None:
         await app.state.services.database.connect()
         await app.state.services.redis.initialize()
 
+        # sessions snapshotted by our last run are restored as clients poll.
+        await app.state.sessions.load_session_tokens()
+
         if app.state.services.datadog is not None:
             app.state.services.datadog.start(
                 flush_in_thread=True,
@@ -165,6 +169,12 @@ def init_events(asgi_app: BanchoAPI) -> None:
         # and shut down any of the housekeeping tasks running in the background.
         await app.state.sessions.cancel_housekeeping_tasks()
 
+        # snapshot online sessions, so clients won't all need to login again.
+        await app.state.sessions.save_sessions()
+
+        if app.settings.MULTI_WORKER:
+            await app.state.bus.remove_sessions()
+
         # shutdown services
 
         await app.state.services.http_client.close()
@@ -191,6 +201,23 @@ def init_routes(asgi_app: BanchoAPI) -> None:
         # bancho.py's developer-facing api
         asgi_app.host(f"api.{domain}", api_router)
 
+    # prometheus metrics; only served on hosts other than those
+    # above (e.g. `localhost`), so they aren't exposed publicly.
+    @asgi_app.get("/metrics", include_in_schema=False)
+    async def metrics(request: Request) -> Response:
+        if any(
+            header in request.headers
+            for header in ("CF-Connecting-IP", "X-Forwarded-For", "X-Real-IP")
+        ):
+            ip = app.state.services.ip_resolver.get_ip(request.headers)
+            if not ip.is_private:
+                return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+        return Response(
+            content=app.metrics.render_prometheus(),
+            media_type="text/plain; version=0.0.4",
+        )
+
 
 def init_api() -> BanchoAPI:
     """Create & initialize our app."""
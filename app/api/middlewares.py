@@ -2,48 +2,94 @@ from __future__ import annotations
 
 import time
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.middleware.base import RequestResponseEndpoint
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
 
+import app.metrics
 from app.logging import Ansi
 from app.logging import log
 from app.logging import magnitude_fmt_time
 from app.logging import printc
 
 
-class MetricsMiddleware(BaseHTTPMiddleware):
-    async def dispatch(
-        self,
-        request: Request,
-        call_next: RequestResponseEndpoint,
-    ) -> Response:
+class MetricsMiddleware:
+    """Record the latency & size of http requests, per route.
+
+    This is a pure asgi middleware; unlike `BaseHTTPMiddleware`,
+    it doesn't wrap the app in another task or buffer responses.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         start_time = time.perf_counter_ns()
-        response = await call_next(request)
-        end_time = time.perf_counter_ns()
+        status_code = 500
+        bytes_in = 0
+        bytes_out = 0
+
+        async def receive_wrapper() -> Message:
+            nonlocal bytes_in
 
-        time_elapsed = end_time - start_time
+            message = await receive()
+            if message["type"] == "http.request":
+                bytes_in += len(message.get("body", b""))
+            return message
 
-        # TODO: add metric to datadog
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, bytes_out
 
-        col = (
-            Ansi.LGREEN
-            if 200 <= response.status_code < 300
-            else Ansi.LYELLOW
-            if 300 <= response.status_code < 400
-            else Ansi.LRED
-        )
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+                # time taken until the response headers are sent
+                time_elapsed = time.perf_counter_ns() - start_time
+                message.setdefault("headers", []).append(
+                    (b"process-time", str(round(time_elapsed) / 1e6).encode()),
+                )
+            elif message["type"] == "http.response.body":
+                bytes_out += len(message.get("body", b""))
+
+            await send(message)
 
         try:
-            url = f"{request.headers['host']}{request['path']}"
-        except KeyError:
-            # If host is not set, reject the request
-            url = f"{request['path']}"
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            time_elapsed = time.perf_counter_ns() - start_time
+
+            # the router fills in the endpoint which handled the request;
+            # we use it rather than the path to keep label cardinality low.
+            endpoint = scope.get("endpoint")
+            if endpoint is not None:
+                module = endpoint.__module__.rsplit(".", maxsplit=1)[-1]
+                route = f"{module}:{endpoint.__name__}"
+            else:
+                route = "unmatched"
+
+            app.metrics.observe("http_request_latency", time_elapsed, route=route)
+            app.metrics.increment("http_bytes_in", bytes_in, route=route)
+            app.metrics.increment("http_bytes_out", bytes_out, route=route)
 
+            col = (
+                Ansi.LGREEN
+                if 200 <= status_code < 300
+                else Ansi.LYELLOW
+                if 300 <= status_code < 400
+                else Ansi.LRED
+            )
 
-        log(f"[{request.method}] {response.status_code} {url}", col, end=" | ")
-        printc(f"Request took: {magnitude_fmt_time(time_elapsed)}", Ansi.LBLUE)
+            headers = dict(scope["headers"])
+            if b"host" in headers:
+                url = f"{headers[b'host'].decode()}{scope['path']}"
+            else:
+                url = f"{scope['path']}"
 
-        response.headers["process-time"] = str(round(time_elapsed) / 1e6)
-        return response
+            log(f"[{scope['method']}] {status_code} {url}", col, end=" | ")
+            printc(f"Request took: {magnitude_fmt_time(time_elapsed)}", Ansi.LBLUE)
@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import hashlib
 import struct
+import time
 from pathlib import Path as SystemPath
 from typing import Literal
 from typing import Optional
@@ -15,6 +16,7 @@ from fastapi.responses import StreamingResponse
 
 import app.packets
 import app.state
+import app.usecases.replays
 from app.constants import regexes
 from app.constants.gamemodes import GameMode
 from app.constants.mods import Mods
@@ -27,7 +29,6 @@ from app.repositories import stats as stats_repo
 
 AVATARS_PATH = SystemPath.cwd() / ".data/avatars"
 BEATMAPS_PATH = SystemPath.cwd() / ".data/osu"
-REPLAYS_PATH = SystemPath.cwd() / ".data/osr"
 SCREENSHOTS_PATH = SystemPath.cwd() / ".data/ss"
 
 
@@ -345,11 +346,21 @@ async def api_get_player_scores(
 
     # build sql query & fetch info
 
+    if scope == "recent":
+        # old failed & superseded scores are moved into the archive
+        scores_table = (
+            "(SELECT * FROM scores WHERE userid = :user_id AND mode = :mode "
+            "UNION ALL "
+            "SELECT * FROM scores_archive WHERE userid = :user_id AND mode = :mode)"
+        )
+    else:
+        scores_table = "scores"
+
     query = [
         "SELECT t.id, t.map_md5, t.score, t.pp, t.acc, t.max_combo, "
         "t.mods, t.n300, t.n100, t.n50, t.nmiss, t.ngeki, t.nkatu, t.grade, "
         "t.status, t.mode, t.play_time, t.time_elapsed, t.perfect, t.pauses "
-        "FROM scores t "
+        f"FROM {scores_table} t "
         "INNER JOIN maps b ON t.map_md5 = b.md5 "
         "WHERE t.userid = :user_id AND t.mode = :mode",
     ]
@@ -391,8 +402,10 @@ async def api_get_player_scores(
     ]
 
     # fetch & return info from sql
+    bmaps = await Beatmap.from_md5_many(row["map_md5"] for row in rows)
+
     for row in rows:
-        bmap = await Beatmap.from_md5(row.pop("map_md5"))
+        bmap = bmaps.get(row.pop("map_md5"))
         row["beatmap"] = bmap.as_dict if bmap else None
 
     player_info = {
@@ -639,17 +652,14 @@ async def api_get_replay(
 ):
     """Return a given replay (including headers)."""
 
-    # fetch replay file & make sure it exists
-    replay_file = REPLAYS_PATH / f"{score_id}.osr"
-    if not replay_file.exists():
+    # fetch replay frames & make sure they exist
+    raw_replay_data = await app.usecases.replays.fetch_replay(score_id)
+    if raw_replay_data is None:
         return ORJSONResponse(
             {"status": "Replay not found."},
             status_code=status.HTTP_404_NOT_FOUND,
         )
 
-    # read replay frames from file
-    raw_replay_data = replay_file.read_bytes()
-
     if include_headers:
         return StreamingResponse(
             raw_replay_data,
@@ -669,10 +679,10 @@ async def api_get_replay(
         "s.mode, s.n300, s.n100, s.n50, s.ngeki, "
         "s.nkatu, s.nmiss, s.score, s.max_combo, "
         "s.perfect, s.mods, s.play_time "
-        "FROM scores s "
+        "FROM (SELECT * FROM scores WHERE id = :score_id "
+        "UNION ALL SELECT * FROM scores_archive WHERE id = :score_id) s "
         "INNER JOIN users u ON u.id = s.userid "
-        "INNER JOIN maps m ON m.md5 = s.map_md5 "
-        "WHERE s.id = :score_id",
+        "INNER JOIN maps m ON m.md5 = s.map_md5",
         {"score_id": score_id},
     )
 
@@ -803,6 +813,77 @@ async def api_get_match(
     )
 
 
+LEADERBOARD_CACHE_TTL = 10  # seconds
+LEADERBOARD_CACHE_MAX_SIZE = 1024
+PLAYER_CARD_CACHE_TTL = 60  # seconds
+
+# {(sort, mode, limit, offset, country, after_value, after_id): (expiry, response)}
+_leaderboard_cache: dict[tuple[object, ...], tuple[float, dict[str, object]]] = {}
+
+LEADERBOARD_CARD_COLUMNS = (
+    "u.id as player_id, u.name, u.country, s.tscore, s.rscore, "
+    "s.pp, s.plays, s.playtime, s.acc, s.max_combo, "
+    "s.xh_count, s.x_count, s.sh_count, s.s_count, s.a_count, "
+    "c.id as clan_id, c.name as clan_name, c.tag as clan_tag"
+)
+
+
+async def fetch_player_cards(
+    mode: GameMode,
+    player_ids: list[int],
+) -> dict[int, dict[str, object]]:
+    """Fetch leaderboard cards for many players, using a short lived cache.
+
+    Cards are cached in app.state.cache.player_card, and dropped
+    when a player's stats or row change (see Players.invalidate)."""
+    now = time.time()
+    cards: dict[int, dict[str, object]] = {}
+    missing_ids: list[int] = []
+
+    for player_id in player_ids:
+        cached = app.state.cache.player_card.get(player_id, {}).get(mode)
+        if cached is not None and cached[0] > now:
+            cards[player_id] = cached[1]
+        else:
+            missing_ids.append(player_id)
+
+    if missing_ids:
+        rows = await app.state.services.database.fetch_all(
+            f"SELECT {LEADERBOARD_CARD_COLUMNS} "
+            "FROM stats s "
+            "LEFT JOIN users u USING (id) "
+            "LEFT JOIN clans c ON u.clan_id = c.id "
+            "WHERE s.mode = :mode AND u.priv & 1 AND u.id IN :player_ids",
+            {"mode": mode, "player_ids": missing_ids},
+        )
+
+        expiry = now + PLAYER_CARD_CACHE_TTL
+        for row in rows:
+            card = dict(row)
+            cards[card["player_id"]] = card
+            app.state.cache.player_card.setdefault(card["player_id"], {})[mode] = (
+                expiry,
+                card,
+            )
+
+    return cards
+
+
+def _cache_leaderboard(key: tuple[object, ...], response: dict[str, object]) -> None:
+    now = time.time()
+
+    if len(_leaderboard_cache) >= LEADERBOARD_CACHE_MAX_SIZE:
+        # drop expired entries, and everything if that wasn't enough
+        for cache_key, (expiry, _) in list(_leaderboard_cache.items()):
+            if expiry <= now:
+                del _leaderboard_cache[cache_key]
+
+        if len(_leaderboard_cache) >= LEADERBOARD_CACHE_MAX_SIZE:
+            _leaderboard_cache.clear()
+
+    _leaderboard_cache[key] = (now + LEADERBOARD_CACHE_TTL, response)
+
+
 @router.get("/get_leaderboard")
 async def api_get_global_leaderboard(
     sort: Literal["tscore", "rscore", "pp", "acc", "plays", "playtime"] = "pp",
@@ -810,6 +891,8 @@ async def api_get_global_leaderboard(
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, min=0, max=2_147_483_647),
     country: Optional[str] = Query(None, min_length=2, max_length=2),
+    after_value: Optional[float] = Query(None),
+    after_id: Optional[int] = Query(None, ge=0, le=2_147_483_647),
 ):
     if mode_arg in (
         GameMode.RELAX_MANIA,
@@ -822,31 +905,116 @@ async def api_get_global_leaderboard(
             status_code=status.HTTP_400_BAD_REQUEST,
         )
 
-    mode = GameMode(mode_arg)
+    if (after_value is None) != (after_id is None):
+        return ORJSONResponse(
+            {"status": "Must provide both after_value & after_id, or neither!"},
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
 
-    query_conditions = ["s.mode = :mode", "u.priv & 1", f"s.{sort} > 0"]
-    query_parameters: dict[str, object] = {"mode": mode}
+    mode = GameMode(mode_arg)
 
     if country is not None:
-        query_conditions.append("u.country = :country")
-        query_parameters["country"] = country
+        country = country.lower()
+
+    cache_key = (sort, mode, limit, offset, country, after_value, after_id)
+    cached = _leaderboard_cache.get(cache_key)
+    if cached is not None and cached[0] > time.time():
+        return ORJSONResponse(cached[1])
+
+    if sort == "pp":
+        # pp leaderboards are maintained in redis sorted sets,
+        # so we only need to fetch the cards of the players on the page.
+        redis_key = f"bancho:leaderboard:{mode.value}"
+        if country is not None:
+            redis_key += f":{country}"
+
+        if after_id is not None:
+            # continue after the cursor; players tied on pp are
+            # in descending order of their ids (as strings).
+            max_pp = str(after_value)
+            start = 0
+        else:
+            max_pp = "+inf"
+            start = offset
+
+        leaderboard = []
+        while len(leaderboard) < limit:
+            ranking = await app.state.services.redis.zrevrangebyscore(
+                redis_key,
+                max_pp,
+                "(0",
+                start=start,
+                num=limit,
+                withscores=True,
+            )
+            start += len(ranking)
 
-    rows = await app.state.services.database.fetch_all(
-        "SELECT u.id as player_id, u.name, u.country, s.tscore, s.rscore, "
-        "s.pp, s.plays, s.playtime, s.acc, s.max_combo, "
-        "s.xh_count, s.x_count, s.sh_count, s.s_count, s.a_count, "
-        "c.id as clan_id, c.name as clan_name, c.tag as clan_tag "
-        "FROM stats s "
-        "LEFT JOIN users u USING (id) "
-        "LEFT JOIN clans c ON u.clan_id = c.id "
-        f"WHERE {' AND '.join(query_conditions)} "
-        f"ORDER BY s.{sort} DESC LIMIT :offset, :limit",
-        query_parameters | {"offset": offset, "limit": limit},
-    )
+            page = ranking
+            if after_id is not None:
+                page = [
+                    (player_id, pp)
+                    for player_id, pp in ranking
+                    if pp != after_value or player_id < str(after_id)
+                ]
 
-    return ORJSONResponse(
-        {"status": "success", "leaderboard": [dict(row) for row in rows]},
-    )
+            cards = await fetch_player_cards(mode, [int(id) for id, _ in page])
+
+            for player_id, pp in page:
+                card = cards.get(int(player_id))
+                if card is not None:
+                    leaderboard.append(card | {"pp": pp})
+
+            # players without cards (restricted) are skipped, so
+            # keep paging until the page is full, or we run out.
+            if len(ranking) < limit:
+                break
+
+        del leaderboard[limit:]
+    else:
+        # other sort keys use keyset pagination; the
+        # client passes the last row's value & id back to us.
+        query_conditions = ["s.mode = :mode", "u.priv & 1", f"s.{sort} > 0"]
+        query_parameters: dict[str, object] = {"mode": mode, "limit": limit}
+
+        if country is not None:
+            query_conditions.append("u.country = :country")
+            query_parameters["country"] = country
+
+        if after_id is not None:
+            query_conditions.append(
+                f"(s.{sort} < :after_value OR (s.{sort} = :after_value AND s.id > :after_id))",
+            )
+            query_parameters["after_value"] = after_value
+            query_parameters["after_id"] = after_id
+            pagination = "LIMIT :limit"
+        else:
+            query_parameters["offset"] = offset
+            pagination = "LIMIT :offset, :limit"
+
+        rows = await app.state.services.database.fetch_all(
+            f"SELECT {LEADERBOARD_CARD_COLUMNS} "
+            "FROM stats s "
+            "LEFT JOIN users u USING (id) "
+            "LEFT JOIN clans c ON u.clan_id = c.id "
+            f"WHERE {' AND '.join(query_conditions)} "
+            f"ORDER BY s.{sort} DESC, s.id ASC {pagination}",
+            query_parameters,
+        )
+        leaderboard = [dict(row) for row in rows]
+
+    response: dict[str, object] = {"status": "success", "leaderboard": leaderboard}
+
+    if len(leaderboard) == limit:
+        last_row = leaderboard[-1]
+        response["next_cursor"] = {
+            "after_value": last_row[sort],
+            "after_id": last_row["player_id"],
+        }
+    else:
+        response["next_cursor"] = None
+
+    _cache_leaderboard(cache_key, response)
+    return ORJSONResponse(response)
 
 
 @router.get("/get_clan")
@@ -864,15 +1032,12 @@ async def api_get_clan(
             status_code=status.HTTP_404_NOT_FOUND,
         )
 
-    members: list[Player] = []
-
-    for member_id in clan.member_ids:
-        member = await app.state.sessions.players.from_cache_or_sql(id=member_id)
-        assert member is not None
-        members.append(member)
+    players = await app.state.sessions.players.from_cache_or_sql_many(
+        [*clan.member_ids, clan.owner_id],
+    )
 
-    owner = await app.state.sessions.players.from_cache_or_sql(id=clan.owner_id)
-    assert owner is not None
+    members = [players[member_id] for member_id in clan.member_ids]
+    owner = players[clan.owner_id]
 
     return ORJSONResponse(
         {
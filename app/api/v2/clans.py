@@ -1,6 +1,8 @@
 """ bancho.py's v2 apis for interacting with clans """
 from __future__ import annotations
 
+from typing import Optional
+
 from fastapi import APIRouter
 from fastapi import status
 from fastapi.param_functions import Query
@@ -17,10 +19,12 @@ router = APIRouter()
 async def get_clans(
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
+    after_id: Optional[int] = Query(None, ge=0),
 ) -> Success[list[Clan]]:
     clans = await clans_repo.fetch_many(
         page=page,
         page_size=page_size,
+        after_id=after_id,
     )
     total_clans = await clans_repo.fetch_count()
 
@@ -27,6 +27,7 @@ async def get_maps(
     frozen: Optional[bool] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
+    after_id: Optional[int] = Query(None, ge=0),
 ) -> Success[list[Map]]:
     maps = await maps_repo.fetch_many(
         server=server,
@@ -39,6 +40,7 @@ async def get_maps(
         frozen=frozen,
         page=page,
         page_size=page_size,
+        after_id=after_id,
     )
     total_maps = await maps_repo.fetch_count(
         server=server,
@@ -29,6 +29,7 @@ async def get_players(
     play_style: Optional[int] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
+    after_id: Optional[int] = Query(None, ge=0),
 ) -> Success[list[Player]]:
     players = await players_repo.fetch_many(
         priv=priv,
@@ -39,6 +40,7 @@ async def get_players(
         play_style=play_style,
         page=page,
         page_size=page_size,
+        after_id=after_id,
     )
     total_players = await players_repo.fetch_count(
         priv=priv,
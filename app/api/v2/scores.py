@@ -24,6 +24,7 @@ async def get_all_scores(
     user_id: Optional[int] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
+    after_id: Optional[int] = Query(None, ge=0),
 ) -> Success[list[Score]]:
     scores = await scores_repo.fetch_many(
         map_md5=map_md5,
@@ -33,6 +34,8 @@ async def get_all_scores(
         user_id=user_id,
         page=page,
         page_size=page_size,
+        after_id=after_id,
+        include_archived=True,
     )
     total_scores = await scores_repo.fetch_count(
         map_md5=map_md5,
@@ -40,6 +43,7 @@ async def get_all_scores(
         status=status,
         mode=mode,
         user_id=user_id,
+        include_archived=True,
     )
 
     response = [Score.from_mapping(rec) for rec in scores]
@@ -56,7 +60,7 @@ async def get_all_scores(
 
 @router.get("/scores/{score_id}")
 async def get_score(score_id: int) -> Success[Score]:
-    data = await scores_repo.fetch_one(id=score_id)
+    data = await scores_repo.fetch_one(id=score_id, include_archived=True)
     if data is None:
         return responses.failure(
             message="Score not found.",
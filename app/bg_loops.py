@@ -2,17 +2,30 @@ from __future__ import annotations
 
 import asyncio
 import time
+from datetime import datetime
+from datetime import timedelta
 
+import app.loop_monitor
 import app.packets
+import app.processes.ipc
 import app.settings
 import app.state
+import app.usecases.replays
+import app.usecases.score_archive
 from app.constants.privileges import Privileges
 from app.logging import Ansi
 from app.logging import log
+from app.objects.beatmap import run_beatmap_refresher
+from app.objects.beatmap import warm_beatmap_cache
 
 __all__ = ("initialize_housekeeping_tasks",)
 
 OSU_CLIENT_MIN_PING_INTERVAL = 300000 // 1000  # defined by osu!
+CHANNEL_INFO_INTERVAL = 1  # seconds
+ONLINE_PLAYERS_INTERVAL = 10  # seconds
+LOOP_LAG_INTERVAL = 0.05  # seconds
+REPLAY_COMPACTION_INTERVAL = 60 * 60  # seconds
+SCORE_ARCHIVE_INTERVAL = 24 * 60 * 60  # seconds
 
 
 async def initialize_housekeeping_tasks() -> None:
@@ -21,6 +34,37 @@ async def initialize_housekeeping_tasks() -> None:
 
     loop = asyncio.get_running_loop()
 
+    if app.settings.MULTI_WORKER:
+        app.state.sessions.housekeeping_tasks.update(
+            {
+                loop.create_task(app.state.bus.listen()),
+                loop.create_task(
+                    _check_workers(interval=app.state.bus.WORKER_HEARTBEAT_INTERVAL),
+                ),
+            },
+        )
+
+    app.state.sessions.housekeeping_tasks.add(
+        loop.create_task(run_beatmap_refresher()),
+    )
+
+    # warm the beatmap cache in the background,
+    # rather than delaying accepting connections.
+    if app.settings.BEATMAP_CACHE_WARMUP_LIMIT > 0:
+        app.state.sessions.housekeeping_tasks.add(
+            loop.create_task(
+                warm_beatmap_cache(app.settings.BEATMAP_CACHE_WARMUP_LIMIT),
+            ),
+        )
+
+    # with multiple workers, only one archives scores.
+    if app.settings.SCORE_ARCHIVE_AGE > 0 and (
+        not app.settings.MULTI_WORKER or app.settings.WORKER_ID == "0"
+    ):
+        app.state.sessions.housekeeping_tasks.add(
+            loop.create_task(_archive_old_scores(interval=SCORE_ARCHIVE_INTERVAL)),
+        )
+
     app.state.sessions.housekeeping_tasks.update(
         {
             loop.create_task(task)
@@ -28,9 +72,11 @@ async def initialize_housekeeping_tasks() -> None:
                 _remove_expired_donation_privileges(interval=30 * 60),
                 _update_bot_status(interval=5 * 60),
                 _disconnect_ghosts(interval=OSU_CLIENT_MIN_PING_INTERVAL // 3),
-                _website(),
-                _bot(),
+                _flush_channel_info(interval=CHANNEL_INFO_INTERVAL),
+                _monitor_loop_lag(interval=LOOP_LAG_INTERVAL),
+                _publish_online_players(interval=ONLINE_PLAYERS_INTERVAL),
                 _datadog_metrics(interval=5),
+                _compact_replay_segments(interval=REPLAY_COMPACTION_INTERVAL),
             )
         },
     )
@@ -53,13 +99,11 @@ async def _remove_expired_donation_privileges(interval: int) -> None:
             "AND priv & 48",  # 48 = Supporter | Premium
         )
 
-        for expired_donor in expired_donors:
-            player = await app.state.sessions.players.from_cache_or_sql(
-                id=expired_donor["id"],
-            )
-
-            assert player is not None
+        players = await app.state.sessions.players.from_cache_or_sql_many(
+            expired_donor["id"] for expired_donor in expired_donors
+        )
 
+        for player in players.values():
             # TODO: perhaps make a `revoke_donor` method?
             await player.remove_privs(Privileges.DONATOR)
             player.donor_end = 0
@@ -91,187 +135,75 @@ async def _disconnect_ghosts(interval: int) -> None:
                 player.logout()
 
 
+async def _flush_channel_info(interval: int) -> None:
+    """Broadcast changed channel member counts, every `interval`."""
+    while True:
+        await asyncio.sleep(interval)
+        app.state.sessions.channels.flush_info()
+
+
+async def _monitor_loop_lag(interval: float) -> None:
+    """Measure the event loop's lag, reporting any blocking calls."""
+    app.loop_monitor.start_watchdog(interval)
+
+    try:
+        while True:
+            app.loop_monitor.heartbeat()
+
+            start_time = time.perf_counter_ns()
+            await asyncio.sleep(interval)
+            time_elapsed = time.perf_counter_ns() - start_time
+
+            app.loop_monitor.record_lag(max(time_elapsed - int(interval * 1e9), 0))
+    finally:
+        app.loop_monitor.stop_watchdog()
+
+
 async def _update_bot_status(interval: int) -> None:
     """Re roll the bot status, every `interval`."""
     while True:
         await asyncio.sleep(interval)
         app.packets.bot_stats.cache_clear()
+        app.state.sessions.players.update_presence(app.state.sessions.bot)
 
 
+async def _compact_replay_segments(interval: int) -> None:
+    """Compact mostly wiped replay segments, every `interval`."""
+    while True:
+        await asyncio.sleep(interval)
+
+        try:
+            await app.usecases.replays.compact_segments()
+        except Exception as exc:
+            log(f"Failed to compact replay segments: {exc!r}", Ansi.LRED)
 
-#Website imports
-import aiohttp
-import orjson
-from quart import Quart
-from quart import render_template
-from quart import send_from_directory
-from cmyui.logging import Ansi, log
-import zenith.zconfig as zconf
-from app.state import website as zglob
-from hypercorn.asyncio import serve
-from hypercorn.config import Config
-
-
-import datetime as dt
-#! Website runner
-async def _website() -> None:
-    app = Quart(__name__,
-                template_folder='/opt/gaug/zenith/templates/',
-                root_path='/opt/gaug/zenith/',
-                static_folder='/opt/gaug/zenith/static/',
-                instance_path='/opt/gaug/zenith/')
-
-    version = "1.3.0"
-
-    # used to secure session data.
-    # we recommend using a long randomly generated ascii string.
-    app.secret_key = zconf.secret_key
-    app.permanent_session_lifetime = dt.timedelta(days=30)
-    app.config['TEMPLATES_AUTO_RELOAD'] = True
-
-    # globals which can be used in template code
-    _version = repr(version)
-    @app.before_serving
-    @app.template_global()
-    def appVersion() -> str:
-        return _version
-
-    _app_name = zconf.app_name_short
-    @app.before_serving
-    @app.template_global()
-    def appName() -> str:
-        return _app_name
-
-    _app_name_l = zconf.app_name_long
-    @app.before_serving
-    @app.template_global()
-    def appNameLong() -> str:
-        return _app_name_l
-
-    _captcha_key = zconf.hCaptcha_sitekey
-    @app.before_serving
-    @app.template_global()
-    def captchaKey() -> str:
-        return _captcha_key
-
-    _domain = zconf.domain
-    @app.before_serving
-    @app.template_global()
-    def domain() -> str:
-        return _domain
-
-    from zenith.blueprints.frontend import frontend
-    app.register_blueprint(frontend)
-    # from zenith.blueprints.users import users
-    # app.register_blueprint(users)
-    from zenith.blueprints.api import api
-    app.register_blueprint(api, url_prefix="/wapi")
-    from zenith.blueprints.admin import admin
-    app.register_blueprint(admin, url_prefix="/admin")
-
-    @app.errorhandler(404)
-    async def page_not_found(e):
-        # NOTE: we set the 404 status explicitly
-        return (await render_template(f'errors/404.html'), 404)
-
-    # Custom static data
-    @app.route('/cdn/tw-elements/<path:filename>')
-    async def custom_static(filename):
-        return await send_from_directory('/opt/gaug/zenith/static/js/twelements/', filename)
-
-    #app.run(debug=zconf.debug) # blocking call
-    if __name__ == "app.bg_loops":
-        await serve(app, Config(), shutdown_trigger=lambda: asyncio.Future())
-
-
-import discord
-import os
-from discord.ext import commands
-from pathlib import Path
-import random
-from moaizedong import botconfig
-from typing import Literal, Optional
-import traceback
-
-async def _bot() -> None:
-    """Run the discord bot."""
-    intents = discord.Intents.all()
-    client = commands.Bot(
-        command_prefix=botconfig.PREFIX,
-        intents=intents,
-        application_id=botconfig.APPLICATION_ID,
-    )
-    app.state.bot.client = client
-
-    # Load cogs
-    for dir in os.listdir(f'{botconfig.PATH_TO_FILES}cogs'):
-        path = f'{botconfig.PATH_TO_FILES}cogs/{dir}'
-        if os.path.isdir(path):
-            files = [file for file in os.listdir(path) if file.endswith('.py') and not file.startswith('_')]
-            for file in files:
-                print(f"[DISCORD BOT] Loading {dir}/{file}...")
-                try:
-                    await client.load_extension(f'moaizedong.cogs.{dir}.{file[:-3]}')
-                    print(f'[DISCORD BOT] Loaded {dir}/{file}')
-                except Exception as e:
-                    print(f'[DISCORD BOT] Failed to load {dir}/{file}')
-                    traceback.print_exc()
-
-    @client.event
-    async def on_ready() -> None:
-        log("[DISCORD BOT] Bot logged in", Ansi.GREEN)
-        log(f"Bot name: {client.user.name}")
-        log(f"Bot ID: {client.user.id}")
-        log(f"Bot Version: {app.state.bot.version}\n")
-
-
-    @client.command()
-    async def reloadbot(ctx: commands.Context) -> None:
-        """Reloads the bot."""
-        # Check if user is owner
-        if ctx.author.id not in botconfig.OWNERS:
-            return await ctx.send("You are not allowed to use this command.", delete_after=10)
-
-        log("[DISCORD BOT] Reloading whole bot...", Ansi.LYELLOW)
-        await ctx.send("Reloading bot, results in console...")
-        # Reload the bot
-        await client.close()
-        await _bot()
-        log("[DISCORD BOT] Bot reloaded.", Ansi.LGREEN)
-
-    @client.command()
-    @commands.guild_only()
-    @commands.is_owner()
-    async def sync(
-        ctx: commands.Context, guilds: commands.Greedy[discord.Object], spec: Optional[Literal["~", "*", "^"]] = None
-    ) -> None:
-        if not guilds:
-            if spec == "l":
-                synced = await ctx.bot.tree.sync(guild=ctx.guild)
-            elif spec == "*":
-                ctx.bot.tree.copy_global_to(guild=ctx.guild)
-                synced = await ctx.bot.tree.sync(guild=ctx.guild)
-            elif spec == "^":
-                ctx.bot.tree.clear_commands(guild=ctx.guild)
-                await ctx.bot.tree.sync(guild=ctx.guild)
-                synced = []
-            else:
-                synced = await ctx.bot.tree.sync()
-
-            await ctx.send(
-                f"Synced {len(synced)} commands {'globally' if spec is None else 'to the current guild.'}"
-            )
-            return
 
-        ret = 0
-        for guild in guilds:
-            try:
-                await ctx.bot.tree.sync(guild=guild)
-            except discord.HTTPException:
-                pass
-            else:
-                ret += 1
+async def _archive_old_scores(interval: int) -> None:
+    """Archive old failed & superseded scores, every `interval`."""
+    while True:
+        played_before = datetime.now() - timedelta(days=app.settings.SCORE_ARCHIVE_AGE)
 
-        await ctx.send(f"Synced the tree to {ret}/{len(guilds)}.")
+        try:
+            archived = await app.usecases.score_archive.archive_scores(played_before)
+        except Exception as exc:
+            log(f"Failed to archive scores: {exc!r}", Ansi.LRED)
+        else:
+            if archived:
+                log(f"Archived {archived:,} old scores.", Ansi.LMAGENTA)
 
-    await client.start(botconfig.TOKEN)
\ No newline at end of file
+        await asyncio.sleep(interval)
+
+
+async def _publish_online_players(interval: int) -> None:
+    """Publish the online players for the website & bot, every `interval`."""
+    while True:
+        await app.processes.ipc.publish_online_players()
+        await asyncio.sleep(interval)
+
+
+async def _check_workers(interval: int) -> None:
+    """Send our heartbeat & remove the sessions of crashed workers."""
+    while True:
+        await asyncio.sleep(interval)
+        await app.state.bus.heartbeat()
+        await app.state.bus.remove_dead_workers()
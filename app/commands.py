@@ -35,10 +35,13 @@ import timeago
 from pytimeparse.timeparse import timeparse
 
 import app.logging
+import app.loop_monitor
+import app.metrics
 import app.packets
 import app.settings
 import app.state
 import app.usecases.performance
+import app.usecases.replays
 import app.utils
 from app.constants import regexes
 from app.constants.gamemodes import GameMode
@@ -62,6 +65,7 @@ from app.objects.score import SubmissionStatus
 from app.repositories import clans as clans_repo
 from app.repositories import maps as maps_repo
 from app.repositories import players as players_repo
+from app.repositories import scores as scores_repo
 from app.usecases.performance import ScoreParams
 from app.utils import seconds_readable
 
@@ -297,6 +301,7 @@ async def changename(ctx: Context) -> Optional[str]:
 
     # all checks passed, update their name
     await players_repo.update(ctx.player.id, name=name)
+    app.state.sessions.players.invalidate(ctx.player.id)
 
     ctx.player.enqueue(
         app.packets.notification(f"Your username has been changed to {name}!"),
@@ -655,9 +660,13 @@ async def requests(ctx: Context) -> Optional[str]:
 
     l = [f"Total requests: {len(rows)}"]
 
+    players = await app.state.sessions.players.from_cache_or_sql_many(
+        row["player_id"] for row in rows
+    )
+
     for map_id, player_id, dt in rows:
         # find player & map for each row, and add to output.
-        player = await app.state.sessions.players.from_cache_or_sql(id=player_id)
+        player = players.get(player_id)
         if not player:
             l.append(f"Failed to find requesting player ({player_id})?")
             continue
@@ -828,9 +837,13 @@ async def notes(ctx: Context) -> Optional[str]:
     if not res:
         return f"No notes found on {target} in the past {days} days."
 
+    loggers = await app.state.sessions.players.from_cache_or_sql_many(
+        row["from"] for row in res
+    )
+
     notes = []
     for row in res:
-        logger = await app.state.sessions.players.from_cache_or_sql(id=row["from"])
+        logger = loggers.get(row["from"])
         if not logger:
             continue
 
@@ -1046,6 +1059,31 @@ async def unrestrict(ctx: Context) -> Optional[str]:
     return f"{target} was unrestricted."
 
 
+@command(Privileges.ADMINISTRATOR, aliases=["blocking"], hidden=True)
+async def lag(ctx: Context) -> Optional[str]:
+    """Show the code which has blocked the event loop the most."""
+    if ctx.args and not ctx.args[0].isdecimal():
+        return "Invalid syntax: !lag <count>"
+
+    count = int(ctx.args[0]) if ctx.args else 5
+
+    if not app.loop_monitor.offenders:
+        return "The event loop hasn't been blocked yet."
+
+    offenders = sorted(
+        app.loop_monitor.offenders.values(),
+        key=lambda offender: offender.total_lag,
+        reverse=True,
+    )[:count]
+
+    return "\n".join(
+        f"{offender.site}: blocked {offender.count}x, "
+        f"{app.logging.magnitude_fmt_time(offender.total_lag)} total, "
+        f"{app.logging.magnitude_fmt_time(offender.max_lag)} max"
+        for offender in offenders
+    )
+
+
 @command(Privileges.ADMINISTRATOR, hidden=True)
 async def alert(ctx: Context) -> Optional[str]:
     """Send a notification to all players."""
@@ -1282,10 +1320,8 @@ async def wipemap(ctx: Context) -> Optional[str]:
     map_md5 = ctx.player.last_np["bmap"].md5
 
     # delete scores from all tables
-    await app.state.services.database.execute(
-        "DELETE FROM scores WHERE map_md5 = :map_md5",
-        {"map_md5": map_md5},
-    )
+    await app.usecases.replays.delete_replays_on_maps([map_md5])
+    await scores_repo.delete_by_map_md5s([map_md5])
 
     return "Scores wiped."
 
@@ -2474,6 +2510,7 @@ async def clan_create(ctx: Context) -> Optional[str]:
         clan_id=clan.id,
         clan_priv=ClanPrivileges.Owner,
     )
+    app.state.sessions.players.invalidate(ctx.player.id)
 
     # announce clan creation
     announce_chan = app.state.sessions.channels["#announce"]
@@ -2509,6 +2546,7 @@ async def clan_disband(ctx: Context) -> Optional[str]:
     # NOTE: only online players need be to be uncached.
     for member_id in clan.member_ids:
         await players_repo.update(member_id, clan_id=0, clan_priv=0)
+        app.state.sessions.players.invalidate(member_id)
 
         member = app.state.sessions.players.get(id=member_id)
         if member:
@@ -2639,9 +2677,16 @@ async def process_commands(
 
                 res = "An exception occurred when running the command."
 
+            time_elapsed = clock_ns() - start_time
+            app.metrics.observe(
+                "command_latency",
+                time_elapsed,
+                command=cmd.triggers[0],
+            )
+
             if res is not None:
                 # we have a message to return, include elapsed time
-                elapsed = app.logging.magnitude_fmt_time(clock_ns() - start_time)
+                elapsed = app.logging.magnitude_fmt_time(time_elapsed)
                 return {"resp": f"{res} | Elapsed: {elapsed}", "hidden": cmd.hidden}
             else:
                 # no message to return
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Optional
+
+import app.metrics
+import app.settings
+from app.logging import Ansi
+from app.logging import log
+from app.logging import magnitude_fmt_time
+
+__all__ = (
+    "BlockingSite",
+    "offenders",
+    "start_watchdog",
+    "stop_watchdog",
+    "heartbeat",
+    "record_lag",
+)
+
+# a watchdog thread samples the event loop thread's stack while the
+# loop is blocked; once the loop resumes, the samples are attributed
+# to the innermost frame of our own code which was running at the time.
+LAG_THRESHOLD = 100_000_000  # ns
+SAMPLE_INTERVAL = 0.02  # seconds
+MAX_SAMPLES_PER_STALL = 50
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))  # app/
+
+
+class BlockingSite:
+    """A location in our code which has blocked the event loop."""
+
+    __slots__ = ("site", "count", "total_lag", "max_lag", "stack")
+
+    def __init__(self, site: str, stack: str) -> None:
+        self.site = site
+        self.count = 0
+        self.total_lag = 0  # ns
+        self.max_lag = 0  # ns
+        self.stack = stack  # the most recently sampled stack
+
+
+# {site: blocking site}
+offenders: dict[str, BlockingSite] = {}
+
+_loop_thread_id: Optional[int] = None
+_last_heartbeat = 0.0  # time.monotonic()
+_samples: list[tuple[str, str]] = []  # [(site, stack), ...] of the current stall
+_samples_lock = threading.Lock()
+_watchdog_stopping = threading.Event()
+
+
+def _sample_loop_stack() -> Optional[tuple[str, str]]:
+    assert _loop_thread_id is not None
+
+    frame = sys._current_frames().get(_loop_thread_id)
+    if frame is None:
+        return None
+
+    stack = traceback.extract_stack(frame)
+
+    # attribute the stall to the innermost frame in our own code,
+    # rather than the library/stdlib call which actually blocked.
+    site_frame = stack[-1]
+    for frame_summary in reversed(stack):
+        if frame_summary.filename.startswith(APP_ROOT):
+            site_frame = frame_summary
+            break
+
+    site = (
+        f"{os.path.relpath(site_frame.filename, os.path.dirname(APP_ROOT))}:"
+        f"{site_frame.lineno} ({site_frame.name})"
+    )
+    return site, "".join(traceback.format_list(stack))
+
+
+def _watchdog(interval: float) -> None:
+    threshold = interval + LAG_THRESHOLD / 1e9
+
+    while not _watchdog_stopping.wait(SAMPLE_INTERVAL):
+        if time.monotonic() - _last_heartbeat < threshold:
+            continue
+
+        sample = _sample_loop_stack()
+        if sample is not None:
+            with _samples_lock:
+                if len(_samples) < MAX_SAMPLES_PER_STALL:
+                    _samples.append(sample)
+
+
+def start_watchdog(interval: float) -> None:
+    """Start sampling the calling thread's event loop when it blocks."""
+    global _loop_thread_id
+
+    _loop_thread_id = threading.get_ident()
+    _watchdog_stopping.clear()
+    heartbeat()
+
+    threading.Thread(
+        target=_watchdog,
+        args=(interval,),
+        name="loop-watchdog",
+        daemon=True,
+    ).start()
+
+
+def stop_watchdog() -> None:
+    _watchdog_stopping.set()
+
+
+def heartbeat() -> None:
+    """Mark the event loop as responsive."""
+    global _last_heartbeat
+    _last_heartbeat = time.monotonic()
+
+
+def record_lag(lag: int) -> None:
+    """Record the event loop's lag, reporting the stall if it was blocked."""
+    app.metrics.observe("event_loop_lag", lag)
+
+    with _samples_lock:
+        samples = _samples.copy()
+        _samples.clear()
+
+    if lag < LAG_THRESHOLD or not samples:
+        return
+
+    # the most frequently sampled site is the likely offender
+    site = Counter(site for site, _ in samples).most_common(1)[0][0]
+    stack = next(stack for sample_site, stack in samples if sample_site == site)
+
+    offender = offenders.get(site)
+    if offender is None:
+        offender = offenders[site] = BlockingSite(site, stack)
+
+    offender.count += 1
+    offender.total_lag += lag
+    offender.max_lag = max(offender.max_lag, lag)
+    offender.stack = stack
+
+    app.metrics.increment("event_loop_stalls", site=site)
+
+    log(
+        f"Event loop blocked for {magnitude_fmt_time(lag)} at {site}.",
+        Ansi.LYELLOW,
+    )
+    if app.settings.DEBUG:
+        log(f"Stack sampled while blocked:\n{stack.rstrip()}", Ansi.LYELLOW)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import app.state
+
+__all__ = (
+    "Histogram",
+    "observe",
+    "increment",
+    "render_prometheus",
+)
+
+# latencies are recorded into log-linear (hdr-style) histograms in
+# microseconds; each power of two is split into 2**SUB_BUCKET_BITS
+# buckets, so any recorded value is within ~20% of its bucket's bound.
+SUB_BUCKET_BITS = 2
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_VALUE = 1 << 26  # µs (~67s); larger values are clamped
+
+LabelSet = tuple[tuple[str, str], ...]
+
+
+def _bucket_index(value: int) -> int:
+    if value < SUB_BUCKETS:
+        return value
+
+    magnitude = value.bit_length() - SUB_BUCKET_BITS - 1
+    return SUB_BUCKETS * (magnitude + 1) + (value >> magnitude) - SUB_BUCKETS
+
+
+def _bucket_bound(index: int) -> int:
+    """The (inclusive) upper bound of the bucket at `index`."""
+    if index < SUB_BUCKETS:
+        return index
+
+    magnitude, sub_bucket = divmod(index - SUB_BUCKETS, SUB_BUCKETS)
+    return ((SUB_BUCKETS + sub_bucket + 1) << magnitude) - 1
+
+
+NUM_BUCKETS = _bucket_index(MAX_VALUE) + 1
+BUCKET_BOUNDS = [_bucket_bound(idx) / 1e6 for idx in range(NUM_BUCKETS)]  # seconds
+
+
+class Histogram:
+    """A fixed-memory, log-linear latency histogram."""
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self) -> None:
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.sum = 0.0  # seconds
+
+    def record(self, elapsed_ns: int) -> None:
+        value = min(elapsed_ns // 1000, MAX_VALUE)
+        self.counts[_bucket_index(value)] += 1
+        self.count += 1
+        self.sum += elapsed_ns / 1e9
+
+    def percentile(self, percentile: float) -> float:
+        """Return the upper bound (in seconds) of the given percentile."""
+        if not self.count:
+            return 0.0
+
+        target = self.count * percentile / 100
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return BUCKET_BOUNDS[idx]
+
+        return BUCKET_BOUNDS[-1]
+
+
+# {name: {labels: metric}}
+histograms: dict[str, dict[LabelSet, Histogram]] = {}
+counters: dict[str, dict[LabelSet, int]] = {}
+
+HELP = {
+    "http_request_latency": "Time taken to handle http requests, per route.",
+    "packet_latency": "Time taken to handle bancho packets, per packet type.",
+    "command_latency": "Time taken to handle chat commands, per command.",
+    "event_loop_lag": "Delay in the event loop running scheduled callbacks.",
+    "event_loop_stalls": "Times the event loop was blocked, per blocking site.",
+    "poll_bytes_in": "Bytes received in bancho polls.",
+    "poll_bytes_out": "Bytes sent in bancho poll responses.",
+    "http_bytes_in": "Bytes received in http request bodies, per route.",
+    "http_bytes_out": "Bytes sent in http response bodies, per route.",
+    "beatmap_sets_served_stale": "Expired beatmap sets served while being refreshed.",
+}
+
+
+def _datadog_tags(labels: LabelSet) -> Optional[list[str]]:
+    return [f"{key}:{value}" for key, value in labels] or None
+
+
+def observe(name: str, elapsed_ns: int, **labels: str) -> None:
+    """Record a latency of `elapsed_ns` for the metric `name`."""
+    label_set = tuple(labels.items())
+
+    series = histograms.setdefault(name, {})
+    histogram = series.get(label_set)
+    if histogram is None:
+        histogram = series[label_set] = Histogram()
+
+    histogram.record(elapsed_ns)
+
+    if app.state.services.datadog:
+        app.state.services.datadog.histogram(
+            f"bancho.{name}",
+            elapsed_ns / 1e9,
+            tags=_datadog_tags(label_set),
+        )
+
+
+def increment(name: str, value: int = 1, **labels: str) -> None:
+    """Increment the counter `name` by `value`."""
+    label_set = tuple(labels.items())
+
+    series = counters.setdefault(name, {})
+    series[label_set] = series.get(label_set, 0) + value
+
+    if app.state.services.datadog:
+        app.state.services.datadog.increment(
+            f"bancho.{name}",
+            value,
+            tags=_datadog_tags(label_set),
+        )
+
+
+def _format_labels(labels: LabelSet, **extra: str) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+
+    # escape values as per the prometheus text format
+    return (
+        "{"
+        + ",".join(
+            '{}="{}"'.format(
+                key,
+                value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+            )
+            for key, value in pairs
+        )
+        + "}"
+    )
+
+
+def render_prometheus() -> str:
+    """Render all metrics in the prometheus text exposition format."""
+    lines: list[str] = []
+
+    for name, histogram_series in histograms.items():
+        metric = f"bancho_{name}_seconds"
+        lines.append(f"# HELP {metric} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {metric} histogram")
+
+        for labels, histogram in histogram_series.items():
+            cumulative = 0
+            for bound, count in zip(BUCKET_BOUNDS, histogram.counts):
+                cumulative += count
+                bucket_labels = _format_labels(labels, le=repr(bound))
+                lines.append(f"{metric}_bucket{bucket_labels} {cumulative}")
+
+            bucket_labels = _format_labels(labels, le="+Inf")
+            lines.append(f"{metric}_bucket{bucket_labels} {histogram.count}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+
+    for name, counter_series in counters.items():
+        metric = f"bancho_{name}_total"
+        lines.append(f"# HELP {metric} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {metric} counter")
+
+        for labels, value in counter_series.items():
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+    lines.append("")
+    return "\n".join(lines)
@@ -1,8 +1,229 @@
 from __future__ import annotations
 
+import ast
+import math
 from typing import Callable
+from typing import Optional
+from typing import TYPE_CHECKING
 
-__all__ = ("Achievement",)
+if TYPE_CHECKING:
+    from app.objects.score import Score
+
+__all__ = ("AchievementRule", "Achievement", "parse_condition")
+
+# score attributes which achievement conditions may compare with constants
+NUMERIC_ATTRIBUTES = frozenset(
+    ("sr", "max_combo", "acc", "pp", "score", "nmiss", "grade"),
+)
+
+# normalize `constant <op> score.attr` to `score.attr <op> constant`
+FLIPPED_OPS: dict[type[ast.cmpop], type[ast.cmpop]] = {
+    ast.Lt: ast.Gt,
+    ast.LtE: ast.GtE,
+    ast.Gt: ast.Lt,
+    ast.GtE: ast.LtE,
+    ast.Eq: ast.Eq,
+}
+
+
+class AchievementRule:
+    """The structured form of an achievement's condition."""
+
+    def __init__(self) -> None:
+        self.mode: Optional[int] = None  # vanilla mode
+        self.perfect: Optional[bool] = None
+
+        self.mods_exact: Optional[int] = None
+        self.mods_all = 0  # all of these mods must be enabled
+        self.mods_none = 0  # none of these mods may be enabled
+        self.mods_any: list[int] = []  # one of each of these must be enabled
+
+        # {attribute: (lower, lower inclusive, upper, upper inclusive)}
+        self.bounds: dict[str, tuple[float, bool, float, bool]] = {}
+
+    def add_bound(self, attr: str, op: type[ast.cmpop], value: float) -> None:
+        """Narrow the range of `attr` by the comparison `attr <op> value`."""
+        lower, lower_inclusive, upper, upper_inclusive = self.bounds.get(
+            attr,
+            (-math.inf, False, math.inf, False),
+        )
+
+        if op in (ast.Gt, ast.GtE, ast.Eq):
+            inclusive = op is not ast.Gt
+            if value > lower or (value == lower and not inclusive):
+                lower, lower_inclusive = value, inclusive
+
+        if op in (ast.Lt, ast.LtE, ast.Eq):
+            inclusive = op is not ast.Lt
+            if value < upper or (value == upper and not inclusive):
+                upper, upper_inclusive = value, inclusive
+
+        self.bounds[attr] = (lower, lower_inclusive, upper, upper_inclusive)
+
+    def matches(self, score: Score, mode_vn: int) -> bool:
+        if self.mode is not None and mode_vn != self.mode:
+            return False
+
+        if self.perfect is not None and bool(score.perfect) != self.perfect:
+            return False
+
+        mods = int(score.mods)
+        if self.mods_exact is not None and mods != self.mods_exact:
+            return False
+
+        if mods & self.mods_all != self.mods_all or mods & self.mods_none:
+            return False
+
+        if not all(mods & mask for mask in self.mods_any):
+            return False
+
+        for attr, bounds in self.bounds.items():
+            lower, lower_inclusive, upper, upper_inclusive = bounds
+            value = getattr(score, attr)
+
+            if value < lower or (value == lower and not lower_inclusive):
+                return False
+
+            if value > upper or (value == upper and not upper_inclusive):
+                return False
+
+        return True
+
+
+def _is_score_attr(node: ast.expr, attr: Optional[str] = None) -> bool:
+    return (
+        isinstance(node, ast.Attribute)
+        and isinstance(node.value, ast.Name)
+        and node.value.id == "score"
+        and (attr is None or node.attr == attr)
+    )
+
+
+def _constant(node: ast.expr) -> Optional[float]:
+    if (
+        isinstance(node, ast.Constant)
+        and isinstance(node.value, (int, float))
+        and not isinstance(node.value, bool)
+    ):
+        return node.value
+
+    return None
+
+
+def _mods_mask(node: ast.expr) -> Optional[int]:
+    """Return N from `score.mods & N`."""
+    if (
+        isinstance(node, ast.BinOp)
+        and isinstance(node.op, ast.BitAnd)
+        and _is_score_attr(node.left, "mods")
+    ):
+        mask = _constant(node.right)
+        if isinstance(mask, int):
+            return mask
+
+    return None
+
+
+def _parse_comparison(node: ast.Compare, rule: AchievementRule) -> bool:
+    if len(node.ops) == 1:
+        left, op, right = node.left, type(node.ops[0]), node.comparators[0]
+        value = _constant(right)
+
+        # mode_vn == N
+        if isinstance(left, ast.Name) and left.id == "mode_vn":
+            if op is not ast.Eq or not isinstance(value, int):
+                return False
+
+            rule.mode = value
+            return True
+
+        # score.mods == N
+        if _is_score_attr(left, "mods"):
+            if op is not ast.Eq or not isinstance(value, int):
+                return False
+
+            rule.mods_exact = value
+            return True
+
+        # score.mods & N == 0, score.mods & N == N, score.mods & N != 0
+        mask = _mods_mask(left)
+        if mask is not None:
+            if op is ast.Eq and value == 0:
+                rule.mods_none |= mask
+            elif op is ast.Eq and value == mask:
+                rule.mods_all |= mask
+            elif op is ast.NotEq and value == 0:
+                rule.mods_any.append(mask)
+            else:
+                return False
+
+            return True
+
+    # (chained) comparisons of numeric attributes, e.g. 1 <= score.sr < 2
+    operands = [node.left, *node.comparators]
+    for left, op_node, right in zip(operands, node.ops, operands[1:]):
+        op = type(op_node)
+        if op not in FLIPPED_OPS:
+            return False
+
+        if _is_score_attr(left) and _constant(right) is not None:
+            attr_node, value = left, _constant(right)
+        elif _is_score_attr(right) and _constant(left) is not None:
+            attr_node, value, op = right, _constant(left), FLIPPED_OPS[op]
+        else:
+            return False
+
+        assert isinstance(attr_node, ast.Attribute) and value is not None
+        if attr_node.attr not in NUMERIC_ATTRIBUTES:
+            return False
+
+        rule.add_bound(attr_node.attr, op, value)
+
+    return True
+
+
+def _parse_term(node: ast.expr, rule: AchievementRule) -> bool:
+    # score.perfect, not score.perfect
+    if _is_score_attr(node, "perfect"):
+        rule.perfect = True
+        return True
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        if _is_score_attr(node.operand, "perfect"):
+            rule.perfect = False
+            return True
+
+        return False
+
+    # score.mods & N
+    mask = _mods_mask(node)
+    if mask is not None:
+        rule.mods_any.append(mask)
+        return True
+
+    if isinstance(node, ast.Compare):
+        return _parse_comparison(node, rule)
+
+    return False
+
+
+def parse_condition(cond: str) -> Optional[AchievementRule]:
+    """Parse an achievement's condition into a rule, if it's of a known form."""
+    try:
+        expr = ast.parse(cond, mode="eval").body
+    except SyntaxError:
+        return None
+
+    if isinstance(expr, ast.BoolOp) and isinstance(expr.op, ast.And):
+        terms = expr.values
+    else:
+        terms = [expr]
+
+    rule = AchievementRule()
+    if not all(_parse_term(term, rule) for term in terms):
+        return None
+
+    return rule
 
 
 class Achievement:
@@ -14,14 +235,31 @@ class Achievement:
         file: str,
         name: str,
         desc: str,
-        cond: Callable,
+        cond: str,
     ) -> None:
         self.id = id
         self.file = file
         self.name = name
         self.desc = desc
 
+        # NOTE: achievement conditions are stored as stringified python
+        # expressions in the database to allow for extensive customizability.
+        # most take a few common forms, which are parsed into rules that can
+        # be indexed; anything else is evaluated as python.
         self.cond = cond
+        self.rule = parse_condition(cond)
+
+        self._cond_func: Optional[Callable[[Score, int], bool]] = None
+        if self.rule is None:
+            self._cond_func = eval(f"lambda score, mode_vn: {cond}")
 
     def __repr__(self) -> str:
         return f"{self.file}+{self.name}+{self.desc}"
+
+    def matches(self, score: Score, mode_vn: int) -> bool:
+        """Check whether `score` meets this achievement's condition."""
+        if self.rule is not None:
+            return self.rule.matches(score, mode_vn)
+
+        assert self._cond_func is not None
+        return bool(self._cond_func(score, mode_vn))
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 import functools
 import hashlib
+import time
 from collections import defaultdict
 from datetime import datetime
 from datetime import timedelta
@@ -9,22 +11,35 @@ from enum import IntEnum
 from enum import unique
 from pathlib import Path
 from typing import Any
+from typing import Iterable
 from typing import Mapping
 from typing import Optional
+from typing import Sequence
 
+import app.metrics
 import app.settings
 import app.state
+import app.usecases.replays
 import app.utils
 from app.constants.gamemodes import GameMode
 from app.logging import Ansi
 from app.logging import log
 from app.repositories import maps as maps_repo
+from app.repositories import ratings as ratings_repo
+from app.repositories import scores as scores_repo
 from app.utils import escape_enum
 from app.utils import pymysql_encode
 
 # from dataclasses import dataclass
 
-__all__ = ("ensure_local_osu_file", "RankedStatus", "Beatmap", "BeatmapSet")
+__all__ = (
+    "ensure_local_osu_file",
+    "RankedStatus",
+    "Beatmap",
+    "BeatmapSet",
+    "warm_beatmap_cache",
+    "run_beatmap_refresher",
+)
 
 BEATMAPS_PATH = Path.cwd() / ".data/osu"
 
@@ -32,6 +47,22 @@ DEFAULT_LAST_UPDATE = datetime(1970, 1, 1)
 
 IGNORED_BEATMAP_CHARS = dict.fromkeys(map(ord, r':\/*<>?"|'), None)
 
+# the most osu!api requests we'll have in flight at once,
+# e.g. when fetching many uncached maps for a listing.
+OSU_API_MAX_CONCURRENT_REQUESTS = 8
+
+_osu_api_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_osu_api_semaphore() -> asyncio.Semaphore:
+    # created lazily, so it's bound to the running event loop
+    global _osu_api_semaphore
+
+    if _osu_api_semaphore is None:
+        _osu_api_semaphore = asyncio.Semaphore(OSU_API_MAX_CONCURRENT_REQUESTS)
+
+    return _osu_api_semaphore
+
 
 async def api_get_beatmaps(**params: Any) -> Optional[list[dict[str, Any]]]:
     """\
@@ -50,10 +81,11 @@ async def api_get_beatmaps(**params: Any) -> Optional[list[dict[str, Any]]]:
         # https://doc.kitsu.moe/
         url = "https://kitsu.moe/api/get_beatmaps"
 
-    async with app.state.services.http_client.get(url, params=params) as response:
-        response_data = await response.json()
-        if response.status == 200 and response_data:  # (data may be [])
-            return response_data
+    async with _get_osu_api_semaphore():
+        async with app.state.services.http_client.get(url, params=params) as response:
+            response_data = await response.json()
+            if response.status == 200 and response_data:  # (data may be [])
+                return response_data
 
     return None
 
@@ -245,6 +277,36 @@ class Beatmap:
         # XXX: This is set when a map's status is manually changed.
     """
 
+    # slotted; the beatmap cache may hold hundreds of thousands of these.
+    __slots__ = (
+        "set",
+        "server",
+        "md5",
+        "id",
+        "set_id",
+        "artist",
+        "title",
+        "version",
+        "creator",
+        "last_update",
+        "total_length",
+        "max_combo",
+        "status",
+        "frozen",
+        "plays",
+        "passes",
+        "mode",
+        "bpm",
+        "cs",
+        "od",
+        "ar",
+        "hp",
+        "diff",
+        "filename",
+        "rating_sum",
+        "num_ratings",
+    )
+
     def __init__(self, map_set: BeatmapSet, **kwargs: Any) -> None:
         self.set = map_set
         self.server = kwargs.get("server", "osu!")
@@ -279,6 +341,10 @@ class Beatmap:
 
         self.filename = kwargs.get("filename", "")
 
+        # rating aggregates, loaded on first use
+        self.rating_sum: Optional[int] = None
+        self.num_ratings: Optional[int] = None
+
     def __repr__(self) -> str:
         return self.full_name
 
@@ -388,11 +454,52 @@ class Beatmap:
                 return bmap
 
         if bmap is not None:
-            if bmap.set._cache_expired():
-                await bmap.set._update_if_available()
+            await bmap.set._refresh_if_expired()
 
         return bmap
 
+    @classmethod
+    async def from_md5_many(cls, md5s: Iterable[str]) -> dict[str, Beatmap]:
+        """Fetch many maps from the cache, database, or osuapi by md5."""
+        md5s = list(dict.fromkeys(md5s))
+
+        set_ids: set[int] = set()
+        missing: list[str] = []
+
+        for md5 in md5s:
+            bmap = await cls._from_md5_cache(md5)
+            if bmap is not None:
+                set_ids.add(bmap.set_id)
+            else:
+                missing.append(md5)
+
+        if missing:
+            # find the sets of the uncached maps in the database
+            found: set[str] = set()
+            for row in await maps_repo.fetch_many_by_md5s(missing):
+                set_ids.add(row["set_id"])
+                found.add(row["md5"])
+
+            # and whatever's left from the api, concurrently
+            missing = [md5 for md5 in missing if md5 not in found]
+            for api_data in await asyncio.gather(
+                *[api_get_beatmaps(h=md5) for md5 in missing],
+            ):
+                if api_data:
+                    set_ids.add(int(api_data[0]["beatmapset_id"]))
+
+        # fetch (and cache) the beatmap sets, which
+        # also ensures the maps are up to date
+        await BeatmapSet.from_bsid_many(set_ids)
+
+        bmaps: dict[str, Beatmap] = {}
+        for md5 in md5s:
+            bmap = await cls._from_md5_cache(md5)
+            if bmap is not None:
+                bmaps[md5] = bmap
+
+        return bmaps
+
     @classmethod
     async def from_bid(cls, bid: int) -> Optional[Beatmap]:
         """Fetch a map from the cache, database, or osuapi by id."""
@@ -430,8 +537,7 @@ class Beatmap:
                 return bmap
 
         if bmap is not None:
-            if bmap.set._cache_expired():
-                await bmap.set._update_if_available()
+            await bmap.set._refresh_if_expired()
 
         return bmap
 
@@ -511,16 +617,26 @@ class Beatmap:
         return app.state.cache.beatmap.get(bid, None)
 
     async def fetch_rating(self) -> Optional[float]:
-        """Fetch the beatmap's rating from sql."""
-        row = await app.state.services.database.fetch_one(
-            "SELECT AVG(rating) rating FROM ratings WHERE map_md5 = :map_md5",
-            {"map_md5": self.md5},
-        )
+        """Fetch the beatmap's average rating, caching its aggregates."""
+        if self.num_ratings is None:
+            rec = await ratings_repo.fetch_one(self.md5)
+
+            if rec is not None:
+                self.set_rating_aggregates(rec["rating_sum"], rec["num_ratings"])
+            else:
+                self.set_rating_aggregates(0, 0)
+
+        assert self.rating_sum is not None and self.num_ratings is not None
 
-        if row is None:
+        if self.num_ratings == 0:
             return None
 
-        return row["rating"]
+        return self.rating_sum / self.num_ratings
+
+    def set_rating_aggregates(self, rating_sum: int, num_ratings: int) -> None:
+        """Update the beatmap's cached rating aggregates."""
+        self.rating_sum = rating_sum
+        self.num_ratings = num_ratings
 
 
 class BeatmapSet:
@@ -548,10 +664,13 @@ class BeatmapSet:
       await BeatmapSet._from_bsid_osuapi(bsid: int) -> Optional[BeatmapSet]
 
       BeatmapSet._cache_expired() -> bool
+      await BeatmapSet._refresh_if_expired() -> None
       await BeatmapSet._update_if_available() -> None
       await BeatmapSet._save_to_sql() -> None
     """
 
+    __slots__ = ("id", "server", "maps", "last_osuapi_check")
+
     def __init__(
         self,
         id: int,
@@ -628,6 +747,25 @@ class BeatmapSet:
 
         return current_datetime > (self.last_osuapi_check + check_delta)
 
+    async def _refresh_if_expired(self) -> None:
+        """Refresh the set if its cache has expired; in the background
+        if the refresher is running, serving the cached version until then."""
+        if not self._cache_expired():
+            return
+
+        if _refresh_queue is None:
+            await self._update_if_available()
+            return
+
+        app.metrics.increment("beatmap_sets_served_stale")
+
+        if self.id not in _refreshing:
+            _refreshing[self.id] = self
+
+            # the most played sets are refreshed first
+            popularity = sum(bmap.plays for bmap in self.maps)
+            _refresh_queue.put_nowait((-popularity, time.time(), self.id))
+
     async def _update_if_available(self) -> None:
         """Fetch the newest data from the api, check for differences
         and propogate any update into our cache & database."""
@@ -681,6 +819,10 @@ class BeatmapSet:
                     bmap.passes = 0
                     bmap.plays = 0
 
+                    # ratings are fetched lazily
+                    bmap.rating_sum = None
+                    bmap.num_ratings = None
+
                     bmap.set = self
                     updated_maps.append(bmap)
 
@@ -698,10 +840,8 @@ class BeatmapSet:
 
                 # delete scores on the maps
                 # TODO: if we add FKs to db, won't need this?
-                await app.state.services.database.execute(
-                    "DELETE FROM scores WHERE map_md5 IN :map_md5s",
-                    {"map_md5s": map_md5s_to_delete},
-                )
+                await app.usecases.replays.delete_replays_on_maps(map_md5s_to_delete)
+                await scores_repo.delete_by_map_md5s(map_md5s_to_delete)
 
             # update last_osuapi_check
             await app.state.services.database.execute(
@@ -725,10 +865,8 @@ class BeatmapSet:
 
             # delete scores on the maps
             # TODO: if we add FKs to db, won't need this?
-            await app.state.services.database.execute(
-                "DELETE FROM scores WHERE map_md5 IN :map_md5s",
-                {"map_md5s": map_md5s_to_delete},
-            )
+            await app.usecases.replays.delete_replays_on_maps(map_md5s_to_delete)
+            await scores_repo.delete_by_map_md5s(map_md5s_to_delete)
 
             # delete set
             await app.state.services.database.execute(
@@ -790,68 +928,103 @@ class BeatmapSet:
         return app.state.cache.beatmapset.get(bsid, None)
 
     @classmethod
-    async def _from_bsid_sql(cls, bsid: int) -> Optional[BeatmapSet]:
-        """Fetch a mapset from the database by set id."""
-        async with app.state.services.database.connection() as db_conn:
-            rec = await db_conn.fetch_one(
-                "SELECT last_osuapi_check, server FROM mapsets WHERE id = :set_id",
-                {"set_id": bsid},
+    def _from_rows(
+        cls,
+        bsid: int,
+        last_osuapi_check: datetime,
+        server: str,
+        rows: Sequence[Mapping[str, Any]],
+    ) -> BeatmapSet:
+        """Create a mapset from its maps' rows in the database."""
+        bmap_set = cls(id=bsid, last_osuapi_check=last_osuapi_check, server=server)
+
+        for row in rows:
+            bmap = Beatmap(
+                md5=row["md5"],
+                id=row["id"],
+                server=row["server"],
+                set_id=row["set_id"],
+                artist=row["artist"],
+                title=row["title"],
+                version=row["version"],
+                creator=row["creator"],
+                last_update=row["last_update"],
+                total_length=row["total_length"],
+                max_combo=row["max_combo"],
+                status=row["status"],
+                frozen=row["frozen"],
+                plays=row["plays"],
+                passes=row["passes"],
+                mode=row["mode"],
+                bpm=row["bpm"],
+                cs=row["cs"],
+                od=row["od"],
+                ar=row["ar"],
+                hp=row["hp"],
+                diff=row["diff"],
+                filename=row["filename"],
+                map_set=bmap_set,
             )
 
-            if rec is None or rec['last_osuapi_check'] is None:
-                return None
-            rec = dict(rec)
-
-            bmap_set = cls(id=bsid, last_osuapi_check=rec['last_osuapi_check'], server=rec['server'])
-
-            for row in await maps_repo.fetch_many(set_id=bsid):
-                bmap = Beatmap(
-                    md5=row["md5"],
-                    id=row["id"],
-                    server=row["server"],
-                    set_id=row["set_id"],
-                    artist=row["artist"],
-                    title=row["title"],
-                    version=row["version"],
-                    creator=row["creator"],
-                    last_update=row["last_update"],
-                    total_length=row["total_length"],
-                    max_combo=row["max_combo"],
-                    status=row["status"],
-                    frozen=row["frozen"],
-                    plays=row["plays"],
-                    passes=row["passes"],
-                    mode=row["mode"],
-                    bpm=row["bpm"],
-                    cs=row["cs"],
-                    od=row["od"],
-                    ar=row["ar"],
-                    hp=row["hp"],
-                    diff=row["diff"],
-                    filename=row["filename"],
-                    map_set=bmap_set,
-                )
-
-                # XXX: tempfix for bancho.py <v3.4.1,
-                # where filenames weren't stored.
-                if not bmap.filename:
-                    bmap.filename = (
-                        ("{artist} - {title} ({creator}) [{version}].osu")
-                        .format(
-                            artist=row["artist"],
-                            title=row["title"],
-                            creator=row["creator"],
-                            version=row["version"],
-                        )
-                        .translate(IGNORED_BEATMAP_CHARS)
+            # XXX: tempfix for bancho.py <v3.4.1,
+            # where filenames weren't stored.
+            if not bmap.filename:
+                bmap.filename = (
+                    ("{artist} - {title} ({creator}) [{version}].osu")
+                    .format(
+                        artist=row["artist"],
+                        title=row["title"],
+                        creator=row["creator"],
+                        version=row["version"],
                     )
+                    .translate(IGNORED_BEATMAP_CHARS)
+                )
 
-                    await maps_repo.update(bmap.server, bmap.id, filename=bmap.filename)
+            bmap_set.maps.append(bmap)
 
-                bmap_set.maps.append(bmap)
+        return bmap_set
 
+    @classmethod
+    async def _from_sql_rows(
+        cls,
+        bsid: int,
+        last_osuapi_check: datetime,
+        server: str,
+        rows: Sequence[Mapping[str, Any]],
+    ) -> BeatmapSet:
+        """Create a mapset from its maps' rows in the database,
+        saving any filenames which had to be generated."""
+        bmap_set = cls._from_rows(bsid, last_osuapi_check, server, rows)
+        await bmap_set._save_generated_filenames(rows)
         return bmap_set
 
+    async def _save_generated_filenames(
+        self,
+        rows: Sequence[Mapping[str, Any]],
+    ) -> None:
+        """Save the filenames generated for maps from `rows` without them."""
+        for bmap, row in zip(self.maps, rows):
+            if not row["filename"]:
+                await maps_repo.update(bmap.server, bmap.id, filename=bmap.filename)
+
+    @classmethod
+    async def _from_bsid_sql(cls, bsid: int) -> Optional[BeatmapSet]:
+        """Fetch a mapset from the database by set id."""
+        rec = await app.state.services.database.fetch_one(
+            "SELECT last_osuapi_check, server FROM mapsets WHERE id = :set_id",
+            {"set_id": bsid},
+        )
+
+        if rec is None or rec["last_osuapi_check"] is None:
+            return None
+
+        return await cls._from_sql_rows(
+            bsid,
+            rec["last_osuapi_check"],
+            rec["server"],
+            await maps_repo.fetch_many(set_id=bsid),
+        )
+
     @classmethod
     async def _from_bsid_osuapi(cls, bsid: int) -> Optional[BeatmapSet]:
         """Fetch a mapset from the osu!api by set id."""
@@ -886,6 +1059,10 @@ class BeatmapSet:
                 bmap.passes = 0
                 bmap.plays = 0
 
+                # ratings are fetched lazily
+                bmap.rating_sum = None
+                bmap.num_ratings = None
+
                 bmap.set = self
                 self.maps.append(bmap)
 
@@ -922,8 +1099,8 @@ class BeatmapSet:
         # TODO: this can be done less often for certain types of maps,
         # such as ones that're ranked on bancho and won't be updated,
         # and perhaps ones that haven't been updated in a long time.
-        if not did_api_request and bmap_set._cache_expired():
-            await bmap_set._update_if_available()
+        if not did_api_request:
+            await bmap_set._refresh_if_expired()
 
         # cache the beatmap set, and beatmaps
         # to be efficient in future requests
@@ -931,6 +1108,71 @@ class BeatmapSet:
 
         return bmap_set
 
+    @classmethod
+    async def from_bsid_many(cls, bsids: Iterable[int]) -> dict[int, BeatmapSet]:
+        """Cache all maps in many sets from the cache, database, or osuapi."""
+        bmap_sets: dict[int, BeatmapSet] = {}
+        missing: list[int] = []
+
+        for bsid in dict.fromkeys(bsids):
+            bmap_set = await cls._from_bsid_cache(bsid)
+            if bmap_set is not None:
+                bmap_sets[bsid] = bmap_set
+            else:
+                missing.append(bsid)
+
+        # sets fetched from the api are already up to date
+        from_api: set[int] = set()
+
+        if missing:
+            # fetch the uncached sets from the database at once
+            recs = await app.state.services.database.fetch_all(
+                "SELECT id, last_osuapi_check, server FROM mapsets WHERE id IN :set_ids",
+                {"set_ids": missing},
+            )
+            recs = [rec for rec in recs if rec["last_osuapi_check"] is not None]
+
+            rows: defaultdict[int, list[dict[str, Any]]] = defaultdict(list)
+            for row in await maps_repo.fetch_many_by_set_ids(
+                [rec["id"] for rec in recs],
+            ):
+                rows[row["set_id"]].append(row)
+
+            for rec in recs:
+                if rec["id"] not in bmap_sets:
+                    bmap_sets[rec["id"]] = await cls._from_sql_rows(
+                        rec["id"],
+                        rec["last_osuapi_check"],
+                        rec["server"],
+                        rows[rec["id"]],
+                    )
+
+            # and whatever's left from the api, concurrently
+            missing = [bsid for bsid in missing if bsid not in bmap_sets]
+            api_sets = await asyncio.gather(
+                *[cls._from_bsid_osuapi(bsid) for bsid in missing],
+            )
+
+            for bsid, bmap_set in zip(missing, api_sets):
+                if bmap_set is not None:
+                    bmap_sets[bsid] = bmap_set
+                    from_api.add(bsid)
+
+        await asyncio.gather(
+            *[
+                bmap_set._refresh_if_expired()
+                for bsid, bmap_set in bmap_sets.items()
+                if bsid not in from_api
+            ],
+        )
+
+        # cache the beatmap sets, and beatmaps
+        # to be efficient in future requests
+        for bmap_set in bmap_sets.values():
+            cache_beatmap_set(bmap_set)
+
+        return bmap_sets
+
 
 def cache_beatmap(beatmap: Beatmap) -> None:
     """Add the beatmap to the cache."""
@@ -944,3 +1186,111 @@ def cache_beatmap_set(beatmap_set: BeatmapSet) -> None:
 
     for beatmap in beatmap_set.maps:
         cache_beatmap(beatmap)
+
+
+# expired sets are refreshed from the osu!api by background workers,
+# while their cached versions continue to be served.
+REFRESH_CONCURRENCY = 4
+
+# (-popularity, queued at, set id)
+_refresh_queue: Optional[asyncio.PriorityQueue[tuple[int, float, int]]] = None
+# {set_id: set} of sets queued or being refreshed
+_refreshing: dict[int, BeatmapSet] = {}
+
+
+async def _refresh_worker(queue: asyncio.PriorityQueue[tuple[int, float, int]]) -> None:
+    while True:
+        _, _, set_id = await queue.get()
+        bmap_set = _refreshing[set_id]
+
+        try:
+            await bmap_set._update_if_available()
+
+            # the set's maps may have changed
+            cache_beatmap_set(bmap_set)
+        except Exception as exc:
+            log(f"Failed to refresh beatmap set {set_id}: {exc!r}", Ansi.LRED)
+        finally:
+            del _refreshing[set_id]
+
+
+async def run_beatmap_refresher() -> None:
+    """Refresh expired beatmap sets in the background, until cancelled."""
+    global _refresh_queue
+
+    queue = _refresh_queue = asyncio.PriorityQueue()
+
+    try:
+        await asyncio.gather(
+            *[_refresh_worker(queue) for _ in range(REFRESH_CONCURRENCY)],
+        )
+    finally:
+        _refresh_queue = None
+        _refreshing.clear()
+
+
+# sets with leaderboards are warmed even if they haven't been played
+WARMUP_STATUSES = [
+    RankedStatus.Ranked,
+    RankedStatus.Approved,
+    RankedStatus.Qualified,
+    RankedStatus.Loved,
+]
+WARMUP_LOG_INTERVAL = 5000  # sets
+
+
+async def warm_beatmap_cache(limit: int) -> None:
+    """Load the `limit` most played beatmap sets into the cache, in bulk."""
+    log(f"Warming the beatmap cache with up to {limit:,} sets.", Ansi.LCYAN)
+    start_time = time.time()
+
+    num_sets = 0
+    set_rows: list[dict[str, Any]] = []
+
+    # sets whose maps' filenames need saving, once we're done streaming
+    unnamed_sets: list[tuple[BeatmapSet, list[dict[str, Any]]]] = []
+
+    def warm_set(rows: list[dict[str, Any]]) -> None:
+        nonlocal num_sets
+
+        # sets which have already been loaded may be more up to date
+        if rows[0]["set_id"] not in app.state.cache.beatmapset:
+            bmap_set = BeatmapSet._from_rows(
+                rows[0]["set_id"],
+                rows[0]["last_osuapi_check"],
+                rows[0]["server"],
+                rows,
+            )
+            cache_beatmap_set(bmap_set)
+
+            if not all(row["filename"] for row in rows):
+                unnamed_sets.append((bmap_set, rows))
+
+        num_sets += 1
+        if num_sets % WARMUP_LOG_INTERVAL == 0:
+            log(f"Warmed {num_sets:,}/{limit:,} beatmap sets.", Ansi.LCYAN)
+
+    # rows are ordered by set, so each set is complete
+    # once we've seen a row from the next set
+    async for rows in maps_repo.iterate_popular_sets(limit, WARMUP_STATUSES):
+        for row in rows:
+            if set_rows and row["set_id"] != set_rows[0]["set_id"]:
+                warm_set(set_rows)
+                set_rows = []
+
+            set_rows.append(row)
+
+        # let other tasks run between batches
+        await asyncio.sleep(0)
+
+    if set_rows:
+        warm_set(set_rows)
+
+    for bmap_set, rows in unnamed_sets:
+        await bmap_set._save_generated_filenames(rows)
+
+    log(
+        f"Warmed the beatmap cache with {num_sets:,} sets "
+        f"in {time.time() - start_time:.2f}s.",
+        Ansi.LCYAN,
+    )
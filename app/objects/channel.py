@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+from typing import KeysView
 from typing import Sequence
 from typing import TYPE_CHECKING
 
 import app.packets
+import app.settings
 import app.state
 from app.constants.privileges import Privileges
 
@@ -28,6 +30,10 @@ class Channel:
     instance: `bool`
         Instanced channels are deleted when all players have left;
         this is useful for things like multiplayer, spectator, etc.
+
+    players: KeysView[`Player`]
+        The channel's members, in the order they joined. This is
+        backed by a dict, so membership checks & removal are O(1).
     """
 
     def __init__(
@@ -55,13 +61,26 @@ class Channel:
         self.auto_join = auto_join
         self.instance = instance
 
-        self.players: list[Player] = []
+        self._players: dict[Player, None] = {}  # insertion-ordered set
 
     def __repr__(self) -> str:
         return f"<{self._name}>"
 
     def __contains__(self, player: Player) -> bool:
-        return player in self.players
+        return player in self._players
+
+    @property
+    def players(self) -> KeysView[Player]:
+        return self._players.keys()
+
+    @property
+    def shared(self) -> bool:
+        """Whether messages are relayed to the channel's members on other workers."""
+        # matches (and so their chats & the lobby) and spectator
+        # sessions only exist on the worker which created them.
+        return (
+            app.settings.MULTI_WORKER and not self.instance and self._name != "#lobby"
+        )
 
     # XXX: should this be cached differently?
 
@@ -90,6 +109,9 @@ class Channel:
             if sender.id not in player.blocks and (to_self or player.id != sender.id):
                 player.enqueue(data)
 
+        if self.shared:
+            app.state.bus.broadcast_channel(self._name, data, sender_id=sender.id)
+
     def send_bot(self, msg: str) -> None:
         """Enqueue `msg` to all connected clients from bot."""
         bot = app.state.sessions.bot
@@ -121,13 +143,13 @@ class Channel:
 
     def append(self, player: Player) -> None:
         """Add `player` to the channel's players."""
-        self.players.append(player)
+        self._players[player] = None
 
     def remove(self, player: Player) -> None:
         """Remove `player` from the channel's players."""
-        self.players.remove(player)
+        del self._players[player]
 
-        if not self.players and self.instance:
+        if not self._players and self.instance:
             # if it's an instance channel and this
             # is the last member leaving, just remove
             # the channel from the global list.
@@ -138,3 +160,6 @@ class Channel:
         for player in self.players:
             if player.id not in immune:
                 player.enqueue(data)
+
+        if self.shared:
+            app.state.bus.broadcast_channel(self._name, data, immune)
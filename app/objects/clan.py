@@ -54,6 +54,8 @@ class Clan:
         player.clan = self
         player.clan_priv = ClanPrivileges.Member
 
+        app.state.sessions.players.invalidate(player.id)
+
     async def remove_member(self, player: Player) -> None:
         """Remove a given player from the clan's members."""
         self.member_ids.remove(player.id)
@@ -72,9 +74,12 @@ class Clan:
 
             await clans_repo.update(self.id, owner=self.owner_id)
             await players_repo.update(self.owner_id, clan_priv=ClanPrivileges.Owner)
+            app.state.sessions.players.invalidate(self.owner_id)
 
         player.clan = None
         player.clan_priv = None
 
+        app.state.sessions.players.invalidate(player.id)
+
     def __repr__(self) -> str:
         return f"[{self.tag}] {self.name}"
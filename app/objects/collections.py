@@ -2,11 +2,16 @@
 # in a lot of these classes; needs refactor.
 from __future__ import annotations
 
+import bisect
+import math
+import time
+from typing import Any
 from typing import Iterable
 from typing import Iterator
 from typing import Optional
 from typing import overload
 from typing import Sequence
+from typing import TYPE_CHECKING
 from typing import Union
 
 import databases.core
@@ -30,12 +35,16 @@ from app.repositories import clans as clans_repo
 from app.repositories import players as players_repo
 from app.utils import make_safe_name
 
+if TYPE_CHECKING:
+    from app.objects.score import Score
+
 __all__ = (
     "Channels",
     "Matches",
     "Players",
     "MapPools",
     "Clans",
+    "Achievements",
     "initialize_ram_caches",
 )
 
@@ -46,6 +55,18 @@ __all__ = (
 class Channels(list[Channel]):
     """The currently active chat channels on the server."""
 
+    def __init__(self) -> None:
+        super().__init__()
+        self._by_name: dict[str, Channel] = {}  # {_name: channel}
+
+        # the multiplayer lobby is used by every match
+        # event, so we keep a direct reference to it.
+        self.lobby: Optional[Channel] = None
+
+        # channels whose member counts have changed since the
+        # last broadcast; flushed periodically by housekeeping.
+        self._info_outdated: dict[Channel, None] = {}
+
     def __iter__(self) -> Iterator[Channel]:
         return super().__iter__()
 
@@ -53,9 +74,9 @@ class Channels(list[Channel]):
         """Check whether internal list contains `o`."""
         # Allow string to be passed to compare vs. name.
         if isinstance(o, str):
-            return o in (chan.name for chan in self)
+            return o in self._by_name
         else:
-            return super().__contains__(o)
+            return self._by_name.get(o._name) is o
 
     @overload
     def __getitem__(self, index: int) -> Channel:
@@ -88,23 +109,30 @@ class Channels(list[Channel]):
 
     def get_by_name(self, name: str) -> Optional[Channel]:
         """Get a channel from the list by `name`."""
-        for channel in self:
-            if channel._name == name:
-                return channel
+        return self._by_name.get(name)
 
-        return None
+    def _index(self, channel: Channel) -> None:
+        self._by_name[channel._name] = channel
+
+        if channel._name == "#lobby":
+            self.lobby = channel
 
     def append(self, channel: Channel) -> None:
         """Append `channel` to the list."""
         super().append(channel)
+        self._index(channel)
 
         if app.settings.DEBUG:
             log(f"{channel} added to channels list.")
 
     def extend(self, channels: Iterable[Channel]) -> None:
         """Extend the list with `channels`."""
+        channels = list(channels)
         super().extend(channels)
 
+        for channel in channels:
+            self._index(channel)
+
         if app.settings.DEBUG:
             log(f"{channels} added to channels list.")
 
@@ -112,9 +140,46 @@ class Channels(list[Channel]):
         """Remove `channel` from the list."""
         super().remove(channel)
 
+        if self._by_name.get(channel._name) is channel:
+            del self._by_name[channel._name]
+
+        if self.lobby is channel:
+            self.lobby = None
+
+        self._info_outdated.pop(channel, None)
+
         if app.settings.DEBUG:
             log(f"{channel} removed from channels list.")
 
+    def mark_info_outdated(self, channel: Channel) -> None:
+        """Schedule `channel`'s member count to be broadcast."""
+        self._info_outdated[channel] = None
+
+    def flush_info(self) -> None:
+        """Broadcast the member counts of all outdated channels."""
+        if not self._info_outdated:
+            return
+
+        # coalesce the packets of channels which share read privileges,
+        # so each player gets at most one enqueue per privilege group.
+        groups: dict[Privileges, bytearray] = {}
+        for channel in self._info_outdated:
+            data = app.packets.channel_info(
+                channel.name,
+                channel.topic,
+                len(channel.players),
+            )
+            groups.setdefault(channel.read_priv, bytearray()).extend(data)
+
+        self._info_outdated.clear()
+
+        group_data = [(read_priv, bytes(data)) for read_priv, data in groups.items()]
+
+        for player in app.state.sessions.players:
+            for read_priv, data in group_data:
+                if not read_priv or player.priv & read_priv:
+                    player.enqueue(data)
+
     async def prepare(self, db_conn: databases.core.Connection) -> None:
         """Fetch data from sql & return; preparing to run the server."""
         log("Fetching channels from sql.", Ansi.LCYAN)
@@ -181,12 +246,36 @@ class Matches(list[Optional[Match]]):
             log(f"{match} removed from matches list.")
 
 
+# offline players are cached briefly, as the same few (clan members,
+# leaderboard regulars, etc.) tend to be requested together repeatedly.
+OFFLINE_CACHE_TTL = 120  # seconds
+OFFLINE_CACHE_MAX_SIZE = 2048
+
+
 class Players(list[Player]):
     """The currently active players on the server."""
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        # {player_id: presence + stats packets} of all unrestricted players,
+        # concatenated into a snapshot which is sent to players on login.
+        self._presences: dict[int, bytes] = {}
+        self._presence_snapshot: Optional[bytes] = None
+
+        # {player_id: worker_id} of the segments of players
+        # online through other workers (in multi-worker mode).
+        self._remote_presences: dict[int, str] = {}
+
+        # indexes of the online players, for the lookups made on every request.
+        self._by_id: dict[int, Player] = {}
+        self._by_token: dict[str, Player] = {}
+        self._by_name: dict[str, Player] = {}  # by safe name
+
+        # {player_id: (expiry, player)} of offline players loaded from sql;
+        # insertion ordered, so the oldest entries are evicted first.
+        self._offline: dict[int, tuple[float, Player]] = {}
+
     def __iter__(self) -> Iterator[Player]:
         return super().__iter__()
 
@@ -194,9 +283,9 @@ class Players(list[Player]):
         # allow us to either pass in the player
         # obj, or the player name as a string.
         if isinstance(player, str):
-            return player in (player.name for player in self)
+            return make_safe_name(player) in self._by_name
         else:
-            return super().__contains__(player)
+            return self._by_id.get(player.id) is player
 
     def __repr__(self) -> str:
         return f'[{", ".join(map(repr, self))}]'
@@ -221,12 +310,102 @@ class Players(list[Player]):
         """Return a set of the current unrestricted players."""
         return {p for p in self if p.priv & Privileges.UNRESTRICTED}
 
+    @property
+    def presence_snapshot(self) -> bytes:
+        """The presence & stats packets of all unrestricted players."""
+        if self._presence_snapshot is None:
+            self._presence_snapshot = b"".join(self._presences.values())
+
+        return self._presence_snapshot
+
+    def _set_presence(self, player: Player) -> None:
+        if player is app.state.sessions.bot:
+            # optimization for bot since it's
+            # the most frequently requested user
+            presence = app.packets.bot_presence(player) + app.packets.bot_stats(player)
+        else:
+            presence = app.packets.user_presence(player)
+            presence += app.packets.user_stats(player)
+
+        self._presences[player.id] = presence
+        self._presence_snapshot = None
+        self._remote_presences.pop(player.id, None)
+
+        if app.settings.MULTI_WORKER and player is not app.state.sessions.bot:
+            app.state.bus.update_presence(player.id, presence)
+
+    def update_presence(self, player: Player) -> None:
+        """Replace `player`'s segment of the presence snapshot."""
+        if player.id not in self._presences or player.id in self._remote_presences:
+            return
+
+        if player.restricted:
+            del self._presences[player.id]
+            self._presence_snapshot = None
+
+            if app.settings.MULTI_WORKER:
+                app.state.bus.update_presence(player.id, None)
+        else:
+            self._set_presence(player)
+
+    def set_remote_presence(
+        self,
+        player_id: int,
+        data: Optional[bytes],
+        worker_id: str,
+    ) -> None:
+        """Set the snapshot segment of a player online through another worker."""
+        if data is not None:
+            self._presences[player_id] = data
+            self._remote_presences[player_id] = worker_id
+        elif self._remote_presences.get(player_id) == worker_id:
+            # only the worker which set the segment may remove it; the
+            # player may have since logged in through another worker.
+            del self._presences[player_id]
+            del self._remote_presences[player_id]
+        else:
+            return
+
+        self._presence_snapshot = None
+
+    def remove_remote_presences(self, worker_id: str) -> None:
+        """Remove the snapshot segments of all players online through a worker."""
+        player_ids = [
+            player_id
+            for player_id, remote_worker_id in self._remote_presences.items()
+            if remote_worker_id == worker_id
+        ]
+
+        for player_id in player_ids:
+            del self._presences[player_id]
+            del self._remote_presences[player_id]
+
+        if player_ids:
+            self._presence_snapshot = None
+
+    @property
+    def remote_workers(self) -> set[str]:
+        """Return a set of the workers which we have snapshot segments from."""
+        return set(self._remote_presences.values())
+
+    def publish_presences(self) -> None:
+        """Publish the snapshot segments of our own players to other workers."""
+        for player_id, presence in self._presences.items():
+            if (
+                player_id not in self._remote_presences
+                and player_id != app.state.sessions.bot.id
+            ):
+                app.state.bus.update_presence(player_id, presence)
+
     def enqueue(self, data: bytes, immune: Sequence[Player] = []) -> None:
         """Enqueue `data` to all players, except for those in `immune`."""
         for player in self:
             if player not in immune:
                 player.enqueue(data)
 
+        if app.settings.MULTI_WORKER:
+            app.state.bus.broadcast(data, [player.id for player in immune])
+
     def get(
         self,
         token: Optional[str] = None,
@@ -235,23 +414,43 @@ class Players(list[Player]):
         discord_id: Optional[int] = None,
     ) -> Optional[Player]:
         """Get a player by token, id, or name from cache."""
-        # TODO: optimize
-        for player in self:
-            if token is not None:
-                if player.token == token:
-                    return player
-            elif id is not None:
-                if player.id == id:
-                    return player
-            elif name is not None:
-                if player.safe_name == make_safe_name(name):
-                    return player
-            elif discord_id is not None:
+        if token is not None:
+            return self._by_token.get(token)
+        elif id is not None:
+            return self._by_id.get(id)
+        elif name is not None:
+            return self._by_name.get(make_safe_name(name))
+        elif discord_id is not None:
+            for player in self:
                 if player.discord_id == discord_id:
                     return player
 
         return None
 
+    @staticmethod
+    def _from_row(row: dict[str, Any]) -> Player:
+        """Create an (offline) player object from a row of the users table."""
+        # encode pw_bcrypt from str -> bytes.
+        row["pw_bcrypt"] = row["pw_bcrypt"].encode()
+
+        if row["clan_id"] != 0:
+            row["clan"] = app.state.sessions.clans.get(id=row["clan_id"])
+            row["clan_priv"] = ClanPrivileges(row["clan_priv"])
+        else:
+            row["clan"] = row["clan_priv"] = None
+
+        # country from acronym to {acronym, numeric}
+        row["geoloc"] = {
+            "latitude": 0.0,  # TODO
+            "longitude": 0.0,
+            "country": {
+                "acronym": row["country"],
+                "numeric": app.state.services.country_codes[row["country"]],
+            },
+        }
+
+        return Player(**row, token="")
+
     async def get_sql(
         self,
         id: Optional[int] = None,
@@ -260,35 +459,42 @@ class Players(list[Player]):
     ) -> Optional[Player]:
         """Get a player by token, id, or name from sql."""
         # try to get from sql.
-        player = await players_repo.fetch_one(
+        row = await players_repo.fetch_one(
             id=id,
             name=name,
             discord_id=discord_id,
             fetch_all_fields=True,
         )
-        if player is None:
+        if row is None:
             return None
 
-        # encode pw_bcrypt from str -> bytes.
-        player["pw_bcrypt"] = player["pw_bcrypt"].encode()
+        return self._from_row(row)
 
-        if player["clan_id"] != 0:
-            player["clan"] = app.state.sessions.clans.get(id=player["clan_id"])
-            player["clan_priv"] = ClanPrivileges(player["clan_priv"])
-        else:
-            player["clan"] = player["clan_priv"] = None
+    def _get_offline(self, player_id: int) -> Optional[Player]:
+        cached = self._offline.get(player_id)
+        if cached is None:
+            return None
 
-        # country from acronym to {acronym, numeric}
-        player["geoloc"] = {
-            "latitude": 0.0,  # TODO
-            "longitude": 0.0,
-            "country": {
-                "acronym": player["country"],
-                "numeric": app.state.services.country_codes[player["country"]],
-            },
-        }
+        expiry, player = cached
+        if expiry < time.time():
+            del self._offline[player_id]
+            return None
+
+        return player
+
+    def _cache_offline(self, player: Player) -> None:
+        self._offline.pop(player.id, None)
+
+        if len(self._offline) >= OFFLINE_CACHE_MAX_SIZE:
+            # evict the oldest entry
+            del self._offline[next(iter(self._offline))]
 
-        return Player(**player, token="")
+        self._offline[player.id] = (time.time() + OFFLINE_CACHE_TTL, player)
+
+    def invalidate(self, player_id: int) -> None:
+        """Drop an offline player from cache, after their row has changed."""
+        self._offline.pop(player_id, None)
+        app.state.cache.player_card.pop(player_id, None)
 
     async def from_cache_or_sql(
         self,
@@ -300,12 +506,40 @@ class Players(list[Player]):
         player = self.get(id=id, name=name, discord_id=discord_id)
         if player is not None:
             return player
+
+        if id is not None:
+            player = self._get_offline(id)
+            if player is not None:
+                return player
+
         player = await self.get_sql(id=id, name=name, discord_id=discord_id)
         if player is not None:
+            self._cache_offline(player)
             return player
 
         return None
 
+    async def from_cache_or_sql_many(self, ids: Iterable[int]) -> dict[int, Player]:
+        """Get many players by id from cache, loading the rest from sql at once."""
+        players: dict[int, Player] = {}
+        missing: list[int] = []
+
+        for player_id in dict.fromkeys(ids):
+            player = self._by_id.get(player_id) or self._get_offline(player_id)
+            if player is not None:
+                players[player_id] = player
+            else:
+                missing.append(player_id)
+
+        if missing:
+            rows = await players_repo.fetch_many_by_ids(missing, fetch_all_fields=True)
+            for row in rows:
+                player = self._from_row(row)
+                self._cache_offline(player)
+                players[player.id] = player
+
+        return players
+
     async def from_login(
         self,
         name: str,
@@ -338,6 +572,19 @@ class Players(list[Player]):
 
         super().append(player)
 
+        self._by_id[player.id] = player
+        self._by_token[player.token] = player
+        self._by_name[player.safe_name] = player
+
+        # the online player object is now authoritative
+        self._offline.pop(player.id, None)
+
+        if not player.restricted:
+            self._set_presence(player)
+
+        if app.settings.MULTI_WORKER and not player.bot_client:
+            app.state.bus.track_session(player.id)
+
     def remove(self, player: Player) -> None:
         """Remove `p` from the list."""
         if player not in self:
@@ -347,6 +594,33 @@ class Players(list[Player]):
 
         super().remove(player)
 
+        if self._by_id.get(player.id) is player:
+            del self._by_id[player.id]
+
+        if self._by_name.get(player.safe_name) is player:
+            del self._by_name[player.safe_name]
+
+        if self._by_token.get(player.token) is player:
+            del self._by_token[player.token]
+        else:
+            # the token is cleared on logout, before the player is removed
+            for token, online in self._by_token.items():
+                if online is player:
+                    del self._by_token[token]
+                    break
+
+        if (
+            player.id not in self._remote_presences
+            and self._presences.pop(player.id, None) is not None
+        ):
+            self._presence_snapshot = None
+
+            if app.settings.MULTI_WORKER:
+                app.state.bus.update_presence(player.id, None)
+
+        if app.settings.MULTI_WORKER and not player.bot_client:
+            app.state.bus.untrack_session(player.id)
+
 
 class MapPools(list[MapPool]):
     """The currently active mappools on the server."""
@@ -539,6 +813,149 @@ class Clans(list[Clan]):
             self.append(clan)
 
 
+class Achievements(list[Achievement]):
+    """The server's achievements, indexed by their conditions.
+
+    Achievements are bucketed by their mode, and those with a lower bound
+    on one of `INDEXED_ATTRIBUTES` are kept sorted by it, so evaluating a
+    score only needs to check achievements whose threshold it has reached.
+    """
+
+    INDEXED_ATTRIBUTES = ("sr", "max_combo", "pp", "acc", "score")
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._by_id: dict[int, Achievement] = {}
+
+        # {(mode_vn, attribute): ([lower bounds], [achievements])}
+        self._by_threshold: dict[
+            tuple[Optional[int], str],
+            tuple[list[float], list[Achievement]],
+        ] = {}
+        # {mode_vn: [achievements]}; a mode of None matches any mode
+        self._unindexed: dict[Optional[int], list[Achievement]] = {}
+
+    def __iter__(self) -> Iterator[Achievement]:
+        return super().__iter__()
+
+    def get(self, id: int) -> Optional[Achievement]:
+        """Get an achievement by `id`."""
+        return self._by_id.get(id)
+
+    def _index_key(
+        self,
+        achievement: Achievement,
+    ) -> tuple[Optional[int], Optional[str]]:
+        """The mode & attribute `achievement` is indexed by."""
+        rule = achievement.rule
+        if rule is None:
+            return None, None
+
+        for attr in self.INDEXED_ATTRIBUTES:
+            if attr in rule.bounds and rule.bounds[attr][0] != -math.inf:
+                return rule.mode, attr
+
+        return rule.mode, None
+
+    def _index(self, achievement: Achievement) -> None:
+        self._by_id[achievement.id] = achievement
+
+        mode, attr = self._index_key(achievement)
+        if attr is None:
+            self._unindexed.setdefault(mode, []).append(achievement)
+            return
+
+        assert achievement.rule is not None
+        lower_bound = achievement.rule.bounds[attr][0]
+
+        lower_bounds, achievements = self._by_threshold.setdefault(
+            (mode, attr),
+            ([], []),
+        )
+        idx = bisect.bisect_right(lower_bounds, lower_bound)
+        lower_bounds.insert(idx, lower_bound)
+        achievements.insert(idx, achievement)
+
+    def _unindex(self, achievement: Achievement) -> None:
+        del self._by_id[achievement.id]
+
+        mode, attr = self._index_key(achievement)
+        if attr is None:
+            self._unindexed[mode].remove(achievement)
+            return
+
+        lower_bounds, achievements = self._by_threshold[(mode, attr)]
+        idx = achievements.index(achievement)
+        del lower_bounds[idx]
+        del achievements[idx]
+
+    def append(self, achievement: Achievement) -> None:
+        """Append `achievement` to the list."""
+        super().append(achievement)
+        self._index(achievement)
+
+        if app.settings.DEBUG:
+            log(f"{achievement} added to achievements list.")
+
+    def extend(self, achievements: Iterable[Achievement]) -> None:
+        """Extend the list with `achievements`."""
+        achievements = list(achievements)
+        super().extend(achievements)
+
+        for achievement in achievements:
+            self._index(achievement)
+
+        if app.settings.DEBUG:
+            log(f"{achievements} added to achievements list.")
+
+    def remove(self, achievement: Achievement) -> None:
+        """Remove `achievement` from the list."""
+        super().remove(achievement)
+        self._unindex(achievement)
+
+        if app.settings.DEBUG:
+            log(f"{achievement} removed from achievements list.")
+
+    def candidates(self, score: Score, mode_vn: int) -> Iterator[Achievement]:
+        """Yield the achievements `score` could possibly meet."""
+        for mode in (mode_vn, None):
+            yield from self._unindexed.get(mode, ())
+
+            for attr in self.INDEXED_ATTRIBUTES:
+                index = self._by_threshold.get((mode, attr))
+                if index is None:
+                    continue
+
+                lower_bounds, achievements = index
+                value = getattr(score, attr)
+                yield from achievements[: bisect.bisect_right(lower_bounds, value)]
+
+    def unlocked_by(self, score: Score) -> list[Achievement]:
+        """Return the achievements newly unlocked by `score`'s player."""
+        assert score.player is not None
+        mode_vn = score.mode.as_vanilla
+
+        return [
+            achievement
+            for achievement in self.candidates(score, mode_vn)
+            if achievement not in score.player.achievements
+            and achievement.matches(score, mode_vn)
+        ]
+
+    async def prepare(self, db_conn: databases.core.Connection) -> None:
+        """Fetch data from sql & return; preparing to run the server."""
+        log("Fetching achievements from sql.", Ansi.LCYAN)
+        for row in await achievements_repo.fetch_many():
+            achievement = Achievement(
+                id=row["id"],
+                file=row["file"],
+                name=row["name"],
+                desc=row["desc"],
+                cond=row["cond"],
+            )
+            self.append(achievement)
+
+
 async def initialize_ram_caches(db_conn: databases.core.Connection) -> None:
     """Setup & cache the global collections before listening for connections."""
     # fetch channels, clans and pools from db
@@ -560,19 +977,8 @@ async def initialize_ram_caches(db_conn: databases.core.Connection) -> None:
     )
     app.state.sessions.players.append(app.state.sessions.bot)
 
-    # global achievements (sorted by vn gamemodes)
-    for row in await achievements_repo.fetch_many():
-        achievement = Achievement(
-            id=row["id"],
-            file=row["file"],
-            name=row["name"],
-            desc=row["desc"],
-            # NOTE: achievement conditions are stored as stringified python
-            # expressions in the database to allow for extensive customizability.
-            cond=eval(f'lambda score, mode_vn: {row.pop("cond")}'),
-        )
-
-        app.state.sessions.achievements.append(achievement)
+    # global achievements (indexed by their conditions)
+    await app.state.sessions.achievements.prepare(db_conn)
 
     # static api keys
     app.state.sessions.api_keys = {
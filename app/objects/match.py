@@ -32,6 +32,7 @@ if TYPE_CHECKING:
 
     from app.objects.player import Player
     from app.objects.channel import Channel
+    from app.objects.score import Score
 
 __all__ = (
     "SlotStatus",
@@ -44,6 +45,9 @@ __all__ = (
     "Match",
 )
 
+SUBMISSION_TIMEOUT = 10  # seconds, total (not per player)
+SCORE_UPDATE_TICK = 0.05  # seconds
+
 
 @unique
 @pymysql_encode(escape_enum)
@@ -239,6 +243,11 @@ class Match:
 
         self.chat = chat_channel
         self.slots = [Slot() for _ in range(16)]
+        self._slot_ids: dict[int, int] = {}  # {player_id: slot_id}
+
+        # score frames are relayed in batches, once per tick
+        self._score_updates = bytearray()
+        self._score_updates_flush: Optional[TimerHandle] = None
 
         # self.type = MatchTypes.standard
         self.team_type = team_type
@@ -258,6 +267,9 @@ class Match:
         self.winning_pts = 0
         self.use_pp_scoring = False  # only for scrims
 
+        # {player_id: future}; resolved by score submission
+        self._submission_waiters: dict[int, asyncio.Future[Score]] = {}
+
         self.tourney_clients: set[int] = set()  # player ids
 
     @property  # TODO: test cache speed
@@ -309,8 +321,14 @@ class Match:
 
     def get_slot_id(self, player: Player) -> Optional[int]:
         """Return the slot index containing a given player."""
+        # players rarely move, so check where we last saw them first.
+        slot_id = self._slot_ids.get(player.id)
+        if slot_id is not None and self.slots[slot_id].player is player:
+            return slot_id
+
         for idx, s in enumerate(self.slots):
             if player is s.player:
+                self._slot_ids[player.id] = idx
                 return idx
 
         return None
@@ -352,10 +370,42 @@ class Match:
         """Add data to be sent to all clients in the match."""
         self.chat.enqueue(data, immune)
 
-        lchan = app.state.sessions.channels["#lobby"]
+        lchan = app.state.sessions.channels.lobby
         if lobby and lchan and lchan.players:
             lchan.enqueue(data)
 
+    def enqueue_score_update(
+        self,
+        player: Player,
+        play_data: Union[bytes, memoryview],
+    ) -> None:
+        """Relay a player's score frame to the match within the next tick."""
+        slot_id = self.get_slot_id(player)
+        assert slot_id is not None
+
+        buf = self._score_updates
+        buf += app.packets.match_score_update_header(len(play_data))
+        frame_start = len(buf)
+        buf += play_data
+        buf[frame_start + 4] = slot_id  # frame's slot id
+
+        if self._score_updates_flush is None:
+            loop = asyncio.get_running_loop()
+            self._score_updates_flush = loop.call_later(
+                SCORE_UPDATE_TICK,
+                self.flush_score_updates,
+            )
+
+    def flush_score_updates(self) -> None:
+        """Send all pending score frames to the match."""
+        if self._score_updates_flush is not None:
+            self._score_updates_flush.cancel()
+            self._score_updates_flush = None
+
+        if self._score_updates:
+            self.chat.enqueue(bytes(self._score_updates))
+            self._score_updates.clear()
+
     def enqueue_state(self, lobby: bool = True) -> None:
         """Enqueue `self`'s state to players in the match & lobby."""
         # TODO: hmm this is pretty bad, writes twice
@@ -363,7 +413,7 @@ class Match:
         # send password only to users currently in the match.
         self.chat.enqueue(app.packets.update_match(self, send_pw=True))
 
-        lchan = app.state.sessions.channels["#lobby"]
+        lchan = app.state.sessions.channels.lobby
         if lobby and lchan and lchan.players:
             lchan.enqueue(app.packets.update_match(self, send_pw=False))
 
@@ -395,6 +445,18 @@ class Match:
         self.winners.clear()
         self.bans.clear()
 
+    def submit_score(self, score: Score) -> None:
+        """Hand a newly submitted score to anyone awaiting it."""
+        assert score.player is not None
+        assert score.bmap is not None
+
+        if score.bmap.md5 != self.map_md5:
+            return
+
+        future = self._submission_waiters.pop(score.player.id, None)
+        if future is not None and not future.done():
+            future.set_result(score)
+
     async def await_submissions(
         self,
         was_playing: Sequence[Slot],
@@ -402,7 +464,6 @@ class Match:
         """Await score submissions from all players in completed state."""
         scores: dict[Union[MatchTeams, Player], int] = defaultdict(int)
         didnt_submit: list[Player] = []
-        time_waited = 0  # allow up to 10s (total, not per player)
 
         ffa = self.team_type in (MatchTeamTypes.head_to_head, MatchTeamTypes.tag_coop)
 
@@ -417,37 +478,45 @@ class Match:
             # map isn't submitted
             return {}, ()
 
-        for s in was_playing:
-            # continue trying to fetch each player's
-            # scores until they've all been submitted.
-            while True:
-                rc_score = s.player.recent_score
-                max_age = datetime.now() - timedelta(
-                    seconds=bmap.total_length + time_waited + 0.5,
-                )
-
-                if (
-                    rc_score
-                    and rc_score.bmap.md5 == self.map_md5
-                    and rc_score.server_time > max_age
-                ):
-                    # score found, add to our scores dict if != 0.
-                    score = getattr(rc_score, win_cond)
-                    if score:
-                        key = s.player if ffa else s.team
-                        scores[key] += score
-
-                    break
+        def add_score(slot: Slot, score: Score) -> None:
+            # add to our scores dict if != 0.
+            value = getattr(score, win_cond)
+            if value:
+                key = slot.player if ffa else slot.team
+                scores[key] += value
 
-                # wait 0.5s and try again
-                await asyncio.sleep(0.5)
-                time_waited += 0.5
+        # some scores may have already been submitted; wait
+        # on the rest concurrently, all with the same deadline.
+        loop = asyncio.get_running_loop()
+        max_age = datetime.now() - timedelta(seconds=bmap.total_length + 0.5)
+        pending: dict[Slot, asyncio.Future[Score]] = {}
 
-                if time_waited > 10:
+        for s in was_playing:
+            rc_score = s.player.recent_score
+
+            if (
+                rc_score
+                and rc_score.bmap.md5 == self.map_md5
+                and rc_score.server_time > max_age
+            ):
+                add_score(s, rc_score)
+            else:
+                future = loop.create_future()
+                self._submission_waiters[s.player.id] = future
+                pending[s] = future
+
+        if pending:
+            await asyncio.wait(pending.values(), timeout=SUBMISSION_TIMEOUT)
+
+            for s, future in pending.items():
+                if future.done():
+                    add_score(s, future.result())
+                else:
                     # inform the match this user didn't
                     # submit a score in time, and skip them.
+                    future.cancel()
+                    self._submission_waiters.pop(s.player.id, None)
                     didnt_submit.append(s.player)
-                    break
 
         # all scores retrieved, update the match.
         return scores, didnt_submit
@@ -477,7 +546,9 @@ class Match:
         scores, didnt_submit = await self.await_submissions(was_playing)
 
         for player in didnt_submit:
-            self.chat.send_bot(f"{player} didn't submit a score (timeout: 10s).")
+            self.chat.send_bot(
+                f"{player} didn't submit a score (timeout: {SUBMISSION_TIMEOUT}s).",
+            )
 
         if scores:
             ffa = self.team_type in (
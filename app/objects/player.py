@@ -10,6 +10,7 @@ from enum import unique
 from functools import cached_property
 from typing import Any
 from typing import Optional
+from typing import Sequence
 from typing import TYPE_CHECKING
 from typing import TypedDict
 from typing import Union
@@ -17,6 +18,7 @@ from typing import Union
 import databases.core
 
 import app.packets
+import app.processes.ipc
 import app.settings
 import app.state
 from app._typing import IPAddress
@@ -89,6 +91,19 @@ class Action(IntEnum):
 class ModeData:
     """A player's stats in a single gamemode."""
 
+    __slots__ = (
+        "tscore",
+        "rscore",
+        "pp",
+        "acc",
+        "plays",
+        "playtime",
+        "max_combo",
+        "total_hits",
+        "rank",
+        "grades",
+    )
+
     tscore: int
     rscore: int
     pp: int
@@ -181,6 +196,7 @@ class ClientDetails:
         uninstall_md5: str,
         disk_signature_md5: str,
         adapters: list[str],
+        running_under_wine: bool,
         ip: IPAddress,
     ) -> None:
         self.osu_version = osu_version
@@ -190,6 +206,7 @@ class ClientDetails:
         self.disk_signature_md5 = disk_signature_md5
 
         self.adapters = adapters
+        self.running_under_wine = running_under_wine
         self.ip = ip
 
     @cached_property
@@ -245,6 +262,52 @@ class Player:
         The player's discord id, if linked.
     """
 
+    # many player objects are kept in memory at once,
+    # so we avoid the overhead of a per-instance dict.
+    __slots__ = (
+        "id",
+        "name",
+        "safe_name",
+        "pw_bcrypt",
+        "token",
+        "priv",
+        "_bancho_priv",
+        "stats",
+        "status",
+        "friends",
+        "blocks",
+        "channels",
+        "spectators",
+        "spectating",
+        "spectator_chat",
+        "match",
+        "stealth",
+        "clan",
+        "clan_priv",
+        "achievements",
+        "geoloc",
+        "utc_offset",
+        "pm_private",
+        "away_msg",
+        "silence_end",
+        "donor_end",
+        "in_lobby",
+        "client_details",
+        "pres_filter",
+        "login_time",
+        "last_recv_time",
+        "recent_scores",
+        "last_np",
+        "current_menu",
+        "previous_menus",
+        "bot_client",
+        "tourney_client",
+        "api_key",
+        "_queue",
+        "map_pauses",
+        "discord_id",
+    )
+
     def __init__(
         self,
         id: int,
@@ -270,6 +333,7 @@ class Player:
 
         # ensure priv is of type Privileges
         self.priv = priv if isinstance(priv, Privileges) else Privileges(priv)
+        self._bancho_priv: Optional[ClientPrivileges] = None
 
         self.stats: dict[GameMode, ModeData] = {}
         self.status = Status()
@@ -281,6 +345,7 @@ class Player:
         self.channels: list[Channel] = []
         self.spectators: list[Player] = []
         self.spectating: Optional[Player] = None
+        self.spectator_chat: Optional[Channel] = None  # our #spec_{id} channel
         self.match: Optional[Match] = None
         self.stealth = False
 
@@ -314,10 +379,8 @@ class Player:
 
         # XXX: below is mostly implementation-specific & internal stuff
 
-        # store most recent score for each gamemode.
-        self.recent_scores: dict[GameMode, Optional[Score]] = {
-            mode: None for mode in GameMode
-        }
+        # store most recent score for each gamemode played.
+        self.recent_scores: dict[GameMode, Score] = {}
 
         # store the last beatmap /np'ed by the user.
         self.last_np: Optional[LastNp] = None
@@ -330,8 +393,6 @@ class Player:
         # although if anything, bot accounts will
         # probably just use the /api/ routes?
         self.bot_client = extras.get("bot_client", False)
-        if self.bot_client:
-            self.enqueue = lambda data: None  # type: ignore
 
         self.tourney_client = extras.get("tourney_client", False)
 
@@ -388,9 +449,15 @@ class Player:
         """Whether or not the player is silenced."""
         return self.remaining_silence != 0
 
-    @cached_property
+    @property
     def bancho_priv(self) -> ClientPrivileges:
         """The player's privileges according to the client."""
+        if self._bancho_priv is None:
+            self._bancho_priv = self._calculate_bancho_priv()
+
+        return self._bancho_priv
+
+    def _calculate_bancho_priv(self) -> ClientPrivileges:
         ret = ClientPrivileges(0)
         if self.priv & Privileges.UNRESTRICTED:
             ret |= ClientPrivileges.PLAYER
@@ -434,6 +501,10 @@ class Player:
     @staticmethod
     def generate_token() -> str:
         """Generate a random uuid as a token."""
+        if app.settings.MULTI_WORKER:
+            # prefixed by our worker id, for routing polls back to us.
+            return f"{app.settings.WORKER_ID}:{uuid.uuid4()}"
+
         return str(uuid.uuid4())
 
     @staticmethod
@@ -441,7 +512,7 @@ class Player:
         """Return a name safe for usage in sql."""
         return make_safe_name(name)
 
-    def logout(self) -> None:
+    def logout(self, broadcast: bool = True) -> None:
         """Log `self` out of the server."""
         # invalidate the user's token.
         self.token = ""
@@ -459,6 +530,8 @@ class Player:
         while self.channels:
             self.leave_channel(self.channels[0], kick=False)
 
+        self.spectator_chat = None
+
         # remove from playerlist and
         # enqueue logout to all users.
         app.state.sessions.players.remove(self)
@@ -467,7 +540,8 @@ class Player:
             if app.state.services.datadog:
                 app.state.services.datadog.decrement("bancho.online_players")
 
-            app.state.sessions.players.enqueue(app.packets.logout(self.id))
+            if broadcast:
+                app.state.sessions.players.enqueue(app.packets.logout(self.id))
 
         log(f"{self} logged out.", Ansi.LYELLOW)
 
@@ -480,8 +554,10 @@ class Player:
             {"priv": self.priv, "user_id": self.id},
         )
 
-        if "bancho_priv" in self.__dict__:
-            del self.bancho_priv  # wipe cached_property
+        self._bancho_priv = None  # wipe cached privileges
+
+        app.state.sessions.players.update_presence(self)
+        app.state.sessions.players.invalidate(self.id)
 
     async def add_privs(self, bits: Privileges) -> None:
         """Update `self`'s privileges, adding `bits`."""
@@ -492,8 +568,10 @@ class Player:
             {"priv": self.priv, "user_id": self.id},
         )
 
-        if "bancho_priv" in self.__dict__:
-            del self.bancho_priv  # wipe cached_property
+        self._bancho_priv = None  # wipe cached privileges
+
+        app.state.sessions.players.update_presence(self)
+        app.state.sessions.players.invalidate(self.id)
 
         if self.online:
             # if they're online, send a packet
@@ -509,8 +587,10 @@ class Player:
             {"priv": self.priv, "user_id": self.id},
         )
 
-        if "bancho_priv" in self.__dict__:
-            del self.bancho_priv  # wipe cached_property
+        self._bancho_priv = None  # wipe cached privileges
+
+        app.state.sessions.players.update_presence(self)
+        app.state.sessions.players.invalidate(self.id)
 
         if self.online:
             # if they're online, send a packet
@@ -547,6 +627,8 @@ class Player:
             webhook = Webhook(webhook_url, content=log_msg)
             await webhook.post(app.state.services.http_client)
 
+        await app.processes.ipc.send_alert(log_msg)
+
         # refresh their client state
         if self.online:
             self.logout()
@@ -585,6 +667,8 @@ class Player:
             webhook = Webhook(webhook_url, content=log_msg)
             await webhook.post(app.state.services.http_client)
 
+        await app.processes.ipc.send_alert(log_msg)
+
         if self.online:
             # log the user out if they're offline, this
             # will simply relog them and refresh their app.state
@@ -674,7 +758,7 @@ class Player:
             log(f"{self} failed to join {match.chat}.", Ansi.LYELLOW)
             return False
 
-        lobby = app.state.sessions.channels["#lobby"]
+        lobby = app.state.sessions.channels.lobby
         if lobby in self.channels:
             self.leave_channel(lobby)
 
@@ -729,7 +813,7 @@ class Player:
 
             app.state.sessions.matches.remove(self.match)
 
-            lobby = app.state.sessions.channels["#lobby"]
+            lobby = app.state.sessions.channels.lobby
             if lobby:
                 lobby.enqueue(app.packets.dispose_match(self.match.id))
 
@@ -784,23 +868,21 @@ class Player:
 
         self.enqueue(app.packets.channel_join(channel.name))
 
-        chan_info_packet = app.packets.channel_info(
-            channel.name,
-            channel.topic,
-            len(channel.players),
-        )
-
         if channel.instance:
             # instanced channel, only send the players
             # who are currently inside the instance
+            chan_info_packet = app.packets.channel_info(
+                channel.name,
+                channel.topic,
+                len(channel.players),
+            )
+
             for player in channel.players:
                 player.enqueue(chan_info_packet)
         else:
-            # normal channel, send to all players who
-            # have access to see the channel's usercount.
-            for player in app.state.sessions.players:
-                if channel.can_read(player.priv):
-                    player.enqueue(chan_info_packet)
+            # normal channel, all players who have access to see
+            # the channel's usercount will be sent it shortly.
+            app.state.sessions.channels.mark_info_outdated(channel)
 
         if app.settings.DEBUG:
             log(f"{self} joined {channel}.")
@@ -819,36 +901,32 @@ class Player:
         if kick:
             self.enqueue(app.packets.channel_kick(channel.name))
 
-        chan_info_packet = app.packets.channel_info(
-            channel.name,
-            channel.topic,
-            len(channel.players),
-        )
-
         if channel.instance:
             # instanced channel, only send the players
             # who are currently inside the instance
+            chan_info_packet = app.packets.channel_info(
+                channel.name,
+                channel.topic,
+                len(channel.players),
+            )
+
             for player in channel.players:
                 player.enqueue(chan_info_packet)
         else:
-            # normal channel, send to all players who
-            # have access to see the channel's usercount.
-            for player in app.state.sessions.players:
-                if channel.can_read(player.priv):
-                    player.enqueue(chan_info_packet)
+            # normal channel, all players who have access to see
+            # the channel's usercount will be sent it shortly.
+            app.state.sessions.channels.mark_info_outdated(channel)
 
         if app.settings.DEBUG:
             log(f"{self} left {channel}.")
 
     def add_spectator(self, player: Player) -> None:
         """Attempt to add `player` to `self`'s spectators."""
-        chan_name = f"#spec_{self.id}"
-
-        spec_chan = app.state.sessions.channels[chan_name]
+        spec_chan = self.spectator_chat
         if not spec_chan:
             # spectator chan doesn't exist, create it.
             spec_chan = Channel(
-                name=chan_name,
+                name=f"#spec_{self.id}",
                 topic=f"{self.name}'s spectator channel.",
                 auto_join=False,
                 instance=True,
@@ -856,6 +934,7 @@ class Player:
 
             self.join_channel(spec_chan)
             app.state.sessions.channels.append(spec_chan)
+            self.spectator_chat = spec_chan
 
         # attempt to join their spectator channel.
         if not player.join_channel(spec_chan):
@@ -885,12 +964,14 @@ class Player:
         self.spectators.remove(player)
         player.spectating = None
 
-        channel = app.state.sessions.channels[f"#spec_{self.id}"]
+        channel = self.spectator_chat
+        assert channel is not None
         player.leave_channel(channel)
 
         if not self.spectators:
             # remove host from channel, deleting it.
             self.leave_channel(channel)
+            self.spectator_chat = None
         else:
             # send new playercount
             channel_info = app.packets.channel_info(
@@ -976,14 +1057,27 @@ class Player:
 
         log(f"{self} unblocked {player}.")
 
-    async def unlock_achievement(self, achievement: "Achievement") -> None:
-        """Unlock `achievement` for `self`, storing in both cache & sql."""
+    async def unlock_achievements(
+        self,
+        achievements: Sequence["Achievement"],
+    ) -> None:
+        """Unlock `achievements` for `self`, storing in both cache & sql."""
+        if not achievements:
+            return
+
+        # insert all of the unlocks in a single statement
+        values = ", ".join(
+            f"(:user_id, :ach_id_{idx})" for idx in range(len(achievements))
+        )
         await app.state.services.database.execute(
-            "INSERT INTO user_achievements (userid, achid) VALUES (:user_id, :ach_id)",
-            {"user_id": self.id, "ach_id": achievement.id},
+            f"INSERT INTO user_achievements (userid, achid) VALUES {values}",
+            {
+                "user_id": self.id,
+                **{f"ach_id_{idx}": ach.id for idx, ach in enumerate(achievements)},
+            },
         )
 
-        self.achievements.add(achievement)
+        self.achievements.update(achievements)
 
     async def relationships_from_sql(self, db_conn: databases.core.Connection) -> None:
         """Retrieve `self`'s relationships from sql."""
@@ -1007,9 +1101,9 @@ class Player:
             "WHERE ua.userid = :user_id",
             {"user_id": self.id},
         ):
-            for ach in app.state.sessions.achievements:
-                if row["id"] == ach.id:
-                    self.achievements.add(ach)
+            ach = app.state.sessions.achievements.get(row["id"])
+            if ach is not None:
+                self.achievements.add(ach)
 
     async def get_global_rank(self, mode: GameMode) -> int:
         if self.restricted:
@@ -1037,6 +1131,9 @@ class Player:
         country = self.geoloc["country"]["acronym"]
         stats = self.stats[mode]
 
+        # their stats have changed; drop their leaderboard card.
+        app.state.cache.player_card.get(self.id, {}).pop(mode, None)
+
         if not self.restricted:
             # global rank
             await app.state.services.redis.zadd(
@@ -1111,6 +1208,9 @@ class Player:
 
     def enqueue(self, data: bytes) -> None:
         """Add data to be sent to the client."""
+        if self.bot_client:
+            return
+
         self._queue += data
 
     def dequeue(self) -> Optional[bytes]:
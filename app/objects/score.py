@@ -6,6 +6,9 @@ from datetime import datetime
 from enum import IntEnum
 from enum import unique
 from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Mapping
 from typing import Optional
 from typing import TYPE_CHECKING
 from typing import Union
@@ -101,6 +104,31 @@ class SubmissionStatus(IntEnum):
         }[self]
 
 
+# {column: (attribute, conversion)} of the scores table's
+# columns, for creating score objects from (partial) rows.
+ROW_ATTRIBUTES: dict[str, tuple[str, Callable[[Any], Any]]] = {
+    "pp": ("pp", float),
+    "score": ("score", int),
+    "max_combo": ("max_combo", int),
+    "mods": ("mods", Mods),
+    "acc": ("acc", float),
+    "n300": ("n300", int),
+    "n100": ("n100", int),
+    "n50": ("n50", int),
+    "nmiss": ("nmiss", int),
+    "ngeki": ("ngeki", int),
+    "nkatu": ("nkatu", int),
+    "grade": ("grade", Grade.from_str),
+    "perfect": ("perfect", bool),
+    "status": ("status", SubmissionStatus),
+    "mode": ("mode", GameMode),
+    "play_time": ("server_time", lambda play_time: play_time),
+    "time_elapsed": ("time_elapsed", int),
+    "client_flags": ("client_flags", ClientFlags),
+    "online_checksum": ("client_checksum", str),
+}
+
+
 class Score:
     """\
     Server side representation of an osu! score; any gamemode.
@@ -109,15 +137,18 @@ class Score:
     -----------
     bmap: Optional[`Beatmap`]
         A beatmap obj representing the osu map.
+        NOTE: scores created from sql rows only have the `map_md5`;
+        the beatmap is resolved on demand with `fetch_bmap`.
 
     player: Optional[`Player`]
         A player obj of the player who submitted the score.
+        Likewise, see `player_id` and `fetch_player`.
 
     grade: `Grade`
         The letter grade in the score.
 
-    rank: `int`
-        The leaderboard placement of the score.
+    rank: Optional[`int`]
+        The leaderboard placement of the score; see `fetch_rank`.
 
     perfect: `bool`
         Whether the score is a full-combo.
@@ -135,12 +166,49 @@ class Score:
         value will always be accurate for any score.
     """
 
+    # slotted, as players' recent scores keep many of these around.
+    __slots__ = (
+        "id",
+        "bmap",
+        "player",
+        "map_md5",
+        "player_id",
+        "mode",
+        "mods",
+        "pp",
+        "sr",
+        "score",
+        "max_combo",
+        "acc",
+        "n300",
+        "n100",
+        "n50",
+        "nmiss",
+        "ngeki",
+        "nkatu",
+        "grade",
+        "passed",
+        "perfect",
+        "status",
+        "client_time",
+        "server_time",
+        "time_elapsed",
+        "client_flags",
+        "client_checksum",
+        "rank",
+        "prev_best",
+    )
+
     def __init__(self) -> None:
         # TODO: check whether the reamining Optional's should be
         self.id: Optional[int] = None
         self.bmap: Optional[Beatmap] = None
         self.player: Optional[Player] = None
 
+        # set for scores from sql, for resolving the above on demand
+        self.map_md5: Optional[str] = None
+        self.player_id: Optional[int] = None
+
         self.mode: GameMode
         self.mods: Mods
 
@@ -195,44 +263,36 @@ class Score:
         if rec is None:
             return None
 
+        s = cls.from_row(rec)
+
+        await s.fetch_bmap()
+        await s.fetch_player()
+
+        if s.bmap:
+            await s.fetch_rank()
+
+        return s
+
+    @classmethod
+    def from_row(cls, rec: Mapping[str, Any]) -> Score:
+        """Create a score object from a row of the scores table.
+
+        Only the columns present in the row are set, and the beatmap,
+        player & rank are left to be resolved when they're needed."""
         s = cls()
 
-        s.id = rec["id"]
-        s.bmap = await Beatmap.from_md5(rec["map_md5"])
-        s.player = await app.state.sessions.players.from_cache_or_sql(id=rec["userid"])
+        s.id = rec.get("id")
+        s.map_md5 = rec.get("map_md5")
+        s.player_id = rec.get("userid")
 
         s.sr = 0.0  # TODO
 
-        s.pp = rec["pp"]
-        s.score = rec["score"]
-        s.max_combo = rec["max_combo"]
-        s.mods = rec["mods"]
-        s.acc = rec["acc"]
-        s.n300 = rec["n300"]
-        s.n100 = rec["n100"]
-        s.n50 = rec["n50"]
-        s.nmiss = rec["nmiss"]
-        s.ngeki = rec["ngeki"]
-        s.nkatu = rec["nkatu"]
-        s.grade = rec["grade"]
-        s.perfect = rec["perfect"]
-        s.status = rec["status"]
-        s.mode = rec["mode"]
-        s.server_time = rec["play_time"]
-        s.time_elapsed = rec["time_elapsed"]
-        s.client_flags = rec["client_flags"]
-        s.client_checksum = rec["online_checksum"]
-
-        # fix some types
-        s.passed = s.status != 0
-        s.status = SubmissionStatus(s.status)
-        s.grade = Grade.from_str(s.grade)
-        s.mods = Mods(s.mods)
-        s.mode = GameMode(s.mode)
-        s.client_flags = ClientFlags(s.client_flags)
+        for column in ROW_ATTRIBUTES.keys() & rec.keys():
+            attr, convert = ROW_ATTRIBUTES[column]
+            setattr(s, attr, convert(rec[column]))
 
-        if s.bmap:
-            s.rank = await s.calculate_placement()
+        if "status" in rec:
+            s.passed = s.status != SubmissionStatus.FAILED
 
         return s
 
@@ -315,10 +375,36 @@ class Score:
             ).encode(),
         ).hexdigest()
 
+    """Methods to resolve a score's related objects on demand."""
+
+    async def fetch_bmap(self) -> Optional[Beatmap]:
+        """Resolve the score's beatmap, if it hasn't been already."""
+        if self.bmap is None and self.map_md5 is not None:
+            self.bmap = await Beatmap.from_md5(self.map_md5)
+
+        return self.bmap
+
+    async def fetch_player(self) -> Optional[Player]:
+        """Resolve the score's player, if it hasn't been already."""
+        if self.player is None and self.player_id is not None:
+            self.player = await app.state.sessions.players.from_cache_or_sql(
+                id=self.player_id,
+            )
+
+        return self.player
+
+    async def fetch_rank(self) -> int:
+        """Calculate the score's placement, if it hasn't been already."""
+        if self.rank is None:
+            self.rank = await self.calculate_placement()
+
+        return self.rank
+
     """Methods to calculate internal data for a score."""
 
     async def calculate_placement(self) -> int:
-        assert self.bmap is not None
+        map_md5 = self.bmap.md5 if self.bmap is not None else self.map_md5
+        assert map_md5 is not None
 
         if self.mode >= GameMode.RELAX_OSU:
             scoring_metric = "pp"
@@ -334,7 +420,7 @@ class Score:
             "AND s.status = 2 AND u.priv & 1 "
             f"AND s.{scoring_metric} > :score",
             {
-                "map_md5": self.bmap.md5,
+                "map_md5": map_md5,
                 "mode": self.mode,
                 "score": score,
             },
@@ -386,8 +472,9 @@ class Score:
 
             # we have a score on the map.
             # save it as our previous best score.
-            self.prev_best = await Score.from_sql(rec["id"])
-            assert self.prev_best is not None
+            self.prev_best = Score.from_row(rec)
+            self.prev_best.bmap = self.bmap
+            self.prev_best.player = self.player
 
             # if our new score is better, update
             # both of our score's submission statuses.
@@ -458,7 +545,8 @@ class Score:
 
     async def increment_replay_views(self) -> None:
         # TODO: move replay views to be per-score rather than per-user
-        assert self.player is not None
+        user_id = self.player.id if self.player is not None else self.player_id
+        assert user_id is not None
 
         # TODO: apparently cached stats don't store replay views?
         #       need to refactor that to be able to use stats_repo here
@@ -466,5 +554,5 @@ class Score:
             f"UPDATE stats "
             "SET replay_views = replay_views + 1 "
             "WHERE id = :user_id AND mode = :mode",
-            {"user_id": self.player.id, "mode": self.mode},
+            {"user_id": user_id, "mode": self.mode},
         )
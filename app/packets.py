@@ -291,6 +291,30 @@ class BasePacket(ABC):
 PacketMap = dict[ClientPackets, type[BasePacket]]
 
 
+# precompiled formats for the reader's fixed-size reads
+PACKET_HEADER_FMT = struct.Struct("<HxI")  # id, pad, length
+
+I16_FMT = struct.Struct("<h")
+U16_FMT = struct.Struct("<H")
+I32_FMT = struct.Struct("<i")
+U32_FMT = struct.Struct("<I")
+I64_FMT = struct.Struct("<q")
+U64_FMT = struct.Struct("<Q")
+F16_FMT = struct.Struct("<e")
+F32_FMT = struct.Struct("<f")
+F64_FMT = struct.Struct("<d")
+
+REPLAYFRAME_FMT = struct.Struct("<BBffi")
+MATCH_HEADER_FMT = struct.Struct("<hbbi")  # id, in progress, powerplay, mods
+MATCH_SLOTS_FMT = struct.Struct("<16b16b")  # slot statuses, slot teams
+MATCH_SETTINGS_FMT = struct.Struct("<ibbbb")  # host, mode, win cond, team type, fm
+MATCH_SLOT_MODS_FMT = struct.Struct("<16i")
+
+# packet ids are looked up in the packet map as integers,
+# only handled packets have their enum member looked up.
+CLIENT_PACKETS_BY_ID = {packet.value: packet for packet in ClientPackets}
+
+
 class BanchoPacketReader:
     """\
     A class for reading bancho packets
@@ -301,12 +325,18 @@ class BanchoPacketReader:
     body_view: `memoryview`
         A readonly view of the request's body.
 
+    offset: int
+        The position of the reader within `body_view`.
+
     packet_map: `dict[ClientPackets, BasePacket]`
         The map of registered packets the reader may handle.
 
     current_length: int
         The length in bytes of the packet currently being handled.
 
+    current_type: `Optional[ClientPackets]`
+        The type of the packet currently being handled.
+
     Intended Usage:
     >>> with memoryview(await request.body()) as body_view:
     ...     for packet in BanchoPacketReader(conn.body):
@@ -315,107 +345,110 @@ class BanchoPacketReader:
 
     def __init__(self, body_view: memoryview, packet_map: PacketMap) -> None:
         self.body_view = body_view  # readonly
+        self.offset = 0
         self.packet_map = packet_map
 
         self.current_len = 0  # last read packet's length
+        self.current_type: Optional[ClientPackets] = None
 
     def __iter__(self) -> Iterator[BasePacket]:
         return self
 
     def __next__(self) -> BasePacket:
+        body_len = len(self.body_view)
+
         # do not break until we've read the
         # header of a packet we can handle.
-        while self.body_view:  # len(self.view) < 7?
+        while self.offset < body_len:
             p_type, p_len = self._read_header()
 
-            if p_type not in self.packet_map:
-                # packet type not handled, remove
-                # from internal buffer and continue.
-                if p_len != 0:
-                    self.body_view = self.body_view[p_len:]
-            else:
+            packet_cls = self.packet_map.get(p_type)  # type: ignore[call-overload]
+            if packet_cls is not None:
                 # we can handle this one.
                 break
+
+            # packet type not handled (or unknown),
+            # skip over its body and continue.
+            self.offset += p_len
         else:
             raise StopIteration
 
         # we have a packet handler for this.
-        packet_cls = self.packet_map[p_type]
         self.current_len = p_len
+        self.current_type = CLIENT_PACKETS_BY_ID[p_type]
 
         return packet_cls(self)
 
-    def _read_header(self) -> tuple[ClientPackets, int]:
+    def _read_header(self) -> tuple[int, int]:
         """Read the header of an osu! packet (id & length)."""
-        # read type & length from the body
-        data = struct.unpack("<HxI", self.body_view[:7])
-        self.body_view = self.body_view[7:]
-        return ClientPackets(data[0]), data[1]
+        p_type, p_len = PACKET_HEADER_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 7
+        return p_type, p_len
 
     """ public API (exposed for packet handler's __init__ methods) """
 
     def read_raw(self) -> memoryview:
-        val = self.body_view[: self.current_len]
-        self.body_view = self.body_view[self.current_len :]
+        val = self.body_view[self.offset : self.offset + self.current_len]
+        self.offset += self.current_len
         return val
 
     # integral types
 
     def read_i8(self) -> int:
-        val = self.body_view[0]
-        self.body_view = self.body_view[1:]
+        val = self.body_view[self.offset]
+        self.offset += 1
         return val - 256 if val > 127 else val
 
     def read_u8(self) -> int:
-        val = self.body_view[0]
-        self.body_view = self.body_view[1:]
+        val = self.body_view[self.offset]
+        self.offset += 1
         return val
 
     def read_i16(self) -> int:
-        val = int.from_bytes(self.body_view[:2], "little", signed=True)
-        self.body_view = self.body_view[2:]
+        (val,) = I16_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 2
         return val
 
     def read_u16(self) -> int:
-        val = int.from_bytes(self.body_view[:2], "little", signed=False)
-        self.body_view = self.body_view[2:]
+        (val,) = U16_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 2
         return val
 
     def read_i32(self) -> int:
-        val = int.from_bytes(self.body_view[:4], "little", signed=True)
-        self.body_view = self.body_view[4:]
+        (val,) = I32_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 4
         return val
 
     def read_u32(self) -> int:
-        val = int.from_bytes(self.body_view[:4], "little", signed=False)
-        self.body_view = self.body_view[4:]
+        (val,) = U32_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 4
         return val
 
     def read_i64(self) -> int:
-        val = int.from_bytes(self.body_view[:8], "little", signed=True)
-        self.body_view = self.body_view[8:]
+        (val,) = I64_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 8
         return val
 
     def read_u64(self) -> int:
-        val = int.from_bytes(self.body_view[:8], "little", signed=False)
-        self.body_view = self.body_view[8:]
+        (val,) = U64_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 8
         return val
 
     # floating-point types
 
     def read_f16(self) -> float:
-        (val,) = struct.unpack_from("<e", self.body_view[:2])
-        self.body_view = self.body_view[2:]
+        (val,) = F16_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 2
         return val
 
     def read_f32(self) -> float:
-        (val,) = struct.unpack_from("<f", self.body_view[:4])
-        self.body_view = self.body_view[4:]
+        (val,) = F32_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 4
         return val
 
     def read_f64(self) -> float:
-        (val,) = struct.unpack_from("<d", self.body_view[:8])
-        self.body_view = self.body_view[8:]
+        (val,) = F64_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += 8
         return val
 
     # complex types
@@ -423,35 +456,37 @@ class BanchoPacketReader:
     # XXX: some osu! packets use i16 for
     # array length, while others use i32
     def read_i32_list_i16l(self) -> tuple[int]:
-        length = int.from_bytes(self.body_view[:2], "little")
-        self.body_view = self.body_view[2:]
+        length = self.read_u16()
 
-        val = struct.unpack(f'<{"I" * length}', self.body_view[: length * 4])
-        self.body_view = self.body_view[length * 4 :]
+        val = struct.unpack_from(f"<{length}I", self.body_view, self.offset)
+        self.offset += length * 4
         return val
 
     def read_i32_list_i32l(self) -> tuple[int]:
-        length = int.from_bytes(self.body_view[:4], "little")
-        self.body_view = self.body_view[4:]
+        length = self.read_u32()
 
-        val = struct.unpack(f'<{"I" * length}', self.body_view[: length * 4])
-        self.body_view = self.body_view[length * 4 :]
+        val = struct.unpack_from(f"<{length}I", self.body_view, self.offset)
+        self.offset += length * 4
         return val
 
     def read_string(self) -> str:
-        exists = self.body_view[0] == 0x0B
-        self.body_view = self.body_view[1:]
+        body_view = self.body_view
+        offset = self.offset
+
+        exists = body_view[offset] == 0x0B
+        offset += 1
 
         if not exists:
             # no string sent.
+            self.offset = offset
             return ""
 
         # non-empty string, decode str length (uleb128)
         length = shift = 0
 
         while True:
-            byte = self.body_view[0]
-            self.body_view = self.body_view[1:]
+            byte = body_view[offset]
+            offset += 1
 
             length |= (byte & 0x7F) << shift
             if (byte & 0x80) == 0:
@@ -459,8 +494,8 @@ class BanchoPacketReader:
 
             shift += 7
 
-        val = self.body_view[:length].tobytes().decode()  # copy
-        self.body_view = self.body_view[length:]
+        val = str(body_view[offset : offset + length], "utf-8")
+        self.offset = offset + length
         return val
 
     # custom osu! types
@@ -484,41 +519,58 @@ class BanchoPacketReader:
 
     def read_match(self) -> MultiplayerMatch:
         """Read an osu! match from the internal buffer."""
+        id, in_progress, powerplay, mods = MATCH_HEADER_FMT.unpack_from(
+            self.body_view,
+            self.offset,
+        )
+        self.offset += MATCH_HEADER_FMT.size
+
         match = MultiplayerMatch(
-            id=self.read_i16(),
-            in_progress=self.read_i8() == 1,
-            powerplay=self.read_i8(),
-            mods=self.read_i32(),
+            id=id,
+            in_progress=in_progress == 1,
+            powerplay=powerplay,
+            mods=mods,
             name=self.read_string(),
             passwd=self.read_string(),
             map_name=self.read_string(),
             map_id=self.read_i32(),
             map_md5=self.read_string(),
-            slot_statuses=[self.read_i8() for _ in range(16)],
-            slot_teams=[self.read_i8() for _ in range(16)],
-            # ^^ up to slot_ids, as it relies on slot_statuses ^^
         )
 
+        slots = MATCH_SLOTS_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += MATCH_SLOTS_FMT.size
+
+        match.slot_statuses = list(slots[:16])
+        match.slot_teams = list(slots[16:])
+
         for status in match.slot_statuses:
             if status & 124 != 0:  # slot has a player
                 match.slot_ids.append(self.read_i32())
 
-        match.host_id = self.read_i32()
-        match.mode = self.read_i8()
-        match.win_condition = self.read_i8()
-        match.team_type = self.read_i8()
-        match.freemods = self.read_i8() == 1
+        (
+            match.host_id,
+            match.mode,
+            match.win_condition,
+            match.team_type,
+            freemods,
+        ) = MATCH_SETTINGS_FMT.unpack_from(self.body_view, self.offset)
+        self.offset += MATCH_SETTINGS_FMT.size
+
+        match.freemods = freemods == 1
 
         if match.freemods:
-            match.slot_mods = [self.read_i32() for _ in range(16)]
+            match.slot_mods = list(
+                MATCH_SLOT_MODS_FMT.unpack_from(self.body_view, self.offset),
+            )
+            self.offset += MATCH_SLOT_MODS_FMT.size
 
         match.seed = self.read_i32()  # used for mania random mod
 
         return match
 
     def read_scoreframe(self) -> ScoreFrame:
-        sf = ScoreFrame(*SCOREFRAME_FMT.unpack_from(self.body_view[:29]))
-        self.body_view = self.body_view[29:]
+        sf = ScoreFrame(*SCOREFRAME_FMT.unpack_from(self.body_view, self.offset))
+        self.offset += SCOREFRAME_FMT.size
 
         if sf.score_v2:
             sf.combo_portion = self.read_f64()
@@ -527,21 +579,28 @@ class BanchoPacketReader:
         return sf
 
     def read_replayframe(self) -> ReplayFrame:
-        return ReplayFrame(
-            button_state=self.read_u8(),
-            taiko_byte=self.read_u8(),  # pre-taiko support (<=2008)
-            x=self.read_f32(),
-            y=self.read_f32(),
-            time=self.read_i32(),
+        frame = ReplayFrame._make(
+            REPLAYFRAME_FMT.unpack_from(self.body_view, self.offset),
         )
+        self.offset += REPLAYFRAME_FMT.size
+        return frame
 
     def read_replayframe_bundle(self) -> ReplayFrameBundle:
         # save raw format to distribute to the other clients
-        raw_data = self.body_view[: self.current_len]
+        raw_data = self.body_view[self.offset : self.offset + self.current_len]
 
         extra = self.read_i32()  # bancho proto >= 18
         framecount = self.read_u16()
-        frames = [self.read_replayframe() for _ in range(framecount)]
+
+        frames_end = self.offset + framecount * REPLAYFRAME_FMT.size
+        frames = [
+            ReplayFrame._make(frame)
+            for frame in REPLAYFRAME_FMT.iter_unpack(
+                self.body_view[self.offset : frames_end],
+            )
+        ]
+        self.offset = frames_end
+
         action = ReplayAction(self.read_u8())
         scoreframe = self.read_scoreframe()
         sequence = self.read_u16()
@@ -996,6 +1055,14 @@ def match_score_update(frame: ScoreFrame) -> bytes:
     return write(ServerPackets.MATCH_SCORE_UPDATE, (frame, osuTypes.scoreframe))
 
 
+# packet id: 48
+@cache
+def match_score_update_header(length: int) -> bytes:
+    # the header for a score frame which is relayed as-is;
+    # there are only two lengths (with & without scorev2).
+    return struct.pack("<HxI", ServerPackets.MATCH_SCORE_UPDATE, length)
+
+
 # packet id: 50
 @cache
 def match_transfer_host() -> bytes:
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Literal
+from typing import Optional
+
+import discord
+from discord.ext import commands
+from moaizedong import botconfig
+
+import app.state
+import app.supervisor
+import app.utils
+from app.logging import Ansi
+from app.logging import log
+from app.processes import ipc
+
+# the discord bot runs in its own process, supervised by main.py;
+# it's run with `python -m app.processes.bot`.
+
+
+async def _load_cogs(client: commands.Bot) -> None:
+    """Load the bot's cogs, reloading any which are already loaded."""
+    for dir in os.listdir(f"{botconfig.PATH_TO_FILES}cogs"):
+        path = f"{botconfig.PATH_TO_FILES}cogs/{dir}"
+        if not os.path.isdir(path):
+            continue
+
+        for file in os.listdir(path):
+            if not file.endswith(".py") or file.startswith("_"):
+                continue
+
+            name = f"moaizedong.cogs.{dir}.{file[:-3]}"
+
+            try:
+                if name in client.extensions:
+                    await client.reload_extension(name)
+                else:
+                    await client.load_extension(name)
+            except Exception as exc:
+                log(f"[DISCORD BOT] Failed to load {dir}/{file}: {exc!r}", Ansi.LRED)
+            else:
+                log(f"[DISCORD BOT] Loaded {dir}/{file}")
+
+
+async def run() -> None:
+    """Run the discord bot."""
+    intents = discord.Intents.all()
+    client = commands.Bot(
+        command_prefix=botconfig.PREFIX,
+        intents=intents,
+        application_id=botconfig.APPLICATION_ID,
+    )
+    app.state.bot.client = client
+
+    await _load_cogs(client)
+
+    @client.event
+    async def on_ready() -> None:
+        log("[DISCORD BOT] Bot logged in", Ansi.GREEN)
+        log(f"Bot name: {client.user.name}")
+        log(f"Bot ID: {client.user.id}")
+        log(f"Bot Version: {app.state.bot.version}\n")
+
+    @client.command()
+    async def reloadbot(ctx: commands.Context) -> None:
+        """Reloads the bot."""
+        # Check if user is owner
+        if ctx.author.id not in botconfig.OWNERS:
+            return await ctx.send(
+                "You are not allowed to use this command.",
+                delete_after=10,
+            )
+
+        log("[DISCORD BOT] Reloading cogs...", Ansi.LYELLOW)
+        await ctx.send("Reloading bot, results in console...")
+        await _load_cogs(client)
+        log("[DISCORD BOT] Bot reloaded.", Ansi.LGREEN)
+
+    @client.command()
+    @commands.guild_only()
+    @commands.is_owner()
+    async def sync(
+        ctx: commands.Context,
+        guilds: commands.Greedy[discord.Object],
+        spec: Optional[Literal["~", "*", "^"]] = None,
+    ) -> None:
+        if not guilds:
+            if spec == "l":
+                synced = await ctx.bot.tree.sync(guild=ctx.guild)
+            elif spec == "*":
+                ctx.bot.tree.copy_global_to(guild=ctx.guild)
+                synced = await ctx.bot.tree.sync(guild=ctx.guild)
+            elif spec == "^":
+                ctx.bot.tree.clear_commands(guild=ctx.guild)
+                await ctx.bot.tree.sync(guild=ctx.guild)
+                synced = []
+            else:
+                synced = await ctx.bot.tree.sync()
+
+            await ctx.send(
+                f"Synced {len(synced)} commands {'globally' if spec is None else 'to the current guild.'}",
+            )
+            return
+
+        ret = 0
+        for guild in guilds:
+            try:
+                await ctx.bot.tree.sync(guild=guild)
+            except discord.HTTPException:
+                pass
+            else:
+                ret += 1
+
+        await ctx.send(f"Synced the tree to {ret}/{len(guilds)}.")
+
+    await client.start(botconfig.TOKEN)
+
+
+async def _forward_alerts() -> None:
+    """Dispatch alerts from bancho as `on_bancho_alert` events."""
+    async for alert in ipc.alerts():
+        app.state.bot.client.dispatch("bancho_alert", alert)
+
+
+async def main() -> int:
+    await app.state.services.database.connect()
+    await app.state.services.redis.initialize()
+
+    alerts_task = asyncio.create_task(_forward_alerts())
+
+    try:
+        await run()
+    finally:
+        alerts_task.cancel()
+        await app.state.services.database.disconnect()
+        await app.state.services.redis.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    app.supervisor.apply_memory_limit()
+    app.utils.setup_runtime_environment()
+    raise SystemExit(asyncio.run(main()))
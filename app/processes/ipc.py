@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import AsyncIterator
+from typing import TypedDict
+
+import orjson
+
+import app.settings
+import app.state
+
+# the website & discord bot run as separate processes (see app/supervisor.py),
+# so they can't read bancho's state directly; bancho periodically publishes
+# what they need to redis, and alerts are sent to them over pub/sub.
+
+ONLINE_PLAYERS_KEY = "bancho:ipc:online_players"  # :{worker_id}
+ONLINE_PLAYERS_TTL = 30  # seconds
+ALERTS_CHANNEL = "bancho:ipc:alerts"
+
+
+class OnlinePlayer(TypedDict):
+    id: int
+    name: str
+    country: str
+    action: int
+    info_text: str
+
+
+async def publish_online_players() -> None:
+    """Publish this worker's online players for the other processes."""
+    online_players: list[OnlinePlayer] = [
+        {
+            "id": player.id,
+            "name": player.name,
+            "country": player.geoloc["country"]["acronym"],
+            "action": player.status.action.value,
+            "info_text": player.status.info_text,
+        }
+        for player in app.state.sessions.players
+        if not player.bot_client and not player.restricted
+    ]
+
+    await app.state.services.redis.set(
+        f"{ONLINE_PLAYERS_KEY}:{app.settings.WORKER_ID}",
+        orjson.dumps(online_players),
+        ex=ONLINE_PLAYERS_TTL,
+    )
+
+
+async def fetch_online_players() -> list[OnlinePlayer]:
+    """Fetch the online players of all workers."""
+    redis = app.state.services.redis
+
+    keys = [key async for key in redis.scan_iter(match=f"{ONLINE_PLAYERS_KEY}:*")]
+    if not keys:
+        return []
+
+    online_players: list[OnlinePlayer] = []
+    for worker_players in await redis.mget(keys):
+        if worker_players is not None:
+            online_players.extend(orjson.loads(worker_players))
+
+    return online_players
+
+
+async def send_alert(msg: str) -> None:
+    """Send an alert to the discord bot (and any other listeners)."""
+    await app.state.services.redis.publish(ALERTS_CHANNEL, msg)
+
+
+async def alerts() -> AsyncIterator[str]:
+    """Yield alerts sent by bancho, indefinitely."""
+    pubsub = app.state.services.redis.pubsub()
+    await pubsub.subscribe(ALERTS_CHANNEL)
+
+    try:
+        async for message in pubsub.listen():
+            if message["type"] == "message":
+                yield message["data"]
+    finally:
+        await pubsub.unsubscribe(ALERTS_CHANNEL)
+        await pubsub.close()
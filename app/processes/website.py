@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+
+import zenith.zconfig as zconf
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+from quart import Quart
+from quart import render_template
+from quart import send_from_directory
+
+import app.state
+import app.supervisor
+import app.utils
+from app.logging import Ansi
+from app.logging import log
+from app.processes import ipc
+
+# the website runs in its own process, supervised by main.py;
+# it's run with `python -m app.processes.website`.
+
+
+async def run() -> None:
+    """Run the website."""
+    app = Quart(
+        __name__,
+        template_folder="/opt/gaug/zenith/templates/",
+        root_path="/opt/gaug/zenith/",
+        static_folder="/opt/gaug/zenith/static/",
+        instance_path="/opt/gaug/zenith/",
+    )
+
+    version = "1.3.0"
+
+    # used to secure session data.
+    # we recommend using a long randomly generated ascii string.
+    app.secret_key = zconf.secret_key
+    app.permanent_session_lifetime = dt.timedelta(days=30)
+    app.config["TEMPLATES_AUTO_RELOAD"] = True
+
+    # globals which can be used in template code
+    _version = repr(version)
+
+    @app.before_serving
+    @app.template_global()
+    def appVersion() -> str:
+        return _version
+
+    _app_name = zconf.app_name_short
+
+    @app.before_serving
+    @app.template_global()
+    def appName() -> str:
+        return _app_name
+
+    _app_name_l = zconf.app_name_long
+
+    @app.before_serving
+    @app.template_global()
+    def appNameLong() -> str:
+        return _app_name_l
+
+    _captcha_key = zconf.hCaptcha_sitekey
+
+    @app.before_serving
+    @app.template_global()
+    def captchaKey() -> str:
+        return _captcha_key
+
+    _domain = zconf.domain
+
+    @app.before_serving
+    @app.template_global()
+    def domain() -> str:
+        return _domain
+
+    # bancho's state lives in another process; read it from redis.
+    @app.template_global()
+    async def onlinePlayers() -> list[ipc.OnlinePlayer]:
+        return await ipc.fetch_online_players()
+
+    from zenith.blueprints.frontend import frontend
+
+    app.register_blueprint(frontend)
+    # from zenith.blueprints.users import users
+    # app.register_blueprint(users)
+    from zenith.blueprints.api import api
+
+    app.register_blueprint(api, url_prefix="/wapi")
+    from zenith.blueprints.admin import admin
+
+    app.register_blueprint(admin, url_prefix="/admin")
+
+    @app.errorhandler(404)
+    async def page_not_found(e):
+        # NOTE: we set the 404 status explicitly
+        return (await render_template(f"errors/404.html"), 404)
+
+    # Custom static data
+    @app.route("/cdn/tw-elements/<path:filename>")
+    async def custom_static(filename):
+        return await send_from_directory(
+            "/opt/gaug/zenith/static/js/twelements/",
+            filename,
+        )
+
+    # app.run(debug=zconf.debug) # blocking call
+    await serve(app, Config(), shutdown_trigger=lambda: asyncio.Future())
+
+
+async def main() -> int:
+    await app.state.services.database.connect()
+    await app.state.services.redis.initialize()
+
+    log("Website process started.", Ansi.LGREEN)
+
+    try:
+        await run()
+    finally:
+        await app.state.services.database.disconnect()
+        await app.state.services.redis.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    app.supervisor.apply_memory_limit()
+    app.utils.setup_runtime_environment()
+    raise SystemExit(asyncio.run(main()))
@@ -5,6 +5,9 @@ from typing import Any
 from typing import Optional
 
 import app.state.services
+from app.repositories.query_builder import build_pagination
+from app.repositories.query_builder import build_where
+from app.repositories.query_builder import fetch_cached_count
 
 # +------------+--------------+------+-----+---------+----------------+
 # | Field      | Type         | Null | Key | Default | Extra          |
@@ -67,16 +70,16 @@ async def fetch_one(
     """Fetch a single channel."""
     if id is None and name is None:
         raise ValueError("Must provide at least one parameter.")
+    filters = {
+        "id": id,
+        "name": name,
+    }
+    where, params = build_where(filters)
     query = f"""\
         SELECT {READ_PARAMS}
           FROM channels
-         WHERE id = COALESCE(:id, id)
-           AND name = COALESCE(:name, name)
+          {where}
     """
-    params = {
-        "id": id,
-        "name": name,
-    }
 
     rec = await app.state.services.database.fetch_one(query, params)
     return dict(rec) if rec is not None else None
@@ -90,22 +93,12 @@ async def fetch_count(
     if read_priv is None and write_priv is None and auto_join is None:
         raise ValueError("Must provide at least one parameter.")
 
-    query = """\
-        SELECT COUNT(*) AS count
-          FROM channels
-         WHERE read_priv = COALESCE(:read_priv, read_priv)
-           AND write_priv = COALESCE(:write_priv, write_priv)
-           AND auto_join = COALESCE(:auto_join, auto_join)
-    """
-    params = {
+    filters = {
         "read_priv": read_priv,
         "write_priv": write_priv,
         "auto_join": auto_join,
     }
-
-    rec = await app.state.services.database.fetch_one(query, params)
-    assert rec is not None
-    return rec["count"]
+    return await fetch_cached_count("channels", filters)
 
 
 async def fetch_many(
@@ -114,28 +107,23 @@ async def fetch_many(
     auto_join: Optional[bool] = None,
     page: Optional[int] = None,
     page_size: Optional[int] = None,
+    after_id: Optional[int] = None,
 ) -> list[dict[str, Any]]:
     """Fetch multiple channels from the database."""
-    query = f"""\
-        SELECT {READ_PARAMS}
-          FROM channels
-         WHERE read_priv = COALESCE(:read_priv, read_priv)
-           AND write_priv = COALESCE(:write_priv, write_priv)
-           AND auto_join = COALESCE(:auto_join, auto_join)
-    """
-    params = {
+    filters = {
         "read_priv": read_priv,
         "write_priv": write_priv,
         "auto_join": auto_join,
     }
-
-    if page is not None and page_size is not None:
-        query += """\
-            LIMIT :limit
-           OFFSET :offset
-        """
-        params["limit"] = page_size
-        params["offset"] = (page - 1) * page_size
+    where, params = build_where(filters, after_id)
+    pagination, pagination_params = build_pagination(page, page_size, after_id)
+    query = f"""\
+        SELECT {READ_PARAMS}
+          FROM channels
+          {where}
+          {pagination}
+    """
+    params |= pagination_params
 
     recs = await app.state.services.database.fetch_all(query, params)
     return [dict(rec) for rec in recs]
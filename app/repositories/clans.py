@@ -5,6 +5,9 @@ from typing import Any
 from typing import Optional
 
 import app.state.services
+from app.repositories.query_builder import build_pagination
+from app.repositories.query_builder import build_where
+from app.repositories.query_builder import fetch_cached_count
 
 # +------------+-------------+------+-----+---------+----------------+
 # | Field      | Type        | Null | Key | Default | Extra          |
@@ -63,48 +66,43 @@ async def fetch_one(
     if id is None and name is None and tag is None and owner is None:
         raise ValueError("Must provide at least one parameter.")
 
+    filters = {
+        "id": id,
+        "name": name,
+        "tag": tag,
+        "owner": owner,
+    }
+    where, params = build_where(filters)
     query = f"""\
         SELECT {READ_PARAMS}
           FROM clans
-         WHERE id = COALESCE(:id, id)
-           AND name = COALESCE(:name, name)
-           AND tag = COALESCE(:tag, tag)
-           AND owner = COALESCE(:owner, owner)
+          {where}
     """
-    params = {"id": id, "name": name, "tag": tag, "owner": owner}
+
     rec = await app.state.services.database.fetch_one(query, params)
     return dict(rec) if rec is not None else None
 
 
 async def fetch_count() -> int:
     """Fetch the number of clans in the database."""
-    query = """\
-        SELECT COUNT(*) AS count
-          FROM clans
-    """
-    rec = await app.state.services.database.fetch_one(query)
-    assert rec is not None
-    return rec["count"]
+    return await fetch_cached_count("clans", {})
 
 
 async def fetch_many(
     page: Optional[int] = None,
     page_size: Optional[int] = None,
+    after_id: Optional[int] = None,
 ) -> list[dict[str, Any]]:
     """Fetch many clans from the database."""
+    where, params = build_where({}, after_id)
+    pagination, pagination_params = build_pagination(page, page_size, after_id)
     query = f"""\
         SELECT {READ_PARAMS}
           FROM clans
+          {where}
+          {pagination}
     """
-    params = {}
-
-    if page is not None and page_size is not None:
-        query += """\
-            LIMIT :limit
-           OFFSET :offset
-        """
-        params["limit"] = page_size
-        params["offset"] = (page - 1) * page_size
+    params |= pagination_params
 
     recs = await app.state.services.database.fetch_all(query, params)
     return [dict(rec) for rec in recs]
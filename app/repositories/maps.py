@@ -2,9 +2,15 @@ from __future__ import annotations
 
 import textwrap
 from typing import Any
+from typing import AsyncIterator
 from typing import Optional
 
+import aiomysql
+
 import app.state.services
+from app.repositories.query_builder import build_pagination
+from app.repositories.query_builder import build_where
+from app.repositories.query_builder import fetch_cached_count
 
 # +--------------+------------------------+------+-----+---------+-------+
 # | Field        | Type                   | Null | Key | Default | Extra |
@@ -128,20 +134,18 @@ async def fetch_one(
     """Fetch a beatmap entry from the database."""
     if id is None and md5 is None and filename is None:
         raise ValueError("Must provide at least one parameter.")
-    query = f"""\
-        SELECT {READ_PARAMS}
-          FROM maps
-         WHERE server = COALESCE(:server, server)
-           AND id = COALESCE(:id, id)
-           AND md5 = COALESCE(:md5, md5)
-           AND filename = COALESCE(:filename, filename)
-    """
-    params = {
+    filters = {
         "server": server,
         "id": id,
         "md5": md5,
         "filename": filename,
     }
+    where, params = build_where(filters)
+    query = f"""\
+        SELECT {READ_PARAMS}
+          FROM maps
+          {where}
+    """
     rec = await app.state.services.database.fetch_one(query, params)
     return dict(rec) if rec is not None else None
 
@@ -157,20 +161,7 @@ async def fetch_count(
     frozen: Optional[bool] = None,
 ) -> int:
     """Fetch the number of maps in the database."""
-    query = """\
-        SELECT COUNT(*) AS count
-          FROM maps
-        WHERE server = COALESCE(:server, server)
-          AND set_id = COALESCE(:set_id, set_id)
-          AND status = COALESCE(:status, status)
-          AND artist = COALESCE(:artist, artist)
-          AND creator = COALESCE(:creator, creator)
-          AND filename = COALESCE(:filename, filename)
-          AND mode = COALESCE(:mode, mode)
-          AND frozen = COALESCE(:frozen, frozen)
-
-    """
-    params = {
+    filters = {
         "server": server,
         "set_id": set_id,
         "status": status,
@@ -180,9 +171,7 @@ async def fetch_count(
         "mode": mode,
         "frozen": frozen,
     }
-    rec = await app.state.services.database.fetch_one(query, params)
-    assert rec is not None
-    return rec["count"]
+    return await fetch_cached_count("maps", filters)
 
 
 async def fetch_many(
@@ -196,21 +185,10 @@ async def fetch_many(
     frozen: Optional[bool] = None,
     page: Optional[int] = None,
     page_size: Optional[int] = None,
+    after_id: Optional[int] = None,
 ) -> list[dict[str, Any]]:
     """Fetch a list of maps from the database."""
-    query = f"""\
-        SELECT {READ_PARAMS}
-          FROM maps
-         WHERE server = COALESCE(:server, server)
-           AND set_id = COALESCE(:set_id, set_id)
-           AND status = COALESCE(:status, status)
-           AND artist = COALESCE(:artist, artist)
-           AND creator = COALESCE(:creator, creator)
-           AND filename = COALESCE(:filename, filename)
-           AND mode = COALESCE(:mode, mode)
-           AND frozen = COALESCE(:frozen, frozen)
-    """
-    params = {
+    filters = {
         "server": server,
         "set_id": set_id,
         "status": status,
@@ -220,19 +198,152 @@ async def fetch_many(
         "mode": mode,
         "frozen": frozen,
     }
+    where, params = build_where(filters, after_id)
+    pagination, pagination_params = build_pagination(page, page_size, after_id)
+    query = f"""\
+        SELECT {READ_PARAMS}
+          FROM maps
+          {where}
+          {pagination}
+    """
+    params |= pagination_params
+
+    recs = await app.state.services.database.fetch_all(query, params)
+    return [dict(rec) for rec in recs]
+
 
-    if page is not None and page_size is not None:
-        query += """\
-            LIMIT :limit
-           OFFSET :offset
-        """
-        params["limit"] = page_size
-        params["offset"] = (page - 1) * page_size
+async def fetch_many_by_md5s(md5s: list[str]) -> list[dict[str, Any]]:
+    """Fetch the maps with the given md5s from the database."""
+    if not md5s:
+        return []
+
+    query = f"""\
+        SELECT {READ_PARAMS}
+          FROM maps
+         WHERE md5 IN ({", ".join(f":md5_{idx}" for idx in range(len(md5s)))})
+    """
+    params = {f"md5_{idx}": md5 for idx, md5 in enumerate(md5s)}
 
     recs = await app.state.services.database.fetch_all(query, params)
     return [dict(rec) for rec in recs]
 
 
+async def fetch_many_by_set_ids(set_ids: list[int]) -> list[dict[str, Any]]:
+    """Fetch the maps of all of the given sets from the database."""
+    if not set_ids:
+        return []
+
+    query = f"""\
+        SELECT {READ_PARAMS}
+          FROM maps
+         WHERE set_id IN ({", ".join(f":set_id_{idx}" for idx in range(len(set_ids)))})
+    """
+    params = {f"set_id_{idx}": set_id for idx, set_id in enumerate(set_ids)}
+
+    recs = await app.state.services.database.fetch_all(query, params)
+    return [dict(rec) for rec in recs]
+
+
+async def iterate_popular_sets(
+    limit: int,
+    statuses: list[int],
+    batch_size: int = 1000,
+) -> AsyncIterator[list[dict[str, Any]]]:
+    """\
+    Stream the maps of the most played sets, in batches of rows.
+
+    Sets are included if any of their maps have one of `statuses`, or
+    have been played; they're ordered by their plays, and each row has
+    its set's `last_osuapi_check`. Rows are read with a server-side
+    cursor, holding a connection until the iterator is exhausted.
+    """
+    columns = ", ".join(f"m.{column.strip()}" for column in READ_PARAMS.split(","))
+    query = f"""\
+        SELECT {columns}, ms.last_osuapi_check
+          FROM maps m
+         INNER JOIN mapsets ms ON ms.id = m.set_id AND ms.server = m.server
+         INNER JOIN (
+                SELECT set_id, SUM(plays) AS set_plays
+                  FROM maps
+                 WHERE status IN %(statuses)s OR plays > 0
+                 GROUP BY set_id
+                 ORDER BY set_plays DESC
+                 LIMIT %(limit)s
+              ) popular ON popular.set_id = m.set_id
+         WHERE ms.last_osuapi_check IS NOT NULL
+         ORDER BY popular.set_plays DESC, m.set_id
+    """
+    params = {"statuses": statuses, "limit": limit}
+
+    async with app.state.services.database.connection() as db_conn:
+        async with db_conn.raw_connection.cursor(aiomysql.SSDictCursor) as cursor:
+            await cursor.execute(query, params)
+
+            while rows := await cursor.fetchmany(batch_size):
+                yield rows
+
+
+# characters with special meaning in a boolean mode fulltext search
+FULLTEXT_OPERATORS = str.maketrans({c: " " for c in '+-<>()~*"@'})
+
+
+async def search_sets(
+    query: Optional[str] = None,
+    mode: Optional[int] = None,
+    status: Optional[int] = None,
+    page: int = 1,
+    page_size: int = 100,
+) -> list[dict[str, Any]]:
+    """Search for beatmap sets, returning all maps of the matching sets."""
+    where, params = build_where({"mode": mode, "status": status})
+
+    if query:
+        # require every word, matching by prefix
+        terms = query.translate(FULLTEXT_OPERATORS).split()
+        if terms:
+            where = f"{where} AND" if where else "WHERE"
+            where += (
+                " MATCH (artist, title, version, creator)"
+                " AGAINST (:query IN BOOLEAN MODE)"
+            )
+            params["query"] = " ".join(f"+{term}*" for term in terms)
+
+    set_ids_query = f"""\
+        SELECT set_id
+          FROM maps
+          {where}
+         GROUP BY set_id
+         ORDER BY MAX(last_update) DESC
+         LIMIT :limit OFFSET :offset
+    """
+    params["limit"] = page_size
+    params["offset"] = (page - 1) * page_size
+
+    set_ids = [
+        rec["set_id"]
+        for rec in await app.state.services.database.fetch_all(set_ids_query, params)
+    ]
+    if not set_ids:
+        return []
+
+    maps_query = f"""\
+        SELECT {READ_PARAMS}
+          FROM maps
+         WHERE set_id IN ({", ".join(f":set_id_{idx}" for idx in range(len(set_ids)))})
+    """
+    recs = await app.state.services.database.fetch_all(
+        maps_query,
+        {f"set_id_{idx}": set_id for idx, set_id in enumerate(set_ids)},
+    )
+
+    # keep the sets in the order they were found
+    set_order = {set_id: idx for idx, set_id in enumerate(set_ids)}
+    return sorted(
+        (dict(rec) for rec in recs),
+        key=lambda rec: set_order[rec["set_id"]],
+    )
+
+
 async def update(
     id: int,
     server: Optional[str] = None,
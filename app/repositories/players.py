@@ -5,6 +5,9 @@ from typing import Any
 from typing import Optional
 
 import app.state.services
+from app.repositories.query_builder import build_pagination
+from app.repositories.query_builder import build_where
+from app.repositories.query_builder import fetch_cached_count
 from app.utils import make_safe_name
 
 # +-------------------+---------------+------+-----+---------+----------------+
@@ -84,25 +87,42 @@ async def fetch_one(
     if id is None and name is None and email is None and discord_id is None:
         raise ValueError("Must provide at least one parameter.")
 
-    query = f"""\
-        SELECT {'*' if fetch_all_fields else READ_PARAMS}
-          FROM users
-         WHERE id = COALESCE(:id, id)
-           AND safe_name = COALESCE(:safe_name, safe_name)
-           AND email = COALESCE(:email, email)
-           AND discord_id = COALESCE(:discord_id, discord_id)
-    """
-    params = {
+    filters = {
         "id": id,
         "safe_name": make_safe_name(name) if name is not None else None,
         "email": email,
         "discord_id": discord_id,
     }
+    where, params = build_where(filters)
+    query = f"""\
+        SELECT {'*' if fetch_all_fields else READ_PARAMS}
+          FROM users
+          {where}
+    """
 
     rec = await app.state.services.database.fetch_one(query, params)
     return dict(rec) if rec is not None else None
 
 
+async def fetch_many_by_ids(
+    ids: list[int],
+    fetch_all_fields: bool = False,
+) -> list[dict[str, Any]]:
+    """Fetch the players with the given ids from the database."""
+    if not ids:
+        return []
+
+    query = f"""\
+        SELECT {'*' if fetch_all_fields else READ_PARAMS}
+          FROM users
+         WHERE id IN ({", ".join(f":id_{idx}" for idx in range(len(ids)))})
+    """
+    params = {f"id_{idx}": player_id for idx, player_id in enumerate(ids)}
+
+    recs = await app.state.services.database.fetch_all(query, params)
+    return [dict(rec) for rec in recs]
+
+
 async def fetch_count(
     priv: Optional[int] = None,
     country: Optional[str] = None,
@@ -112,17 +132,7 @@ async def fetch_count(
     play_style: Optional[int] = None,
 ) -> int:
     """Fetch the number of players in the database."""
-    query = """\
-        SELECT COUNT(*) AS count
-          FROM users
-         WHERE priv = COALESCE(:priv, priv)
-           AND country = COALESCE(:country, country)
-           AND clan_id = COALESCE(:clan_id, clan_id)
-           AND clan_priv = COALESCE(:clan_priv, clan_priv)
-           AND preferred_mode = COALESCE(:preferred_mode, preferred_mode)
-           AND play_style = COALESCE(:play_style, play_style)
-    """
-    params = {
+    filters = {
         "priv": priv,
         "country": country,
         "clan_id": clan_id,
@@ -130,9 +140,7 @@ async def fetch_count(
         "preferred_mode": preferred_mode,
         "play_style": play_style,
     }
-    rec = await app.state.services.database.fetch_one(query, params)
-    assert rec is not None
-    return rec["count"]
+    return await fetch_cached_count("users", filters)
 
 
 async def fetch_many(
@@ -144,19 +152,10 @@ async def fetch_many(
     play_style: Optional[int] = None,
     page: Optional[int] = None,
     page_size: Optional[int] = None,
+    after_id: Optional[int] = None,
 ) -> list[dict[str, Any]]:
     """Fetch multiple players from the database."""
-    query = f"""\
-        SELECT {READ_PARAMS}
-          FROM users
-         WHERE priv = COALESCE(:priv, priv)
-           AND country = COALESCE(:country, country)
-           AND clan_id = COALESCE(:clan_id, clan_id)
-           AND clan_priv = COALESCE(:clan_priv, clan_priv)
-           AND preferred_mode = COALESCE(:preferred_mode, preferred_mode)
-           AND play_style = COALESCE(:play_style, play_style)
-    """
-    params = {
+    filters = {
         "priv": priv,
         "country": country,
         "clan_id": clan_id,
@@ -164,14 +163,15 @@ async def fetch_many(
         "preferred_mode": preferred_mode,
         "play_style": play_style,
     }
-
-    if page is not None and page_size is not None:
-        query += """\
-            LIMIT :limit
-           OFFSET :offset
-        """
-        params["limit"] = page_size
-        params["offset"] = (page - 1) * page_size
+    where, params = build_where(filters, after_id)
+    pagination, pagination_params = build_pagination(page, page_size, after_id)
+    query = f"""\
+        SELECT {READ_PARAMS}
+          FROM users
+          {where}
+          {pagination}
+    """
+    params |= pagination_params
 
     recs = await app.state.services.database.fetch_all(query, params)
     return [dict(rec) for rec in recs]
@@ -250,4 +250,3 @@ async def update(
     }
     rec = await app.state.services.database.fetch_one(query, params)
     return dict(rec) if rec is not None else None
-
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+from typing import Mapping
+from typing import Optional
+
+import app.state.services
+
+# predicates like `col = COALESCE(:col, col)` can't use an index,
+# so we only ever emit the predicates which were actually supplied.
+
+COUNT_CACHE_TTL = 10  # seconds
+COUNT_CACHE_MAX_SIZE = 4096
+
+# {(table, where clause, params): (expiry, count)}
+_count_cache: dict[tuple[str, str, frozenset[tuple[str, Any]]], tuple[float, int]] = {}
+
+
+def build_where(
+    filters: Mapping[str, Any],
+    after_id: Optional[int] = None,
+) -> tuple[str, dict[str, Any]]:
+    """Build a WHERE clause from the filters which aren't None."""
+    conditions: list[str] = []
+    params: dict[str, Any] = {}
+
+    for column, value in filters.items():
+        if value is not None:
+            conditions.append(f"{column} = :{column}")
+            params[column] = value
+
+    if after_id is not None:
+        # keyset pagination; resume after the last id seen
+        conditions.append("id > :after_id")
+        params["after_id"] = after_id
+
+    if not conditions:
+        return "", params
+
+    return "WHERE " + " AND ".join(conditions), params
+
+
+def build_pagination(
+    page: Optional[int] = None,
+    page_size: Optional[int] = None,
+    after_id: Optional[int] = None,
+) -> tuple[str, dict[str, Any]]:
+    """Build a LIMIT clause, using the keyset if one was given."""
+    if page_size is None:
+        return "", {}
+
+    if after_id is not None:
+        return "ORDER BY id LIMIT :limit", {"limit": page_size}
+
+    if page is None:
+        return "", {}
+
+    return "LIMIT :limit OFFSET :offset", {
+        "limit": page_size,
+        "offset": (page - 1) * page_size,
+    }
+
+
+async def fetch_cached_count(table: str, filters: Mapping[str, Any]) -> int:
+    """Fetch the number of rows matching `filters`, cached for a short time."""
+    where, params = build_where(filters)
+    cache_key = (table, where, frozenset(params.items()))
+    now = time.time()
+
+    cached = _count_cache.get(cache_key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    query = f"SELECT COUNT(*) AS count FROM {table} {where}"
+    rec = await app.state.services.database.fetch_one(query, params)
+    assert rec is not None
+
+    if len(_count_cache) >= COUNT_CACHE_MAX_SIZE:
+        _count_cache.clear()
+
+    _count_cache[cache_key] = (now + COUNT_CACHE_TTL, rec["count"])
+    return rec["count"]
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import textwrap
+from typing import Any
+from typing import Optional
+
+import app.state.services
+
+# +-------------+------------+------+-----+---------+-------+
+# | Field       | Type       | Null | Key | Default | Extra |
+# +-------------+------------+------+-----+---------+-------+
+# | map_md5     | char(32)   | NO   | PRI | NULL    |       |
+# | rating_sum  | int        | NO   |     | 0       |       |
+# | num_ratings | int        | NO   |     | 0       |       |
+# +-------------+------------+------+-----+---------+-------+
+# map_ratings holds the aggregates of each map's rows in ratings,
+# which are maintained alongside them as ratings are submitted.
+
+READ_PARAMS = textwrap.dedent(
+    """\
+        map_md5, rating_sum, num_ratings
+    """,
+)
+
+
+async def create(user_id: int, map_md5: str, rating: int) -> dict[str, Any]:
+    """Submit a player's rating of a map, returning the map's new aggregates."""
+    async with app.state.services.database.transaction():
+        query = """\
+            INSERT INTO ratings (userid, map_md5, rating)
+                 VALUES (:user_id, :map_md5, :rating)
+        """
+        params = {
+            "user_id": user_id,
+            "map_md5": map_md5,
+            "rating": rating,
+        }
+        await app.state.services.database.execute(query, params)
+
+        query = """\
+            INSERT INTO map_ratings (map_md5, rating_sum, num_ratings)
+                 VALUES (:map_md5, :rating, 1)
+                     ON DUPLICATE KEY UPDATE rating_sum = rating_sum + VALUES(rating_sum),
+                                             num_ratings = num_ratings + 1
+        """
+        params = {
+            "map_md5": map_md5,
+            "rating": rating,
+        }
+        await app.state.services.database.execute(query, params)
+
+        query = f"""\
+            SELECT {READ_PARAMS}
+              FROM map_ratings
+             WHERE map_md5 = :map_md5
+        """
+        params = {
+            "map_md5": map_md5,
+        }
+        rec = await app.state.services.database.fetch_one(query, params)
+
+    assert rec is not None
+    return dict(rec)
+
+
+async def fetch_one(map_md5: str) -> Optional[dict[str, Any]]:
+    """Fetch a map's rating aggregates from the database."""
+    query = f"""\
+        SELECT {READ_PARAMS}
+          FROM map_ratings
+         WHERE map_md5 = :map_md5
+    """
+    params = {
+        "map_md5": map_md5,
+    }
+    rec = await app.state.services.database.fetch_one(query, params)
+    return dict(rec) if rec is not None else None
+
+
+async def user_has_rated(user_id: int, map_md5: str) -> bool:
+    """Check whether a player has rated a map."""
+    query = """\
+        SELECT 1
+          FROM ratings
+         WHERE userid = :user_id
+           AND map_md5 = :map_md5
+    """
+    params = {
+        "user_id": user_id,
+        "map_md5": map_md5,
+    }
+    rec = await app.state.services.database.fetch_one(query, params)
+    return rec is not None
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import textwrap
+from typing import Any
+from typing import Collection
+from typing import Optional
+
+import app.state.services
+
+# +----------------+-----------------+------+-----+---------+-------+
+# | Field          | Type            | Null | Key | Default | Extra |
+# +----------------+-----------------+------+-----+---------+-------+
+# | score_id       | bigint unsigned | NO   | PRI | NULL    |       |
+# | segment        | varchar(32)     | NO   | MUL | NULL    |       |
+# | segment_offset | bigint unsigned | NO   |     | NULL    |       |
+# | length         | int unsigned    | NO   |     | NULL    |       |
+# +----------------+-----------------+------+-----+---------+-------+
+# the location of each score's replay within the replay segment files.
+
+READ_PARAMS = textwrap.dedent(
+    """\
+        score_id, segment, segment_offset, length
+    """,
+)
+
+
+async def create(score_id: int, segment: str, segment_offset: int, length: int) -> None:
+    """Create (or move) a replay's location in the database."""
+    query = """\
+        REPLACE INTO replays (score_id, segment, segment_offset, length)
+             VALUES (:score_id, :segment, :segment_offset, :length)
+    """
+    params = {
+        "score_id": score_id,
+        "segment": segment,
+        "segment_offset": segment_offset,
+        "length": length,
+    }
+    await app.state.services.database.execute(query, params)
+
+
+async def create_many(recs: list[dict[str, Any]]) -> None:
+    """Create (or move) many replays' locations in the database."""
+    if not recs:
+        return
+
+    query = """\
+        REPLACE INTO replays (score_id, segment, segment_offset, length)
+             VALUES (:score_id, :segment, :segment_offset, :length)
+    """
+    await app.state.services.database.execute_many(query, recs)
+
+
+async def fetch_one(score_id: int) -> Optional[dict[str, Any]]:
+    """Fetch a replay's location from the database."""
+    query = f"""\
+        SELECT {READ_PARAMS}
+          FROM replays
+         WHERE score_id = :score_id
+    """
+    params = {
+        "score_id": score_id,
+    }
+    rec = await app.state.services.database.fetch_one(query, params)
+    return dict(rec) if rec is not None else None
+
+
+async def fetch_many_by_segment(segment: str) -> list[dict[str, Any]]:
+    """Fetch the locations of all replays within a segment from the database."""
+    query = f"""\
+        SELECT {READ_PARAMS}
+          FROM replays
+         WHERE segment = :segment
+         ORDER BY segment_offset
+    """
+    params = {
+        "segment": segment,
+    }
+    recs = await app.state.services.database.fetch_all(query, params)
+    return [dict(rec) for rec in recs]
+
+
+async def fetch_live_bytes(segments: list[str]) -> dict[str, int]:
+    """Fetch the total length of the replays within each segment."""
+    if not segments:
+        return {}
+
+    query = f"""\
+        SELECT segment, SUM(length) live_bytes
+          FROM replays
+         WHERE segment IN ({", ".join(f":segment_{idx}" for idx in range(len(segments)))})
+         GROUP BY segment
+    """
+    params = {f"segment_{idx}": segment for idx, segment in enumerate(segments)}
+
+    recs = await app.state.services.database.fetch_all(query, params)
+    return {rec["segment"]: int(rec["live_bytes"]) for rec in recs}
+
+
+async def delete_by_map_md5s(map_md5s: Collection[str]) -> None:
+    """Delete the locations of all replays on the given maps from the database."""
+    if not map_md5s:
+        return
+
+    params = {
+        "map_md5s": map_md5s,
+    }
+
+    for table in ("scores", "scores_archive"):
+        query = f"""\
+            DELETE replays
+              FROM replays
+             INNER JOIN {table} s ON s.id = replays.score_id
+             WHERE s.map_md5 IN :map_md5s
+        """
+        await app.state.services.database.execute(query, params)
@@ -1,10 +1,16 @@
 from __future__ import annotations
 
 import textwrap
+from datetime import date
+from datetime import datetime
 from typing import Any
+from typing import Collection
 from typing import Optional
 
 import app.state.services
+from app.repositories.query_builder import build_pagination
+from app.repositories.query_builder import build_where
+from app.repositories.query_builder import fetch_cached_count
 
 # +-----------------+-----------------+------+-----+---------+----------------+
 # | Field           | Type            | Null | Key | Default | Extra          |
@@ -32,6 +38,8 @@ import app.state.services
 # | perfect         | tinyint(1)      | NO   |     | NULL    |                |
 # | online_checksum | char(32)        | NO   |     | NULL    |                |
 # +-----------------+-----------------+------+-----+---------+----------------+
+# scores_archive has the same columns, and holds old non-best scores moved
+# out of scores; partitioned by the month they were played in.
 
 READ_PARAMS = textwrap.dedent(
     """\
@@ -110,7 +118,10 @@ async def create(
     return dict(rec)
 
 
-async def fetch_one(id: int) -> Optional[dict[str, Any]]:
+async def fetch_one(
+    id: int,
+    include_archived: bool = False,
+) -> Optional[dict[str, Any]]:
     query = f"""\
         SELECT {READ_PARAMS}
           FROM scores
@@ -118,6 +129,15 @@ async def fetch_one(id: int) -> Optional[dict[str, Any]]:
     """
     params = {"id": id}
     rec = await app.state.services.database.fetch_one(query, params)
+
+    if rec is None and include_archived:
+        query = f"""\
+            SELECT {READ_PARAMS}
+              FROM scores_archive
+             WHERE id = :id
+        """
+        rec = await app.state.services.database.fetch_one(query, params)
+
     return dict(rec) if rec is not None else None
 
 
@@ -127,26 +147,21 @@ async def fetch_count(
     status: Optional[int] = None,
     mode: Optional[int] = None,
     user_id: Optional[int] = None,
+    include_archived: bool = False,
 ) -> int:
-    query = """\
-        SELECT COUNT(*) AS count
-          FROM scores
-         WHERE map_md5 = COALESCE(:map_md5, map_md5)
-           AND mods = COALESCE(:mods, mods)
-           AND status = COALESCE(:status, status)
-           AND mode = COALESCE(:mode, mode)
-           AND userid = COALESCE(:userid, userid)
-    """
-    params = {
+    filters = {
         "map_md5": map_md5,
         "mods": mods,
         "status": status,
         "mode": mode,
         "userid": user_id,
     }
-    rec = await app.state.services.database.fetch_one(query, params)
-    assert rec is not None
-    return rec["count"]
+    count = await fetch_cached_count("scores", filters)
+
+    if include_archived:
+        count += await fetch_cached_count("scores_archive", filters)
+
+    return count
 
 
 async def fetch_many(
@@ -157,30 +172,39 @@ async def fetch_many(
     user_id: Optional[int] = None,
     page: Optional[int] = None,
     page_size: Optional[int] = None,
+    after_id: Optional[int] = None,
+    include_archived: bool = False,
 ) -> list[dict[str, Any]]:
-    query = f"""\
-        SELECT {READ_PARAMS}
-          FROM scores
-         WHERE map_md5 = COALESCE(:map_md5, map_md5)
-           AND mods = COALESCE(:mods, mods)
-           AND status = COALESCE(:status, status)
-           AND mode = COALESCE(:mode, mode)
-           AND userid = COALESCE(:userid, userid)
-    """
-    params = {
+    filters = {
         "map_md5": map_md5,
         "mods": mods,
         "status": status,
         "mode": mode,
         "userid": user_id,
     }
-    if page is not None and page_size is not None:
-        query += """\
-            LIMIT :page_size
-           OFFSET :offset
+    where, params = build_where(filters, after_id)
+    pagination, pagination_params = build_pagination(page, page_size, after_id)
+
+    if include_archived:
+        query = f"""\
+            SELECT {READ_PARAMS}
+              FROM (SELECT {READ_PARAMS}
+                      FROM scores
+                      {where}
+                     UNION ALL
+                    SELECT {READ_PARAMS}
+                      FROM scores_archive
+                      {where}) scores
+              {pagination}
         """
-        params["page_size"] = page_size
-        params["offset"] = (page - 1) * page_size
+    else:
+        query = f"""\
+            SELECT {READ_PARAMS}
+              FROM scores
+              {where}
+              {pagination}
+        """
+    params |= pagination_params
 
     recs = await app.state.services.database.fetch_all(query, params)
     return [dict(rec) for rec in recs]
@@ -215,3 +239,90 @@ async def update(
 
 
 # TODO: delete
+
+
+async def fetch_archivable(played_before: datetime, limit: int) -> list[dict[str, Any]]:
+    """Fetch the oldest non-best scores played before a given time."""
+    # the newest score is never archived, as mysql may reset
+    # the auto increment to max(id) + 1 when it's restarted.
+    query = """\
+        SELECT id, play_time
+          FROM scores
+         WHERE status < 2
+           AND play_time < :played_before
+           AND id < (SELECT MAX(id) FROM scores)
+         ORDER BY id
+         LIMIT :limit
+    """
+    params = {
+        "played_before": played_before,
+        "limit": limit,
+    }
+    recs = await app.state.services.database.fetch_all(query, params)
+    return [dict(rec) for rec in recs]
+
+
+async def archive_many(ids: list[int]) -> None:
+    """Move non-best scores from scores into scores_archive."""
+    if not ids:
+        return
+
+    where = f"""\
+        WHERE id IN ({", ".join(f":id_{idx}" for idx in range(len(ids)))})
+          AND status < 2
+    """
+    params = {f"id_{idx}": id for idx, id in enumerate(ids)}
+
+    async with app.state.services.database.transaction():
+        await app.state.services.database.execute(
+            f"INSERT INTO scores_archive SELECT * FROM scores {where}",
+            params,
+        )
+        await app.state.services.database.execute(
+            f"DELETE FROM scores {where}",
+            params,
+        )
+
+
+async def delete_by_map_md5s(map_md5s: Collection[str]) -> None:
+    """Delete all scores on the given maps, including archived scores."""
+    if not map_md5s:
+        return
+
+    params = {
+        "map_md5s": map_md5s,
+    }
+
+    for table in ("scores", "scores_archive"):
+        query = f"""\
+            DELETE FROM {table}
+             WHERE map_md5 IN :map_md5s
+        """
+        await app.state.services.database.execute(query, params)
+
+
+async def fetch_archive_partitions() -> list[str]:
+    """Fetch the names of scores_archive's partitions, in order."""
+    query = """\
+        SELECT PARTITION_NAME partition_name
+          FROM information_schema.PARTITIONS
+         WHERE TABLE_SCHEMA = DATABASE()
+           AND TABLE_NAME = 'scores_archive'
+           AND PARTITION_NAME IS NOT NULL
+         ORDER BY PARTITION_ORDINAL_POSITION
+    """
+    recs = await app.state.services.database.fetch_all(query)
+    return [rec["partition_name"] for rec in recs]
+
+
+async def create_archive_partition(name: str, played_before: date) -> None:
+    """Split a partition for scores played before a given date off of
+    scores_archive's catch-all partition, which must be the newest."""
+    query = f"""\
+        ALTER TABLE scores_archive
+        REORGANIZE PARTITION pmax INTO (
+            PARTITION {name} VALUES LESS THAN (TO_DAYS('{played_before:%Y-%m-%d}')),
+            PARTITION pmax VALUES LESS THAN MAXVALUE
+        )
+    """
+    await app.state.services.database.execute(query)
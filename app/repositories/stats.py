@@ -5,6 +5,9 @@ from typing import Any
 from typing import Optional
 
 import app.state.services
+from app.repositories.query_builder import build_pagination
+from app.repositories.query_builder import build_where
+from app.repositories.query_builder import fetch_cached_count
 
 # +--------------+-----------------+------+-----+---------+----------------+
 # | Field        | Type            | Null | Key | Default | Extra          |
@@ -117,19 +120,11 @@ async def fetch_count(
     player_id: Optional[int] = None,
     mode: Optional[int] = None,
 ) -> int:
-    query = """\
-        SELECT COUNT(*) AS count
-          FROM stats
-         WHERE id = COALESCE(:id, id)
-           AND mode = COALESCE(:mode, mode)
-    """
-    params = {
+    filters = {
         "id": player_id,
         "mode": mode,
     }
-    rec = await app.state.services.database.fetch_one(query, params)
-    assert rec is not None
-    return rec["count"]
+    return await fetch_cached_count("stats", filters)
 
 
 async def fetch_many(
@@ -138,24 +133,19 @@ async def fetch_many(
     page: Optional[int] = None,
     page_size: Optional[int] = None,
 ) -> list[dict[str, Any]]:
+    filters = {
+        "id": player_id,
+        "mode": mode,
+    }
+    where, params = build_where(filters)
+    pagination, pagination_params = build_pagination(page, page_size)
     query = f"""\
         SELECT {READ_PARAMS}
           FROM stats
-         WHERE id = COALESCE(:id, id)
-           AND mode = COALESCE(:mode, mode)
+          {where}
+          {pagination}
     """
-    params = {
-        "id": player_id,
-        "mode": mode,
-    }
-
-    if page is not None and page_size is not None:
-        query += """\
-            LIMIT :limit
-           OFFSET :offset
-        """
-        params["limit"] = page_size
-        params["offset"] = (page - 1) * page_size
+    params |= pagination_params
 
     recs = await app.state.services.database.fetch_all(query, params)
     return [dict(rec) for rec in recs]
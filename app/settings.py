@@ -63,10 +63,25 @@ DATADOG_API_KEY = os.environ["DATADOG_API_KEY"]
 DATADOG_APP_KEY = os.environ["DATADOG_APP_KEY"]
 
 DEBUG = read_bool(os.environ["DEBUG"])
+
+# run as one of many workers, sharing sessions & broadcasts via redis
+MULTI_WORKER = read_bool(os.environ["MULTI_WORKER"])
+WORKER_ID = os.environ["WORKER_ID"]
+
+# the website & discord bot are run as separate, supervised processes
+RUN_WEBSITE = read_bool(os.environ["RUN_WEBSITE"])
+RUN_DISCORD_BOT = read_bool(os.environ["RUN_DISCORD_BOT"])
+SUBPROCESS_MEMORY_LIMIT = int(os.environ["SUBPROCESS_MEMORY_LIMIT"])  # MiB
 REDIRECT_OSU_URLS = read_bool(os.environ["REDIRECT_OSU_URLS"])
 
 PP_CACHED_ACCURACIES = [int(acc) for acc in read_list(os.environ["PP_CACHED_ACCS"])]
 
+# the number of most played beatmap sets to load into the cache on startup
+BEATMAP_CACHE_WARMUP_LIMIT = int(os.environ["BEATMAP_CACHE_WARMUP_LIMIT"])
+
+# the age in days at which failed & superseded scores are archived
+SCORE_ARCHIVE_AGE = int(os.environ["SCORE_ARCHIVE_AGE"])
+
 DISALLOWED_NAMES = read_list(os.environ["DISALLOWED_NAMES"])
 DISALLOWED_PASSWORDS = read_list(os.environ["DISALLOWED_PASSWORDS"])
 DISALLOW_OLD_CLIENTS = read_bool(os.environ["DISALLOW_OLD_CLIENTS"])
@@ -87,4 +102,4 @@ DEVELOPER_MODE = read_bool(os.environ["DEVELOPER_MODE"])
 ## WARNING touch this if you know how
 ##          the migrations system works.
 ##          you'll regret it.
-VERSION = "4.7.3"
+VERSION = "4.7.7"
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+from . import bus
 from . import cache
 from . import services
 from . import sessions
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import base64
+import time
+from typing import Any
+from typing import Optional
+from typing import Sequence
+
+import orjson
+
+import app.settings
+import app.state
+from app.logging import Ansi
+from app.logging import log
+
+# in multi-worker mode, each worker owns the sessions which logged in
+# through it (their tokens are prefixed by the worker's id, so a proxy
+# can route polls back to it), and all cross-worker state is shared
+# through redis; session metadata in a hash, and broadcasts over pub/sub.
+
+BROADCAST_CHANNEL = "bancho:broadcast"
+ONLINE_KEY = "bancho:online"  # {player_id: worker_id}
+WORKERS_KEY = "bancho:workers"  # {worker_id: last heartbeat}
+
+# workers which haven't sent a heartbeat within this long are
+# considered to have crashed, and their sessions are removed.
+WORKER_HEARTBEAT_INTERVAL = 10  # seconds
+WORKER_TIMEOUT = 30  # seconds
+
+# only remove a session if it's still ours; the
+# player may have since logged in through another worker.
+UNTRACK_SCRIPT = """\
+if redis.call("HGET", KEYS[1], ARGV[1]) == ARGV[2] then
+    return redis.call("HDEL", KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+# events & session updates are batched, and published
+# to redis at most once per event loop iteration.
+_events: list[list[Any]] = []
+_sessions: dict[int, Optional[str]] = {}  # {player_id: worker_id or None}
+_flush_scheduled = False
+
+
+def _encode(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+def _decode(data: str) -> bytes:
+    return base64.b64decode(data)
+
+
+def _schedule_flush() -> None:
+    global _flush_scheduled
+
+    if not _flush_scheduled:
+        _flush_scheduled = True
+        app.state.loop.create_task(_flush())
+
+
+async def _flush() -> None:
+    global _flush_scheduled
+    _flush_scheduled = False
+
+    events = _events.copy()
+    sessions = _sessions.copy()
+    _events.clear()
+    _sessions.clear()
+
+    async with app.state.services.redis.pipeline() as pipe:
+        for player_id, worker_id in sessions.items():
+            if worker_id is not None:
+                pipe.hset(ONLINE_KEY, str(player_id), worker_id)
+            else:
+                pipe.eval(
+                    UNTRACK_SCRIPT,
+                    1,
+                    ONLINE_KEY,
+                    str(player_id),
+                    app.settings.WORKER_ID,
+                )
+
+        if events:
+            pipe.publish(
+                BROADCAST_CHANNEL,
+                orjson.dumps({"worker": app.settings.WORKER_ID, "events": events}),
+            )
+
+        await pipe.execute()
+
+
+def publish(*event: Any) -> None:
+    """Publish `event` to all other workers."""
+    _events.append(list(event))
+    _schedule_flush()
+
+
+def track_session(player_id: int) -> None:
+    """Mark `player_id` as online through this worker."""
+    _sessions[player_id] = app.settings.WORKER_ID
+    _schedule_flush()
+
+
+def untrack_session(player_id: int) -> None:
+    """Mark `player_id` as no longer online through this worker."""
+    _sessions[player_id] = None
+    _schedule_flush()
+
+
+async def fetch_session_worker(player_id: int) -> Optional[str]:
+    """Fetch the id of the worker `player_id` is online through, if any."""
+    return await app.state.services.redis.hget(ONLINE_KEY, str(player_id))
+
+
+# publishers, called by the collections' local counterparts
+
+
+def broadcast(data: bytes, immune: Sequence[int] = ()) -> None:
+    """Enqueue `data` to all players on other workers."""
+    publish("players", _encode(data), list(immune))
+
+
+def broadcast_channel(
+    channel_name: str,
+    data: bytes,
+    immune: Sequence[int] = (),
+    sender_id: Optional[int] = None,
+) -> None:
+    """Enqueue `data` to members of `channel_name` on other workers."""
+    publish("channel", channel_name, _encode(data), list(immune), sender_id)
+
+
+def send_to_player(player_id: int, data: bytes, sender_id: Optional[int]) -> None:
+    """Enqueue `data` to `player_id` on whichever worker they're on."""
+    publish("player", player_id, _encode(data), sender_id)
+
+
+def update_presence(player_id: int, data: Optional[bytes]) -> None:
+    """Update `player_id`'s segment of other workers' presence snapshots."""
+    publish("presence", player_id, _encode(data) if data is not None else None)
+
+
+def logout(player_id: int) -> None:
+    """Log `player_id` out of whichever worker they're on."""
+    publish("logout", player_id)
+
+
+# subscriber, delivering events into our local player queues
+
+
+def _handle_event(worker_id: str, kind: str, *args: Any) -> None:
+    players = app.state.sessions.players
+
+    if kind == "players":
+        data, immune = _decode(args[0]), args[1]
+        for player in players:
+            if player.id not in immune:
+                player.enqueue(data)
+
+    elif kind == "channel":
+        channel_name, data, immune, sender_id = args
+        channel = app.state.sessions.channels.get_by_name(channel_name)
+        if channel is None:
+            return
+
+        data = _decode(data)
+        for player in channel.players:
+            if player.id not in immune and sender_id not in player.blocks:
+                player.enqueue(data)
+
+    elif kind == "player":
+        player_id, data, sender_id = args
+        player = players.get(id=player_id)
+        if player is not None and sender_id not in player.blocks:
+            player.enqueue(_decode(data))
+
+    elif kind == "presence":
+        player_id, data = args
+        players.set_remote_presence(
+            player_id,
+            _decode(data) if data is not None else None,
+            worker_id,
+        )
+
+    elif kind == "logout":
+        player = players.get(id=args[0])
+        if player is not None:
+            # they've logged in through another worker, which
+            # has already sent out their new presence.
+            player.logout(broadcast=False)
+
+    elif kind == "reset":
+        # the worker has (re)started; forget the sessions from its
+        # previous run, and send it the presences of our players.
+        players.remove_remote_presences(worker_id)
+        players.publish_presences()
+
+    elif app.settings.DEBUG:
+        log(f"Unknown bus event {kind!r}.", Ansi.LYELLOW)
+
+
+async def listen() -> None:
+    """Deliver events published by other workers, indefinitely."""
+    # clear out any sessions left behind by a previous run of this worker.
+    await remove_sessions()
+    await heartbeat()
+
+    pubsub = app.state.services.redis.pubsub()
+    await pubsub.subscribe(BROADCAST_CHANNEL)
+
+    publish("reset")
+
+    try:
+        async for message in pubsub.listen():
+            if message["type"] != "message":
+                continue
+
+            payload = orjson.loads(message["data"])
+            if payload["worker"] == app.settings.WORKER_ID:
+                continue  # our own events
+
+            for event in payload["events"]:
+                _handle_event(payload["worker"], *event)
+    finally:
+        await pubsub.unsubscribe(BROADCAST_CHANNEL)
+        await pubsub.close()
+
+
+async def remove_sessions(worker_id: Optional[str] = None) -> None:
+    """Remove all of a worker's sessions from the shared metadata."""
+    redis = app.state.services.redis
+
+    if worker_id is None:
+        worker_id = app.settings.WORKER_ID
+
+    player_ids = [
+        player_id
+        for player_id, online_worker_id in (await redis.hgetall(ONLINE_KEY)).items()
+        if online_worker_id == worker_id
+    ]
+
+    if player_ids:
+        # the players may have since logged in through another worker.
+        async with redis.pipeline() as pipe:
+            for player_id in player_ids:
+                pipe.eval(UNTRACK_SCRIPT, 1, ONLINE_KEY, player_id, worker_id)
+
+            await pipe.execute()
+
+
+async def heartbeat() -> None:
+    """Mark this worker as alive."""
+    await app.state.services.redis.hset(
+        WORKERS_KEY,
+        app.settings.WORKER_ID,
+        time.time(),
+    )
+
+
+async def remove_dead_workers() -> None:
+    """Remove the sessions of workers which have stopped sending heartbeats."""
+    redis = app.state.services.redis
+
+    heartbeats = await redis.hgetall(WORKERS_KEY)
+    timeout = time.time() - WORKER_TIMEOUT
+
+    for worker_id, last_heartbeat in heartbeats.items():
+        if float(last_heartbeat) < timeout:
+            await remove_sessions(worker_id)
+            await redis.hdel(WORKERS_KEY, worker_id)
+
+    # workers with no heartbeat have crashed, and had
+    # their sessions removed by us or another worker.
+    for worker_id in app.state.sessions.players.remote_workers:
+        if worker_id not in heartbeats or float(heartbeats[worker_id]) < timeout:
+            app.state.sessions.players.remove_remote_presences(worker_id)
+            log(f"Removed the sessions of crashed worker {worker_id}.", Ansi.LYELLOW)
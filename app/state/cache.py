@@ -12,3 +12,6 @@ beatmap: dict[Union[str, int], Beatmap] = {}  # {md5: map, id: map, ...}
 beatmapset: dict[int, BeatmapSet] = {}  # {bsid: map_set}
 unsubmitted: set[str] = set()  # {md5, ...}
 needs_update: set[str] = set()  # {md5, ...}
+
+# {player_id: {mode: (expiry, card)}} of the global leaderboard's player cards
+player_card: dict[int, dict[int, tuple[float, dict[str, object]]]] = {}
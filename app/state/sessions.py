@@ -1,26 +1,41 @@
 from __future__ import annotations
 
 import asyncio
-from typing import TYPE_CHECKING
+import ipaddress
+import time
+from datetime import date
+from typing import Any
+from typing import Optional
 
+import orjson
+
+import app.packets
+import app.settings
+import app.state
+import app.usecases.login
+from app.constants.gamemodes import GameMode
+from app.constants.mods import Mods
+from app.constants.privileges import Privileges
 from app.logging import Ansi
 from app.logging import log
+from app.objects.collections import Achievements
 from app.objects.collections import Channels
 from app.objects.collections import Clans
 from app.objects.collections import MapPools
 from app.objects.collections import Matches
 from app.objects.collections import Players
-
-if TYPE_CHECKING:
-    from app.objects.achievement import Achievement
-    from app.objects.player import Player
+from app.objects.player import Action
+from app.objects.player import ClientDetails
+from app.objects.player import OsuStream
+from app.objects.player import OsuVersion
+from app.objects.player import Player
 
 players = Players()
 channels = Channels()
 pools = MapPools()
 clans = Clans()
 matches = Matches()
-achievements: list[Achievement] = []
+achievements = Achievements()
 
 api_keys: dict[str, int] = {}
 
@@ -28,6 +43,19 @@ housekeeping_tasks: set[asyncio.Task] = set()
 
 bot: Player
 
+# sessions are snapshotted on shutdown, and lazily restored when
+# the client next polls with its token; clients which don't return
+# within the ttl will simply be asked to login again.
+SESSION_SNAPSHOT_TTL = 300  # seconds
+
+# tokens of the sessions snapshotted by our last run, loaded on startup
+# so polls with unknown tokens don't need to check redis for a snapshot.
+_snapshot_tokens: set[str] = set()
+_snapshots_expire_at = 0.0
+
+# {token: task} of sessions currently being restored
+_restoring: dict[str, asyncio.Task[Optional[Player]]] = {}
+
 
 # use cases
 
@@ -57,3 +85,239 @@ async def cancel_housekeeping_tasks() -> None:
                         "task": task,
                     },
                 )
+
+
+def _session_key(token: str) -> str:
+    return f"bancho:sessions:{token}"
+
+
+def _session_tokens_key() -> str:
+    return f"bancho:session_tokens:{app.settings.WORKER_ID}"
+
+
+def _serialize_session(player: Player) -> dict[str, Any]:
+    client_details = player.client_details
+    assert client_details is not None
+
+    return {
+        "id": player.id,
+        "login_time": player.login_time,
+        "utc_offset": player.utc_offset,
+        "pm_private": player.pm_private,
+        "away_msg": player.away_msg,
+        "geoloc": player.geoloc,
+        "tourney_client": player.tourney_client,
+        "client_details": {
+            "osu_version": {
+                "date": client_details.osu_version.date.isoformat(),
+                "revision": client_details.osu_version.revision,
+                "stream": client_details.osu_version.stream.value,
+            },
+            "osu_path_md5": client_details.osu_path_md5,
+            "adapters_md5": client_details.adapters_md5,
+            "uninstall_md5": client_details.uninstall_md5,
+            "disk_signature_md5": client_details.disk_signature_md5,
+            "adapters": client_details.adapters,
+            "running_under_wine": client_details.running_under_wine,
+            "ip": str(client_details.ip),
+        },
+        "status": {
+            "action": player.status.action.value,
+            "info_text": player.status.info_text,
+            "map_md5": player.status.map_md5,
+            "mods": player.status.mods.value,
+            "mode": player.status.mode.value,
+            "map_id": player.status.map_id,
+        },
+        # instanced channels (#spec, #multi) are rebuilt below
+        "channels": [c._name for c in player.channels if not c.instance],
+        "spectating": player.spectating.id if player.spectating else None,
+        "spectators": [p.id for p in player.spectators],
+        "match": player.match.id if player.match else None,
+    }
+
+
+async def save_sessions() -> None:
+    """Snapshot all online sessions to redis, to be restored on restart."""
+    sessions = [
+        player
+        for player in players
+        if not player.bot_client and player.client_details is not None
+    ]
+
+    if not sessions:
+        return
+
+    log(f"-> Saving {len(sessions)} sessions.", Ansi.LMAGENTA)
+
+    async with app.state.services.redis.pipeline() as pipe:
+        for player in sessions:
+            pipe.set(
+                _session_key(player.token),
+                orjson.dumps(_serialize_session(player)),
+                ex=SESSION_SNAPSHOT_TTL,
+            )
+
+        pipe.sadd(_session_tokens_key(), *[player.token for player in sessions])
+        pipe.expire(_session_tokens_key(), SESSION_SNAPSHOT_TTL)
+
+        await pipe.execute()
+
+
+async def load_session_tokens() -> None:
+    """Load the tokens of the sessions snapshotted by our last run."""
+    global _snapshots_expire_at
+
+    async with app.state.services.redis.pipeline() as pipe:
+        pipe.smembers(_session_tokens_key())
+        pipe.ttl(_session_tokens_key())
+        pipe.delete(_session_tokens_key())
+        tokens, ttl, _ = await pipe.execute()
+
+    if tokens:
+        _snapshot_tokens.update(tokens)
+        _snapshots_expire_at = time.time() + ttl
+
+
+async def _can_restore_session(player: Player) -> bool:
+    """Re-check a restored player against the checks made on login."""
+    assert player.client_details is not None
+
+    if not player.priv & Privileges.UNRESTRICTED:
+        # they've been restricted since the snapshot; their
+        # client should login again, to be told about it.
+        return False
+
+    if player.tourney_client and not player.priv & Privileges.SUPPORTER:
+        return False
+
+    if not await app.usecases.login.is_client_version_allowed(
+        player.client_details.osu_version,
+    ):
+        return False
+
+    async with app.state.services.database.connection() as db_conn:
+        if await app.usecases.login.has_restricted_hardware_matches(
+            player.id,
+            player.priv,
+            player.client_details,
+            db_conn,
+        ):
+            return False
+
+    return True
+
+
+async def _restore_session(token: str) -> Optional[Player]:
+    key = _session_key(token)
+
+    # fetch & consume atomically, so a session can only be restored once
+    async with app.state.services.redis.pipeline() as pipe:
+        pipe.get(key)
+        pipe.delete(key)
+        snapshot, _ = await pipe.execute()
+
+    if snapshot is None:
+        return None
+
+    session = orjson.loads(snapshot)
+
+    player = await players.get_sql(id=session["id"])
+    if player is None:
+        return None
+
+    if players.get(id=player.id) is not None:
+        # they've already logged in again with a new token
+        return None
+
+    details = session["client_details"]
+    player.client_details = ClientDetails(
+        osu_version=OsuVersion(
+            date=date.fromisoformat(details["osu_version"]["date"]),
+            revision=details["osu_version"]["revision"],
+            stream=OsuStream(details["osu_version"]["stream"]),
+        ),
+        osu_path_md5=details["osu_path_md5"],
+        adapters_md5=details["adapters_md5"],
+        uninstall_md5=details["uninstall_md5"],
+        disk_signature_md5=details["disk_signature_md5"],
+        adapters=details["adapters"],
+        running_under_wine=details["running_under_wine"],
+        ip=ipaddress.ip_address(details["ip"]),
+    )
+
+    player.token = token
+    player.login_time = session["login_time"]
+    player.last_recv_time = time.time()
+    player.utc_offset = session["utc_offset"]
+    player.pm_private = session["pm_private"]
+    player.away_msg = session["away_msg"]
+    player.geoloc = session["geoloc"]
+    player.tourney_client = session["tourney_client"]
+
+    if not await _can_restore_session(player):
+        log(f"{player} failed login checks; dropping their session.", Ansi.LYELLOW)
+        return None
+
+    status = session["status"]
+    player.status.action = Action(status["action"])
+    player.status.info_text = status["info_text"]
+    player.status.map_md5 = status["map_md5"]
+    player.status.mods = Mods(status["mods"])
+    player.status.mode = GameMode(status["mode"])
+    player.status.map_id = status["map_id"]
+
+    async with app.state.services.database.connection() as db_conn:
+        await player.achievements_from_sql(db_conn)
+        await player.stats_from_sql_full(db_conn)
+        await player.relationships_from_sql(db_conn)
+
+    # NOTE: the client kept its own state across the restart,
+    # so there's no need to resend the presences of everyone
+    # online; we only need to rebuild the server side state.
+    players.append(player)
+
+    for channel_name in session["channels"]:
+        channel = channels.get_by_name(channel_name)
+        if channel is not None:
+            player.join_channel(channel)
+
+    # spectating is restored by whichever side returns last
+    if session["spectating"] is not None:
+        host = players.get(id=session["spectating"])
+        if host is not None and player not in host.spectators:
+            host.add_spectator(player)
+
+    for spectator_id in session["spectators"]:
+        spectator = players.get(id=spectator_id)
+        if spectator is not None and spectator.spectating is None:
+            player.add_spectator(spectator)
+
+    if session["match"] is not None:
+        # matches aren't persisted; return the client to the lobby.
+        player.enqueue(app.packets.dispose_match(session["match"]))
+
+    log(f"{player} restored their session.", Ansi.LCYAN)
+    return player
+
+
+async def restore_session(token: str) -> Optional[Player]:
+    """Restore a session snapshotted before the last restart, if any."""
+    # the client may poll again before we're done; share the restore.
+    task = _restoring.get(token)
+    if task is None:
+        if token not in _snapshot_tokens:
+            return None
+
+        _snapshot_tokens.discard(token)
+
+        if time.time() >= _snapshots_expire_at:
+            # the snapshots have expired.
+            _snapshot_tokens.clear()
+            return None
+
+        task = asyncio.create_task(_restore_session(token))
+        _restoring[token] = task
+        task.add_done_callback(lambda _: _restoring.pop(token, None))
+
+    return await asyncio.shield(task)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+
+import app.settings
+from app.logging import Ansi
+from app.logging import log
+
+__all__ = ("ChildProcess", "Supervisor", "apply_memory_limit")
+
+# children which crash are restarted with exponential backoff,
+# which is reset once they've stayed up for a little while.
+RESTART_BACKOFF_MIN = 1  # seconds
+RESTART_BACKOFF_MAX = 60  # seconds
+STABLE_UPTIME = 60  # seconds
+POLL_INTERVAL = 1  # seconds
+SHUTDOWN_TIMEOUT = 10  # seconds
+
+# the memory limit is passed to children through the environment, and
+# applied by their entrypoints; preexec_fn isn't safe with threads.
+MEMORY_LIMIT_ENV = "SUPERVISOR_MEMORY_LIMIT"
+
+
+class ChildProcess:
+    """A python module run as a separate, supervised process."""
+
+    def __init__(self, name: str, module: str, memory_limit: int = 0) -> None:
+        self.name = name
+        self.module = module
+        self.memory_limit = memory_limit  # bytes; 0 for no limit
+
+        self.process: Optional[subprocess.Popen[bytes]] = None
+        self.started_at = 0.0
+        self.backoff = RESTART_BACKOFF_MIN
+        self.restart_at: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return f"<{self.name} ({self.module})>"
+
+    def start(self) -> None:
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", self.module],
+            env={**os.environ, MEMORY_LIMIT_ENV: str(self.memory_limit)},
+        )
+        self.started_at = time.time()
+        self.restart_at = None
+
+        log(f"Started {self} (pid {self.process.pid}).", Ansi.LCYAN)
+
+    def stop(self) -> None:
+        if self.process is None or self.process.poll() is not None:
+            return
+
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=SHUTDOWN_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+        log(f"Stopped {self}.", Ansi.LMAGENTA)
+
+
+class Supervisor:
+    """Run & restart child processes alongside the server."""
+
+    def __init__(self, children: list[ChildProcess]) -> None:
+        self.children = children
+
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._supervise,
+            name="supervisor",
+            daemon=True,
+        )
+
+    def start(self) -> None:
+        for child in self.children:
+            child.start()
+
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+        if self._thread.is_alive():
+            self._thread.join()
+
+        for child in self.children:
+            child.stop()
+
+    def _supervise(self) -> None:
+        while not self._stopping.wait(POLL_INTERVAL):
+            now = time.time()
+
+            for child in self.children:
+                if child.restart_at is not None:
+                    if now >= child.restart_at:
+                        child.start()
+                    continue
+
+                assert child.process is not None
+                exit_code = child.process.poll()
+                if exit_code is None:
+                    continue
+
+                if now - child.started_at >= STABLE_UPTIME:
+                    child.backoff = RESTART_BACKOFF_MIN
+                else:
+                    child.backoff = min(child.backoff * 2, RESTART_BACKOFF_MAX)
+
+                log(
+                    f"{child} exited with code {exit_code}; "
+                    f"restarting in {child.backoff}s.",
+                    Ansi.LRED,
+                )
+                child.restart_at = now + child.backoff
+
+
+def apply_memory_limit() -> None:
+    """Apply the address-space limit given by our supervisor, if any."""
+    memory_limit = int(os.environ.get(MEMORY_LIMIT_ENV, 0))
+
+    if memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+
+def create_supervisor() -> Supervisor:
+    """Create a supervisor for the configured child processes."""
+    memory_limit = app.settings.SUBPROCESS_MEMORY_LIMIT * 1024 * 1024
+
+    children = []
+    if app.settings.RUN_WEBSITE:
+        children.append(
+            ChildProcess("website", "app.processes.website", memory_limit),
+        )
+    if app.settings.RUN_DISCORD_BOT:
+        children.append(
+            ChildProcess("discord bot", "app.processes.bot", memory_limit),
+        )
+
+    return Supervisor(children)
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+from typing import Optional
+
+import aiohttp
+
+import app.settings
+import app.state
+from app.logging import Ansi
+from app.logging import log
+from app.objects.beatmap import RankedStatus
+from app.repositories import maps as maps_repo
+
+# osu!direct searches are served from a cache of pre-rendered response
+# pages; misses are fetched from the beatmap mirror (coalescing identical
+# concurrent requests), falling back to searching our own maps table when
+# the mirror is slow or down. the page after each one served is prefetched,
+# as players tend to scroll through results.
+
+SEARCH_CACHE_TTL = 300  # seconds
+LOCAL_SEARCH_CACHE_TTL = 30  # seconds; retry the mirror soon after it fails
+SEARCH_CACHE_MAX_SIZE = 1024
+MIRROR_TIMEOUT = 5  # seconds
+
+PAGE_SIZE = 100
+
+# bancho.py supports cheesegull mirrors, chimu.moe and nasuya.xyz.
+# chimu.moe and nasuya.xyz handle things a bit differently than cheesegull,
+# and has some extra features we'll eventually use more of.
+USING_CHIMU = "chimu.moe" in app.settings.MIRROR_URL
+USING_NASUYA = "nasuya.xyz" in app.settings.MIRROR_URL
+
+DIRECT_SET_ID_SPELLING = "SetId" if USING_CHIMU else "SetID"
+
+DIRECT_SET_INFO_FMTSTR = (
+    "{SetID}.osz|{Artist}|{Title}|{Creator}|"
+    "{RankedStatus}|10.0|{LastUpdate}|{SetID}|"
+    "0|{HasVideo}|0|0|0|{diffs}"  # 0s are threadid, has_story,
+    # filesize, filesize_novid.
+)
+
+DIRECT_MAP_INFO_FMTSTR = (
+    "[{DifficultyRating:.2f}⭐] {DiffName} "
+    "{{cs: {CS} / od: {OD} / ar: {AR} / hp: {HP}}}@{Mode}"
+)
+
+# queries the client sends for its sorting options, rather than text
+UNSUPPORTED_QUERIES = ("Newest", "Top+Rated", "Most+Played")
+
+SearchKey = tuple[str, int, int, int]  # (query, mode, ranked status, page)
+
+# {key: (expiry, response)}
+_search_cache: dict[SearchKey, tuple[float, bytes]] = {}
+# {key: task}; searches currently being fetched
+_pending_searches: dict[SearchKey, asyncio.Task[bytes]] = {}
+
+
+def handle_invalid_characters(s: str) -> str:
+    # XXX: this is a bug that exists on official servers (lmao)
+    # | is used to delimit the set data, so the difficulty name
+    # cannot contain this or it will be ignored. we fix it here
+    # by using a different character.
+    return s.replace("|", "I")
+
+
+def _render_page(sets: list[dict[str, Any]]) -> bytes:
+    """Render a page of sets (in the mirror's format) as a direct response."""
+    # send over 100 if we receive 100 matches,
+    # so the client knows there are more to get
+    ret = [f"{'101' if len(sets) == PAGE_SIZE else len(sets)}"]
+
+    for bmap in sets:
+        if not bmap["ChildrenBeatmaps"]:
+            continue
+
+        diffs_str = ",".join(
+            [
+                DIRECT_MAP_INFO_FMTSTR.format(
+                    DifficultyRating=row["DifficultyRating"],
+                    DiffName=handle_invalid_characters(row["DiffName"]),
+                    CS=row["CS"],
+                    OD=row["OD"],
+                    AR=row["AR"],
+                    HP=row["HP"],
+                    Mode=row["Mode"],
+                )
+                for row in sorted(
+                    bmap["ChildrenBeatmaps"],
+                    key=lambda m: m["DifficultyRating"],
+                )
+            ],
+        )
+
+        ret.append(
+            DIRECT_SET_INFO_FMTSTR.format(
+                SetID=bmap[DIRECT_SET_ID_SPELLING],
+                Artist=handle_invalid_characters(bmap["Artist"]),
+                Title=handle_invalid_characters(bmap["Title"]),
+                Creator=bmap["Creator"],
+                RankedStatus=bmap["RankedStatus"],
+                LastUpdate=bmap["LastUpdate"],
+                # cheesegull doesn't support vids
+                HasVideo="0",
+                diffs=diffs_str,
+            ),
+        )
+
+    return "\n".join(ret).encode()
+
+
+async def _search_mirror(
+    query: str,
+    mode: int,
+    ranked_status: int,
+    page_num: int,
+) -> Optional[list[dict[str, Any]]]:
+    params: dict[str, object] = {"amount": PAGE_SIZE, "offset": page_num * PAGE_SIZE}
+
+    # eventually we could try supporting these,
+    # but it mostly depends on the mirror.
+    if query not in UNSUPPORTED_QUERIES:
+        params["query"] = query
+
+    if mode != -1:  # -1 for all
+        params["mode"] = mode
+
+    if ranked_status != 4:  # 4 for all
+        # convert to osu!api status
+        params["status"] = RankedStatus.from_osudirect(ranked_status).osu_api
+
+    try:
+        async with app.state.services.http_client.get(
+            f"{app.settings.MIRROR_URL}/api/search",
+            params=params,
+            timeout=aiohttp.ClientTimeout(total=MIRROR_TIMEOUT),
+        ) as resp:
+            if resp.status != 200:
+                return None
+
+            return await resp.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return None
+
+
+async def _search_local(
+    query: str,
+    mode: int,
+    ranked_status: int,
+    page_num: int,
+) -> list[dict[str, Any]]:
+    """Search our own maps, returning sets in the mirror's format."""
+    rows = await maps_repo.search_sets(
+        query=query if query not in UNSUPPORTED_QUERIES else None,
+        mode=mode if mode != -1 else None,
+        status=(
+            RankedStatus.from_osudirect(ranked_status) if ranked_status != 4 else None
+        ),
+        page=page_num + 1,
+        page_size=PAGE_SIZE,
+    )
+
+    sets: dict[int, dict[str, Any]] = {}
+    for row in rows:
+        bmapset = sets.get(row["set_id"])
+        if bmapset is None:
+            bmapset = sets[row["set_id"]] = {
+                DIRECT_SET_ID_SPELLING: row["set_id"],
+                "Artist": row["artist"],
+                "Title": row["title"],
+                "Creator": row["creator"],
+                "RankedStatus": RankedStatus(row["status"]).osu_api,
+                "LastUpdate": row["last_update"],
+                "ChildrenBeatmaps": [],
+            }
+
+        bmapset["ChildrenBeatmaps"].append(
+            {
+                "DifficultyRating": row["diff"],
+                "DiffName": row["version"],
+                "CS": row["cs"],
+                "OD": row["od"],
+                "AR": row["ar"],
+                "HP": row["hp"],
+                "Mode": row["mode"],
+            },
+        )
+
+    return list(sets.values())
+
+
+async def _fetch_search(key: SearchKey) -> bytes:
+    sets = await _search_mirror(*key)
+
+    if sets is not None:
+        ttl = SEARCH_CACHE_TTL
+    else:
+        log("Beatmap mirror unavailable; searching locally.", Ansi.LYELLOW)
+        sets = await _search_local(*key)
+        ttl = LOCAL_SEARCH_CACHE_TTL
+
+    response = _render_page(sets)
+
+    if len(_search_cache) >= SEARCH_CACHE_MAX_SIZE:
+        # evict the oldest entry
+        del _search_cache[next(iter(_search_cache))]
+
+    _search_cache[key] = (time.time() + ttl, response)
+    return response
+
+
+def _get_cached(key: SearchKey) -> Optional[bytes]:
+    cached = _search_cache.get(key)
+    if cached is None:
+        return None
+
+    expiry, response = cached
+    if expiry < time.time():
+        del _search_cache[key]
+        return None
+
+    return response
+
+
+def _on_search_done(key: SearchKey, task: asyncio.Task[bytes]) -> None:
+    del _pending_searches[key]
+
+    # prefetches have nobody awaiting them to see errors
+    if not task.cancelled() and task.exception() is not None:
+        log(f"Failed to fetch direct search {key}: {task.exception()!r}", Ansi.LRED)
+
+
+def _fetch_search_once(key: SearchKey) -> asyncio.Task[bytes]:
+    """Fetch a search, sharing the request with any identical pending ones."""
+    task = _pending_searches.get(key)
+    if task is None:
+        task = _pending_searches[key] = asyncio.create_task(_fetch_search(key))
+        task.add_done_callback(lambda task: _on_search_done(key, task))
+
+    return task
+
+
+async def search(query: str, mode: int, ranked_status: int, page_num: int) -> bytes:
+    """Return an osu!direct search response page."""
+    key = (query, mode, ranked_status, page_num)
+
+    response = _get_cached(key)
+    if response is None:
+        response = await asyncio.shield(_fetch_search_once(key))
+
+    # prefetch the next page, if there is one.
+    next_key = (query, mode, ranked_status, page_num + 1)
+    if response.startswith(b"101") and _get_cached(next_key) is None:
+        _fetch_search_once(next_key)
+
+    return response
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import time
+from datetime import date
+
+import databases.core
+
+import app.settings
+import app.state
+from app.constants.privileges import Privileges
+from app.objects.player import ClientDetails
+from app.objects.player import OsuStream
+from app.objects.player import OsuVersion
+
+OSU_API_V2_CHANGELOG_URL = "https://osu.ppy.sh/api/v2/changelog"
+
+# the allowed client versions only change with osu! releases, so they're
+# cached briefly; this matters most when restarts restore many sessions.
+# versions missing from the cache are always re-checked, so new releases
+# are allowed as soon as they're out.
+ALLOWED_CLIENT_VERSIONS_TTL = 5 * 60  # seconds
+
+# {stream: (expiry, versions)}
+_allowed_client_versions: dict[OsuStream, tuple[float, set[date]]] = {}
+
+
+async def fetch_allowed_client_versions(stream: OsuStream) -> set[date]:
+    """Fetch (& cache) the client versions of `stream` since its last major build."""
+    osu_client_stream = stream.value
+    if osu_client_stream in ("stable", "beta"):
+        osu_client_stream += "40"  # TODO: why?
+
+    allowed_client_versions = set()
+
+    async with app.state.services.http_client.get(
+        OSU_API_V2_CHANGELOG_URL,
+        params={"stream": osu_client_stream},
+    ) as resp:
+        for build in (await resp.json())["builds"]:
+            version = date(
+                int(build["version"][0:4]),
+                int(build["version"][4:6]),
+                int(build["version"][6:8]),
+            )
+            allowed_client_versions.add(version)
+
+            if any(entry["major"] for entry in build["changelog_entries"]):
+                # this build is a major iteration to the client
+                # don't allow anything older than this
+                break
+
+    _allowed_client_versions[stream] = (
+        time.time() + ALLOWED_CLIENT_VERSIONS_TTL,
+        allowed_client_versions,
+    )
+    return allowed_client_versions
+
+
+async def is_client_version_allowed(osu_version: OsuVersion) -> bool:
+    """Check whether a client version may login (see DISALLOW_OLD_CLIENTS)."""
+    if not app.settings.DISALLOW_OLD_CLIENTS:
+        return True
+
+    cached = _allowed_client_versions.get(osu_version.stream)
+    if cached is not None and cached[0] > time.time() and osu_version.date in cached[1]:
+        return True
+
+    # the version may have been released since the versions were cached.
+    allowed_client_versions = await fetch_allowed_client_versions(osu_version.stream)
+    return osu_version.date in allowed_client_versions
+
+
+async def has_restricted_hardware_matches(
+    user_id: int,
+    priv: int,
+    client_details: ClientDetails,
+    db_conn: databases.core.Connection,
+) -> bool:
+    """Check whether an unverified player shares hardware with restricted players."""
+    if priv & Privileges.VERIFIED:
+        # TODO: this is a normal, registered & verified player.
+        return False
+
+    # TODO: store adapters individually
+
+    if client_details.running_under_wine:
+        hw_checks = "h.uninstall_id = :uninstall"
+        hw_args = {"uninstall": client_details.uninstall_md5}
+    else:
+        hw_checks = "h.adapters = :adapters OR h.uninstall_id = :uninstall OR h.disk_serial = :disk_serial"
+        hw_args = {
+            "adapters": client_details.adapters_md5,
+            "uninstall": client_details.uninstall_md5,
+            "disk_serial": client_details.disk_signature_md5,
+        }
+
+    hw_matches = await db_conn.fetch_all(
+        "SELECT u.name, u.priv, h.occurrences "
+        "FROM client_hashes h "
+        "INNER JOIN users u ON h.userid = u.id "
+        "WHERE h.userid != :user_id AND "
+        f"({hw_checks})",
+        {"user_id": user_id, **hw_args},
+    )
+
+    # this player is not verified yet, this is their first
+    # time connecting in-game and submitting their hwid set.
+    # we will not allow any banned matches; if there are any,
+    # then ask the user to contact staff and resolve manually.
+    return not all(
+        [hw_match["priv"] & Privileges.UNRESTRICTED for hw_match in hw_matches],
+    )
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import mmap
+import struct
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO
+from typing import Collection
+from typing import Optional
+
+import app.settings
+from app.logging import Ansi
+from app.logging import log
+from app.repositories import replays as replays_repo
+
+# replays are appended into large segment files, rather than stored as one
+# file per score; their locations are kept in the replays table. each worker
+# appends to its own segments, which are read through memory maps. segments
+# which have mostly been wiped are compacted by moving their remaining
+# replays into the active segment. replays saved before segments existed
+# are still read from their own files (see tools/migrate_replays.py).
+
+REPLAYS_PATH = Path.cwd() / ".data/osr"
+SEGMENTS_PATH = REPLAYS_PATH / "segments"
+
+SEGMENT_MAX_SIZE = 256 * 1024 * 1024  # bytes
+SEGMENT_SUFFIX = ".seg"
+MAX_OPEN_SEGMENTS = 64
+
+# compact sealed segments once this much of them has been wiped
+COMPACTION_MIN_GARBAGE_RATIO = 0.5
+
+# each replay is preceded by a header, so segments can be recovered without
+# the replays table: (score id, replay length)
+RECORD_HEADER_FMT = struct.Struct("<QI")
+
+# the segment currently being appended to by this worker
+_active_segment: Optional[str] = None
+_active_file: Optional[BinaryIO] = None
+
+# {segment: map} of recently read segments
+_open_segments: OrderedDict[str, mmap.mmap] = OrderedDict()
+
+
+def _segment_prefix() -> str:
+    return f"{app.settings.WORKER_ID}-"
+
+
+def _segment_path(segment: str) -> Path:
+    return SEGMENTS_PATH / f"{segment}{SEGMENT_SUFFIX}"
+
+
+def _worker_segments() -> list[str]:
+    """This worker's segments, from oldest to newest."""
+    prefix = _segment_prefix()
+    return sorted(
+        (
+            path.stem
+            for path in SEGMENTS_PATH.glob(f"{prefix}*{SEGMENT_SUFFIX}")
+            if path.stem[len(prefix) :].isdecimal()
+        ),
+        key=lambda segment: int(segment[len(prefix) :]),
+    )
+
+
+def _open_next_segment() -> None:
+    global _active_segment, _active_file
+
+    if _active_file is not None:
+        _active_file.close()
+
+    segments = _worker_segments()
+    if segments:
+        sequence = int(segments[-1][len(_segment_prefix()) :]) + 1
+    else:
+        sequence = 1
+
+    _active_segment = f"{_segment_prefix()}{sequence:06d}"
+    _active_file = _segment_path(_active_segment).open("ab")
+
+
+def _open_active_segment() -> None:
+    global _active_segment, _active_file
+
+    if _active_file is not None:
+        return
+
+    # continue appending to our newest segment, if there's space.
+    SEGMENTS_PATH.mkdir(parents=True, exist_ok=True)
+    segments = _worker_segments()
+
+    if segments and _segment_path(segments[-1]).stat().st_size < SEGMENT_MAX_SIZE:
+        _active_segment = segments[-1]
+        _active_file = _segment_path(_active_segment).open("ab")
+    else:
+        _open_next_segment()
+
+
+def _append(score_id: int, replay_data: bytes) -> tuple[str, int]:
+    """Append a replay to the active segment, returning its location."""
+    _open_active_segment()
+    assert _active_segment is not None and _active_file is not None
+
+    record_size = RECORD_HEADER_FMT.size + len(replay_data)
+    if _active_file.tell() and _active_file.tell() + record_size > SEGMENT_MAX_SIZE:
+        _open_next_segment()
+        assert _active_segment is not None and _active_file is not None
+
+    offset = _active_file.tell() + RECORD_HEADER_FMT.size
+    _active_file.write(RECORD_HEADER_FMT.pack(score_id, len(replay_data)))
+    _active_file.write(replay_data)
+    _active_file.flush()
+
+    return _active_segment, offset
+
+
+def _close_segment(segment: str) -> None:
+    segment_map = _open_segments.pop(segment, None)
+    if segment_map is not None:
+        segment_map.close()
+
+
+def _read(segment: str, offset: int, length: int) -> Optional[bytes]:
+    """Read a replay from a segment, or `None` if the segment is gone."""
+    segment_map = _open_segments.get(segment)
+
+    # segments may still be being appended to; map them again
+    # if the replay was written since they were last mapped.
+    if segment_map is not None and offset + length > len(segment_map):
+        _close_segment(segment)
+        segment_map = None
+
+    if segment_map is None:
+        try:
+            with _segment_path(segment).open("rb") as f:
+                segment_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+        _open_segments[segment] = segment_map
+
+        if len(_open_segments) > MAX_OPEN_SEGMENTS:
+            _, oldest_map = _open_segments.popitem(last=False)
+            oldest_map.close()
+    else:
+        _open_segments.move_to_end(segment)
+
+    return segment_map[offset : offset + length]
+
+
+async def save_replay(score_id: int, replay_data: bytes) -> None:
+    """Save a score's replay into the active segment."""
+    segment, offset = _append(score_id, replay_data)
+    await replays_repo.create(score_id, segment, offset, len(replay_data))
+
+
+async def fetch_replay(score_id: int) -> Optional[bytes]:
+    """Fetch a score's replay, or `None` if it has none."""
+    # a segment may be compacted between finding the replay and reading it;
+    # its new location will be committed by the time the old one is gone.
+    for _ in range(2):
+        rec = await replays_repo.fetch_one(score_id)
+        if rec is None:
+            break
+
+        replay_data = _read(rec["segment"], rec["segment_offset"], rec["length"])
+        if replay_data is not None:
+            return replay_data
+
+    replay_file = REPLAYS_PATH / f"{score_id}.osr"
+    if replay_file.exists():
+        return replay_file.read_bytes()
+
+    return None
+
+
+async def delete_replays_on_maps(map_md5s: Collection[str]) -> None:
+    """Delete the replays of all scores on the given maps.
+
+    Must be called before the scores themselves are deleted."""
+    await replays_repo.delete_by_map_md5s(map_md5s)
+
+
+async def compact_segments() -> None:
+    """Move the remaining replays out of this worker's mostly wiped segments."""
+    # replays are moved into the active segment, so it must be resolved first;
+    # after a restart, it's our newest segment until it has been filled.
+    _open_active_segment()
+
+    # the newest segment is never compacted, as it may be the active one.
+    sealed_segments = [
+        segment for segment in _worker_segments()[:-1] if segment != _active_segment
+    ]
+    if not sealed_segments:
+        return
+
+    live_bytes = await replays_repo.fetch_live_bytes(sealed_segments)
+
+    for segment in sealed_segments:
+        segment_path = _segment_path(segment)
+        segment_size = segment_path.stat().st_size
+
+        garbage_ratio = 1 - (live_bytes.get(segment, 0) / (segment_size or 1))
+        if garbage_ratio < COMPACTION_MIN_GARBAGE_RATIO:
+            continue
+
+        recs = await replays_repo.fetch_many_by_segment(segment)
+        appended_to = set()
+
+        for rec in recs:
+            replay_data = _read(segment, rec["segment_offset"], rec["length"])
+            assert replay_data is not None
+
+            new_segment, new_offset = _append(rec["score_id"], replay_data)
+            appended_to.add(new_segment)
+
+            await replays_repo.create(
+                rec["score_id"],
+                new_segment,
+                new_offset,
+                rec["length"],
+            )
+
+        # never remove a segment holding the replays we've just moved.
+        if segment in appended_to:
+            continue
+
+        _close_segment(segment)
+        segment_path.unlink()
+
+        log(
+            f"Compacted replay segment {segment} "
+            f"({len(recs)} replays, {garbage_ratio:.0%} wiped).",
+            Ansi.LMAGENTA,
+        )
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import date
+from datetime import datetime
+from typing import Optional
+
+from app.logging import Ansi
+from app.logging import log
+from app.repositories import scores as scores_repo
+
+# failed & superseded scores are only needed for players' histories, so once
+# they're old enough they're moved out of scores (which every leaderboard &
+# placement query filters) into scores_archive. the archive is partitioned
+# by month, with partitions created as scores are archived into them.
+
+ARCHIVE_BATCH_SIZE = 1000
+ARCHIVE_BATCH_DELAY = 1.0  # seconds; limits the load on mysql
+
+
+def _partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+
+def _next_month(month: date) -> date:
+    if month.month == 12:
+        return date(month.year + 1, 1, 1)
+    else:
+        return date(month.year, month.month + 1, 1)
+
+
+async def _ensure_partitions(months: set[date]) -> None:
+    """Ensure scores played in each of the months have their own partition."""
+    partitions = await scores_repo.fetch_archive_partitions()
+
+    # partitions can only be split off of the newest one (pmax); each holds
+    # the scores played before the end of its month, so any months before
+    # the newest partition's already fall into an existing partition.
+    existing = [name for name in partitions if name != "pmax"]
+
+    for month in sorted(months):
+        name = _partition_name(month)
+        if existing and name <= existing[-1]:
+            continue
+
+        await scores_repo.create_archive_partition(name, _next_month(month))
+        existing.append(name)
+
+        log(f"Created scores archive partition {name}.", Ansi.LMAGENTA)
+
+
+async def archive_scores(
+    played_before: datetime,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    batch_delay: float = ARCHIVE_BATCH_DELAY,
+    max_batches: Optional[int] = None,
+) -> int:
+    """Move non-best scores played before a given time into the
+    archive in batches, returning the number of scores archived."""
+    archived = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        recs = await scores_repo.fetch_archivable(played_before, batch_size)
+        if not recs:
+            break
+
+        await _ensure_partitions(
+            {date(rec["play_time"].year, rec["play_time"].month, 1) for rec in recs},
+        )
+        await scores_repo.archive_many([rec["id"] for rec in recs])
+
+        archived += len(recs)
+        batches += 1
+
+        if len(recs) < batch_size:
+            break
+
+        await asyncio.sleep(batch_delay)
+
+    return archived
@@ -31,6 +31,7 @@ import uvicorn
 
 import app.utils
 import app.settings
+import app.supervisor
 from app.logging import Ansi
 from app.logging import log
 
@@ -114,6 +115,15 @@ def main(argv: Sequence[str]) -> int:
             % app.settings.SERVER_ADDR,
         ) from None
 
+    # the website & discord bot run in their own processes,
+    # so they can't add latency to the server's event loop.
+    if not app.settings.MULTI_WORKER or app.settings.WORKER_ID == "0":
+        supervisor = app.supervisor.create_supervisor()
+    else:
+        supervisor = app.supervisor.Supervisor([])
+
+    supervisor.start()
+
     # run the server indefinitely
     uvicorn.run(
         "app.api.init_api:asgi_app",
@@ -128,6 +138,8 @@ def main(argv: Sequence[str]) -> int:
         **server_arguments,
     )
 
+    supervisor.stop()
+
     return 0
 
 
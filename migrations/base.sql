@@ -147,6 +147,8 @@ create table maps
 	constraint maps_md5_uindex
 		unique (md5)
 );
+create fulltext index maps_search_fulltext
+	on maps (artist, title, version, creator);
 
 create table mapsets
 (
@@ -196,6 +198,26 @@ create table ratings
 	primary key (userid, map_md5)
 );
 
+create table map_ratings
+(
+	map_md5 char(32) not null
+		primary key,
+	rating_sum int default 0 not null,
+	num_ratings int default 0 not null
+);
+
+create table replays
+(
+	score_id bigint unsigned not null
+		primary key,
+	segment varchar(32) not null,
+	segment_offset bigint unsigned not null,
+	length int unsigned not null
+);
+
+create index replays_segment_index
+	on replays (segment);
+
 create table scores
 (
 	id bigint unsigned auto_increment
@@ -223,6 +245,11 @@ create table scores
 	online_checksum char(32) not null
 );
 
+create table scores_archive like scores;
+alter table scores_archive modify id bigint unsigned not null, drop primary key, add primary key (id, play_time);
+alter table scores_archive add index scores_archive_userid_mode_index (userid, mode);
+alter table scores_archive partition by range (to_days(play_time)) (partition pmax values less than maxvalue);
+
 create table startups
 (
 	id int auto_increment
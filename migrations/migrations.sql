@@ -418,4 +418,31 @@ CREATE TABLE oauth_clients (
 	owner INT(10) NOT NULL,
 	redirect_uri TEXT NULL DEFAULT NULL,
 	PRIMARY KEY (`id`) USING BTREE
-)
+);
+
+# v4.7.4
+create fulltext index maps_search_fulltext on maps (artist, title, version, creator);
+
+# v4.7.5
+create table map_ratings (
+	map_md5 char(32) not null primary key,
+	rating_sum int default 0 not null,
+	num_ratings int default 0 not null
+);
+insert into map_ratings (map_md5, rating_sum, num_ratings)
+	select map_md5, sum(rating), count(*) from ratings group by map_md5;
+
+# v4.7.6
+create table replays (
+	score_id bigint unsigned not null primary key,
+	segment varchar(32) not null,
+	segment_offset bigint unsigned not null,
+	length int unsigned not null,
+	index replays_segment_index (segment)
+);
+
+# v4.7.7
+create table scores_archive like scores;
+alter table scores_archive modify id bigint unsigned not null, drop primary key, add primary key (id, play_time);
+alter table scores_archive add index scores_archive_userid_mode_index (userid, mode);
+alter table scores_archive partition by range (to_days(play_time)) (partition pmax values less than maxvalue);
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+
+import aioredis
+import orjson
+import pytest
+
+import app.settings
+import app.state
+from app.objects.collections import Players
+from app.state import bus
+
+
+@pytest.fixture
+def players(monkeypatch) -> Players:
+    players = Players()
+    monkeypatch.setattr(app.state.sessions, "players", players, raising=False)
+    return players
+
+
+@pytest.fixture
+def run_with_redis(
+    monkeypatch,
+    players,
+) -> Callable[[Callable[[], Awaitable[Any]]], Any]:
+    """Run a coroutine function against a local redis, under test keys."""
+    monkeypatch.setattr(bus, "BROADCAST_CHANNEL", "test:bancho:broadcast")
+    monkeypatch.setattr(bus, "ONLINE_KEY", "test:bancho:online")
+    monkeypatch.setattr(bus, "WORKERS_KEY", "test:bancho:workers")
+    monkeypatch.setattr(app.settings, "WORKER_ID", "1")
+
+    def run(func: Callable[[], Awaitable[Any]]) -> Any:
+        async def wrapper() -> Any:
+            redis = aioredis.from_url(app.settings.REDIS_DSN, decode_responses=True)
+
+            try:
+                await redis.ping()
+            except (aioredis.exceptions.ConnectionError, OSError):
+                pytest.skip("redis is not available")
+
+            monkeypatch.setattr(app.state.services, "redis", redis)
+            monkeypatch.setattr(
+                app.state,
+                "loop",
+                asyncio.get_running_loop(),
+                raising=False,
+            )
+
+            try:
+                await redis.delete(bus.ONLINE_KEY, bus.WORKERS_KEY)
+                return await func()
+            finally:
+                await redis.delete(bus.ONLINE_KEY, bus.WORKERS_KEY)
+                await redis.close()
+
+        return asyncio.run(wrapper())
+
+    return run
+
+
+def test_stale_logout_keeps_new_presence(players):
+    # the player was online through worker 0, and has
+    # since logged in through worker 2 (overruling it).
+    bus._handle_event("0", "presence", 3, bus._encode(b"old"))
+    bus._handle_event("2", "presence", 3, bus._encode(b"new"))
+    bus._handle_event("0", "presence", 3, None)
+
+    assert players.presence_snapshot == b"new"
+
+    bus._handle_event("2", "presence", 3, None)
+
+    assert players.presence_snapshot == b""
+
+
+def test_worker_reset_removes_presences(players, monkeypatch):
+    monkeypatch.setattr(bus, "publish", lambda *event: None)
+
+    bus._handle_event("0", "presence", 3, bus._encode(b"a"))
+    bus._handle_event("2", "presence", 4, bus._encode(b"b"))
+    bus._handle_event("0", "reset")
+
+    assert players.presence_snapshot == b"b"
+
+
+def test_presence_round_trip(run_with_redis, players):
+    async def run() -> None:
+        pubsub = app.state.services.redis.pubsub()
+        await pubsub.subscribe(bus.BROADCAST_CHANNEL)
+
+        try:
+            bus.update_presence(3, b"presence")
+            await bus._flush()
+
+            message = None
+            while message is None:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=1.0,
+                )
+        finally:
+            await pubsub.unsubscribe(bus.BROADCAST_CHANNEL)
+            await pubsub.close()
+
+        payload = orjson.loads(message["data"])
+        assert payload["worker"] == "1"
+
+        for event in payload["events"]:
+            bus._handle_event(payload["worker"], *event)
+
+        assert players.presence_snapshot == b"presence"
+
+    run_with_redis(run)
+
+
+def test_remove_sessions(run_with_redis):
+    async def run() -> None:
+        redis = app.state.services.redis
+        await redis.hset(bus.ONLINE_KEY, mapping={"3": "1", "4": "2", "5": "1"})
+
+        await bus.remove_sessions()
+
+        assert await redis.hgetall(bus.ONLINE_KEY) == {"4": "2"}
+
+    run_with_redis(run)
+
+
+def test_remove_dead_workers(run_with_redis, players):
+    async def run() -> None:
+        redis = app.state.services.redis
+
+        # worker 2 crashed a minute ago, and worker 3 before we started.
+        await bus.heartbeat()
+        await redis.hset(bus.WORKERS_KEY, "2", time.time() - 60)
+        await redis.hset(bus.ONLINE_KEY, mapping={"3": "1", "4": "2", "5": "3"})
+
+        players.set_remote_presence(4, b"b", "2")
+        players.set_remote_presence(5, b"c", "3")
+
+        await bus.remove_dead_workers()
+
+        assert await redis.hgetall(bus.ONLINE_KEY) == {"3": "1", "5": "3"}
+        assert await redis.hkeys(bus.WORKERS_KEY) == ["1"]
+        assert players.presence_snapshot == b""
+
+    run_with_redis(run)
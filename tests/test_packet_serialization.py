@@ -1,8 +1,18 @@
 from __future__ import annotations
 
+import struct
+from types import SimpleNamespace
+from typing import Any
+from typing import Callable
+
 import pytest
+from hypothesis import given
+from hypothesis import strategies as st
 
 import app.packets
+from app.packets import BanchoPacketReader
+from app.packets import ClientPackets
+from app.packets import ReplayAction
 
 
 @pytest.mark.parametrize(
@@ -667,3 +677,325 @@ def test_write_match_abort():
 )
 def test_write_switch_tournament_server(test_input, expected):
     assert app.packets.switch_tournament_server(test_input) == expected
+
+
+# reader tests
+
+
+def make_packet(packet_id: int, body: bytes) -> bytes:
+    return struct.pack("<HxI", packet_id, len(body)) + body
+
+
+def read_packets(
+    data: bytes,
+    read: Callable[[BanchoPacketReader], Any],
+    handled: tuple[ClientPackets, ...] = (ClientPackets.PING,),
+) -> list[tuple[ClientPackets, Any]]:
+    """Read each handled packet in `data` with `read`."""
+
+    class Packet(app.packets.BasePacket):
+        def __init__(self, reader: BanchoPacketReader) -> None:
+            self.value = read(reader)
+
+        async def handle(self, player: Any) -> None:
+            ...
+
+    reader = BanchoPacketReader(memoryview(data), {p: Packet for p in handled})
+    return [(reader.current_type, packet.value) for packet in reader]
+
+
+@given(
+    i8=st.integers(-(2**7), 2**7 - 1),
+    u8=st.integers(0, 2**8 - 1),
+    i16=st.integers(-(2**15), 2**15 - 1),
+    u16=st.integers(0, 2**16 - 1),
+    i32=st.integers(-(2**31), 2**31 - 1),
+    u32=st.integers(0, 2**32 - 1),
+    i64=st.integers(-(2**63), 2**63 - 1),
+    u64=st.integers(0, 2**64 - 1),
+    f32=st.floats(width=32, allow_nan=False),
+    f64=st.floats(allow_nan=False),
+)
+def test_read_numeric(i8, u8, i16, u16, i32, u32, i64, u64, f32, f64):
+    values = (i8, u8, i16, u16, i32, u32, i64, u64, f32, f64)
+    data = make_packet(
+        ClientPackets.PING,
+        struct.pack("<bBhHiIqQfd", *values),
+    )
+
+    def read(reader: BanchoPacketReader) -> tuple[Any, ...]:
+        return (
+            reader.read_i8(),
+            reader.read_u8(),
+            reader.read_i16(),
+            reader.read_u16(),
+            reader.read_i32(),
+            reader.read_u32(),
+            reader.read_i64(),
+            reader.read_u64(),
+            reader.read_f32(),
+            reader.read_f64(),
+        )
+
+    assert read_packets(data, read) == [(ClientPackets.PING, values)]
+
+
+@given(strings=st.lists(st.text(), max_size=8))
+def test_read_string(strings):
+    body = b"".join(app.packets.write_string(s) for s in strings)
+    data = make_packet(ClientPackets.PING, body)
+
+    def read(reader: BanchoPacketReader) -> list[str]:
+        return [reader.read_string() for _ in strings]
+
+    assert read_packets(data, read) == [(ClientPackets.PING, strings)]
+
+
+@given(
+    sender=st.text(),
+    msg=st.text(),
+    recipient=st.text(),
+    sender_id=st.integers(-(2**31), 2**31 - 1),
+)
+def test_read_message(sender, msg, recipient, sender_id):
+    body = app.packets.write_message(sender, msg, recipient, sender_id)
+    data = make_packet(ClientPackets.SEND_PUBLIC_MESSAGE, bytes(body))
+
+    assert read_packets(
+        data,
+        BanchoPacketReader.read_message,
+        handled=(ClientPackets.SEND_PUBLIC_MESSAGE,),
+    ) == [
+        (
+            ClientPackets.SEND_PUBLIC_MESSAGE,
+            app.packets.Message(sender, msg, recipient, sender_id),
+        ),
+    ]
+
+
+@given(values=st.lists(st.integers(0, 2**31 - 1), max_size=32))
+def test_read_i32_list(values):
+    body = app.packets.write_i32_list(values)
+    data = make_packet(ClientPackets.USER_STATS_REQUEST, bytes(body))
+
+    assert read_packets(
+        data,
+        BanchoPacketReader.read_i32_list_i16l,
+        handled=(ClientPackets.USER_STATS_REQUEST,),
+    ) == [(ClientPackets.USER_STATS_REQUEST, tuple(values))]
+
+
+@given(
+    st.builds(
+        app.packets.ScoreFrame,
+        time=st.integers(-(2**31), 2**31 - 1),
+        id=st.integers(0, 2**8 - 1),
+        num300=st.integers(0, 2**16 - 1),
+        num100=st.integers(0, 2**16 - 1),
+        num50=st.integers(0, 2**16 - 1),
+        num_geki=st.integers(0, 2**16 - 1),
+        num_katu=st.integers(0, 2**16 - 1),
+        num_miss=st.integers(0, 2**16 - 1),
+        total_score=st.integers(-(2**31), 2**31 - 1),
+        current_combo=st.integers(0, 2**16 - 1),
+        max_combo=st.integers(0, 2**16 - 1),
+        perfect=st.booleans(),
+        current_hp=st.integers(0, 2**8 - 1),
+        tag_byte=st.integers(0, 2**8 - 1),
+        score_v2=st.just(False),
+    ),
+)
+def test_read_scoreframe(score_frame):
+    body = app.packets.write_scoreframe(score_frame)
+    data = make_packet(ClientPackets.MATCH_SCORE_UPDATE, body)
+
+    assert read_packets(
+        data,
+        BanchoPacketReader.read_scoreframe,
+        handled=(ClientPackets.MATCH_SCORE_UPDATE,),
+    ) == [(ClientPackets.MATCH_SCORE_UPDATE, score_frame)]
+
+
+@given(
+    packets=st.lists(
+        st.tuples(st.integers(0, 2**16 - 1), st.binary(max_size=32)),
+        max_size=8,
+    ),
+)
+def test_reader_skips_unhandled_packets(packets):
+    handled = (ClientPackets.PING, ClientPackets.LOGOUT)
+    data = b"".join(make_packet(packet_id, body) for packet_id, body in packets)
+
+    def read(reader: BanchoPacketReader) -> bytes:
+        return reader.read_raw().tobytes()
+
+    assert read_packets(data, read, handled) == [
+        (ClientPackets(packet_id), body)
+        for packet_id, body in packets
+        if packet_id in handled
+    ]
+
+
+# slot statuses are read as i8s, so exclude SlotStatus.quit (128)
+slot_statuses = st.sampled_from([1, 2, 4, 8, 16, 32, 64])
+
+
+@st.composite
+def matches(draw: st.DrawFn) -> SimpleNamespace:
+    """Matches with the attributes read by `write_match`."""
+    return SimpleNamespace(
+        id=draw(st.integers(0, 2**15 - 1)),
+        in_progress=draw(st.booleans()),
+        mods=draw(st.integers(0, 2**31 - 1)),
+        name=draw(st.text()),
+        passwd=draw(st.text()),
+        map_name=draw(st.text()),
+        map_id=draw(st.integers(-(2**31), 2**31 - 1)),
+        map_md5=draw(st.text()),
+        slots=[
+            SimpleNamespace(
+                status=draw(slot_statuses),
+                team=draw(st.integers(0, 2)),
+                player=SimpleNamespace(id=draw(st.integers(0, 2**31 - 1))),
+                mods=draw(st.integers(0, 2**31 - 1)),
+            )
+            for _ in range(16)
+        ],
+        host=SimpleNamespace(id=draw(st.integers(0, 2**31 - 1))),
+        mode=draw(st.integers(0, 2**7 - 1)),
+        win_condition=draw(st.integers(0, 2**7 - 1)),
+        team_type=draw(st.integers(0, 2**7 - 1)),
+        freemods=draw(st.booleans()),
+        seed=draw(st.integers(0, 2**31 - 1)),
+    )
+
+
+@given(match=matches())
+def test_read_match(match):
+    body = app.packets.write_match(match)  # type: ignore[arg-type]
+    data = make_packet(ClientPackets.CREATE_MATCH, bytes(body))
+
+    assert read_packets(
+        data,
+        BanchoPacketReader.read_match,
+        handled=(ClientPackets.CREATE_MATCH,),
+    ) == [
+        (
+            ClientPackets.CREATE_MATCH,
+            app.packets.MultiplayerMatch(
+                id=match.id,
+                in_progress=match.in_progress,
+                powerplay=0,
+                mods=match.mods,
+                name=match.name,
+                passwd=match.passwd,
+                map_name=match.map_name,
+                map_id=match.map_id,
+                map_md5=match.map_md5,
+                slot_statuses=[slot.status for slot in match.slots],
+                slot_teams=[slot.team for slot in match.slots],
+                slot_ids=[
+                    slot.player.id for slot in match.slots if slot.status & 124 != 0
+                ],
+                host_id=match.host.id,
+                mode=match.mode,
+                win_condition=match.win_condition,
+                team_type=match.team_type,
+                freemods=match.freemods,
+                slot_mods=(
+                    [slot.mods for slot in match.slots] if match.freemods else []
+                ),
+                seed=match.seed,
+            ),
+        ),
+    ]
+
+
+f32s = st.floats(width=32, allow_nan=False)
+f64s = st.floats(allow_nan=False)
+
+replay_frames = st.builds(
+    app.packets.ReplayFrame,
+    button_state=st.integers(0, 2**8 - 1),
+    taiko_byte=st.integers(0, 2**8 - 1),
+    x=f32s,
+    y=f32s,
+    time=st.integers(-(2**31), 2**31 - 1),
+)
+
+score_frame_fields = {
+    "time": st.integers(-(2**31), 2**31 - 1),
+    "id": st.integers(0, 2**8 - 1),
+    "num300": st.integers(0, 2**16 - 1),
+    "num100": st.integers(0, 2**16 - 1),
+    "num50": st.integers(0, 2**16 - 1),
+    "num_geki": st.integers(0, 2**16 - 1),
+    "num_katu": st.integers(0, 2**16 - 1),
+    "num_miss": st.integers(0, 2**16 - 1),
+    "total_score": st.integers(-(2**31), 2**31 - 1),
+    "current_combo": st.integers(0, 2**16 - 1),
+    "max_combo": st.integers(0, 2**16 - 1),
+    "perfect": st.booleans(),
+    "current_hp": st.integers(0, 2**8 - 1),
+    "tag_byte": st.integers(0, 2**8 - 1),
+}
+
+score_frames = st.one_of(
+    st.builds(
+        app.packets.ScoreFrame,
+        **score_frame_fields,
+        score_v2=st.just(False),
+    ),
+    st.builds(
+        app.packets.ScoreFrame,
+        **score_frame_fields,
+        score_v2=st.just(True),
+        combo_portion=f64s,
+        bonus_portion=f64s,
+    ),
+)
+
+
+def write_replayframe_bundle(
+    frames: list[app.packets.ReplayFrame],
+    score_frame: app.packets.ScoreFrame,
+    action: ReplayAction,
+    extra: int,
+    sequence: int,
+) -> bytes:
+    """Write a replay frame bundle, as sent by a spectated client."""
+    body = struct.pack("<iH", extra, len(frames))
+    body += b"".join(app.packets.REPLAYFRAME_FMT.pack(*frame) for frame in frames)
+    body += struct.pack("<B", action)
+    body += app.packets.write_scoreframe(score_frame)
+
+    if score_frame.score_v2:
+        body += struct.pack("<dd", score_frame.combo_portion, score_frame.bonus_portion)
+
+    return body + struct.pack("<H", sequence)
+
+
+@given(
+    frames=st.lists(replay_frames, max_size=16),
+    score_frame=score_frames,
+    action=st.sampled_from(ReplayAction),
+    extra=st.integers(-(2**31), 2**31 - 1),
+    sequence=st.integers(0, 2**16 - 1),
+)
+def test_read_replayframe_bundle(frames, score_frame, action, extra, sequence):
+    body = write_replayframe_bundle(frames, score_frame, action, extra, sequence)
+    data = make_packet(ClientPackets.SPECTATE_FRAMES, body)
+
+    [(packet_type, bundle)] = read_packets(
+        data,
+        BanchoPacketReader.read_replayframe_bundle,
+        handled=(ClientPackets.SPECTATE_FRAMES,),
+    )
+
+    assert packet_type is ClientPackets.SPECTATE_FRAMES
+    assert bundle.replay_frames == frames
+    assert bundle.score_frame == score_frame
+    assert bundle.action is action
+    assert bundle.extra == extra
+    assert bundle.sequence == sequence
+    assert bundle.raw_data.tobytes() == body
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+from typing import Iterator
+from typing import Optional
+
+import pytest
+
+import app.usecases.replays
+from app.repositories import replays as replays_repo
+
+
+@pytest.fixture
+def index(monkeypatch, tmp_path) -> Iterator[dict[int, dict[str, Any]]]:
+    """Store replays under `tmp_path`, with an in-memory replays table."""
+    index: dict[int, dict[str, Any]] = {}
+
+    async def create(score_id: int, segment: str, segment_offset: int, length: int):
+        index[score_id] = {
+            "score_id": score_id,
+            "segment": segment,
+            "segment_offset": segment_offset,
+            "length": length,
+        }
+
+    async def fetch_one(score_id: int) -> Optional[dict[str, Any]]:
+        return index.get(score_id)
+
+    async def fetch_many_by_segment(segment: str) -> list[dict[str, Any]]:
+        return sorted(
+            (rec for rec in index.values() if rec["segment"] == segment),
+            key=lambda rec: rec["segment_offset"],
+        )
+
+    async def fetch_live_bytes(segments: list[str]) -> dict[str, int]:
+        live_bytes: dict[str, int] = {}
+        for rec in index.values():
+            if rec["segment"] in segments:
+                live_bytes[rec["segment"]] = (
+                    live_bytes.get(rec["segment"], 0) + rec["length"]
+                )
+        return live_bytes
+
+    monkeypatch.setattr(replays_repo, "create", create)
+    monkeypatch.setattr(replays_repo, "fetch_one", fetch_one)
+    monkeypatch.setattr(replays_repo, "fetch_many_by_segment", fetch_many_by_segment)
+    monkeypatch.setattr(replays_repo, "fetch_live_bytes", fetch_live_bytes)
+
+    monkeypatch.setattr(app.usecases.replays, "REPLAYS_PATH", tmp_path)
+    monkeypatch.setattr(app.usecases.replays, "SEGMENTS_PATH", tmp_path / "segments")
+    monkeypatch.setattr(app.usecases.replays, "SEGMENT_MAX_SIZE", 100)
+
+    restart()
+    yield index
+    restart()
+
+
+def restart() -> None:
+    """Forget the active segment & open maps, as if the server restarted."""
+    if app.usecases.replays._active_file is not None:
+        app.usecases.replays._active_file.close()
+
+    app.usecases.replays._active_segment = None
+    app.usecases.replays._active_file = None
+
+    while app.usecases.replays._open_segments:
+        app.usecases.replays._close_segment(
+            next(iter(app.usecases.replays._open_segments)),
+        )
+
+
+def replay(score_id: int) -> bytes:
+    return bytes([score_id]) * 30
+
+
+def test_save_and_fetch_replays(index):
+    async def run() -> None:
+        for score_id in range(1, 11):
+            await app.usecases.replays.save_replay(score_id, replay(score_id))
+
+        # records are rolled over into new segments as they fill
+        assert len({rec["segment"] for rec in index.values()}) > 1
+
+        for score_id in range(1, 11):
+            assert await app.usecases.replays.fetch_replay(score_id) == replay(score_id)
+
+        assert await app.usecases.replays.fetch_replay(11) is None
+
+    asyncio.run(run())
+
+
+def test_fetch_legacy_replay(index, tmp_path):
+    (tmp_path / "1.osr").write_bytes(b"legacy replay")
+    assert asyncio.run(app.usecases.replays.fetch_replay(1)) == b"legacy replay"
+
+
+def test_compact_segments(index):
+    async def run() -> None:
+        for score_id in range(1, 11):
+            await app.usecases.replays.save_replay(score_id, replay(score_id))
+
+        # wipe most of the oldest segments
+        for score_id in (1, 2, 3):
+            del index[score_id]
+
+        await app.usecases.replays.compact_segments()
+
+        for score_id in range(4, 11):
+            assert await app.usecases.replays.fetch_replay(score_id) == replay(score_id)
+
+    asyncio.run(run())
+
+
+def test_compact_segments_after_restart(index, monkeypatch):
+    # all of the replays fit in one segment
+    monkeypatch.setattr(app.usecases.replays, "SEGMENT_MAX_SIZE", 1000)
+
+    async def run() -> None:
+        for score_id in range(1, 5):
+            await app.usecases.replays.save_replay(score_id, replay(score_id))
+
+        for score_id in (1, 2, 3):
+            del index[score_id]
+
+        # the newest segment must not be compacted into itself & removed,
+        # even before anything's been appended to it since restarting.
+        restart()
+        await app.usecases.replays.compact_segments()
+
+        assert await app.usecases.replays.fetch_replay(4) == replay(4)
+
+        segment_path = app.usecases.replays._segment_path(index[4]["segment"])
+        assert segment_path.exists()
+
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3.9
+"""Move old failed & superseded scores into the scores archive."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+from datetime import timedelta
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    import app.settings
+    import app.state.services
+    import app.usecases.score_archive
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+
+async def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "-d",
+        "--days",
+        type=int,
+        default=app.settings.SCORE_ARCHIVE_AGE,
+        help="archive scores older than this many days",
+    )
+    parser.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=app.usecases.score_archive.ARCHIVE_BATCH_SIZE,
+    )
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=app.usecases.score_archive.ARCHIVE_BATCH_DELAY,
+        help="seconds to wait between batches",
+    )
+    parser.add_argument(
+        "-n",
+        "--max-batches",
+        type=int,
+        default=None,
+    )
+    args = parser.parse_args(argv)
+
+    if args.days <= 0:
+        print("Score archival is disabled (SCORE_ARCHIVE_AGE=0); pass --days.")
+        return 1
+
+    played_before = datetime.now() - timedelta(days=args.days)
+
+    await app.state.services.database.connect()
+
+    try:
+        archived = await app.usecases.score_archive.archive_scores(
+            played_before,
+            batch_size=args.batch_size,
+            batch_delay=args.delay,
+            max_batches=args.max_batches,
+        )
+    finally:
+        await app.state.services.database.disconnect()
+
+    print(f"Archived {archived:,} scores played before {played_before:%Y-%m-%d}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main(sys.argv[1:])))
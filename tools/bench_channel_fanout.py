@@ -0,0 +1,76 @@
+#!/usr/bin/env python3.9
+"""Benchmark chat channel fan-out & membership with many members."""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    from app.constants.privileges import Privileges
+    from app.objects.channel import Channel
+    from app.objects.collections import Channels
+    from app.objects.player import Player
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-m", "--members", type=int, default=10_000)
+    parser.add_argument("-n", "--messages", type=int, default=200)
+    parser.add_argument("-c", "--channels", type=int, default=1_000)
+    args = parser.parse_args(argv)
+
+    channels = Channels()
+    for idx in range(args.channels):
+        channels.append(Channel(name=f"#bench_{idx}", topic="bench"))
+
+    osu = Channel(name="#osu", topic="bench")
+    channels.append(osu)
+
+    players = [
+        Player(id=idx + 3, name=f"bench{idx}", priv=Privileges.UNRESTRICTED)
+        for idx in range(args.members)
+    ]
+
+    start = time.perf_counter()
+    for player in players:
+        if player not in osu:
+            osu.append(player)
+    elapsed = time.perf_counter() - start
+    print(f"join:    {args.members / elapsed:>12,.0f} members/sec")
+
+    sender = players[0]
+    start = time.perf_counter()
+    for idx in range(args.messages):
+        osu.send(f"message {idx}", sender=sender)
+
+        for player in players:
+            player.dequeue()
+    elapsed = time.perf_counter() - start
+    deliveries = args.messages * (args.members - 1)
+    print(f"fan-out: {deliveries / elapsed:>12,.0f} deliveries/sec")
+
+    start = time.perf_counter()
+    for _ in range(args.messages):
+        channels["#osu"]
+    elapsed = time.perf_counter() - start
+    print(f"lookup:  {args.messages / elapsed:>12,.0f} lookups/sec")
+
+    start = time.perf_counter()
+    for player in players:
+        osu.remove(player)
+    elapsed = time.perf_counter() - start
+    print(f"leave:   {args.members / elapsed:>12,.0f} members/sec")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
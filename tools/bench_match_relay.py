@@ -0,0 +1,131 @@
+#!/usr/bin/env python3.9
+"""Benchmark multiplayer score frame relaying (updates/sec on one core)."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    from app.constants.gamemodes import GameMode
+    from app.constants.mods import Mods
+    from app.constants.privileges import Privileges
+    from app.objects.channel import Channel
+    from app.objects.match import Match
+    from app.objects.match import MatchTeamTypes
+    from app.objects.match import MatchWinConditions
+    from app.objects.match import SlotStatus
+    from app.objects.player import Player
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+# a scorev1 score frame, as sent by the client
+PLAY_DATA = bytes(range(29))
+
+
+def create_match(num_players: int) -> tuple[Match, list[Player]]:
+    chat = Channel(name="#multi_1", topic="bench", auto_join=False, instance=True)
+    match = Match(
+        id=1,
+        name="bench",
+        password="",
+        map_name="",
+        map_id=0,
+        map_md5="",
+        host_id=3,
+        mode=GameMode.VANILLA_OSU,
+        mods=Mods.NOMOD,
+        win_condition=MatchWinConditions.score,
+        team_type=MatchTeamTypes.head_to_head,
+        freemods=False,
+        seed=0,
+        chat_channel=chat,
+    )
+
+    players = []
+    for idx in range(num_players):
+        player = Player(id=idx + 3, name=f"bench{idx}", priv=Privileges.UNRESTRICTED)
+        match.slots[idx].player = player
+        match.slots[idx].status = SlotStatus.playing
+        chat.append(player)
+        players.append(player)
+
+    return match, players
+
+
+def drain(players: list[Player]) -> None:
+    for player in players:
+        player.dequeue()
+
+
+async def bench_legacy(match: Match, players: list[Player], updates: int) -> float:
+    """The previous relay; a new packet & fanout for every frame."""
+    start = time.perf_counter()
+
+    for idx in range(updates):
+        player = players[idx % len(players)]
+
+        slot_id = next(i for i, s in enumerate(match.slots) if s.player is player)
+        buf = bytearray(b"0\x00\x00")
+        buf += len(PLAY_DATA).to_bytes(4, "little")
+        buf += PLAY_DATA
+        buf[11] = slot_id
+        match.enqueue(bytes(buf), lobby=False)
+
+        if idx % 256 == 0:
+            drain(players)
+
+    return time.perf_counter() - start
+
+
+async def bench_batched(
+    match: Match,
+    players: list[Player],
+    updates: int,
+    updates_per_tick: int,
+) -> float:
+    """The batched relay, flushing after `updates_per_tick` frames."""
+    start = time.perf_counter()
+
+    for idx in range(updates):
+        match.enqueue_score_update(players[idx % len(players)], PLAY_DATA)
+
+        if idx % updates_per_tick == 0:
+            match.flush_score_updates()
+            drain(players)
+
+    match.flush_score_updates()
+    return time.perf_counter() - start
+
+
+async def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--updates", type=int, default=500_000)
+    parser.add_argument("-p", "--players", type=int, default=16)
+    parser.add_argument("-t", "--updates-per-tick", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    match, players = create_match(args.players)
+
+    elapsed = await bench_legacy(match, players, args.updates)
+    print(f"legacy:  {args.updates / elapsed:>12,.0f} updates/sec")
+
+    elapsed = await bench_batched(
+        match,
+        players,
+        args.updates,
+        args.updates_per_tick,
+    )
+    print(f"batched: {args.updates / elapsed:>12,.0f} updates/sec")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main(sys.argv[1:])))
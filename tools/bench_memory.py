@@ -0,0 +1,141 @@
+#!/usr/bin/env python3.9
+"""Benchmark the memory used by each online player & cached beatmap."""
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import Callable
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    from app.constants.gamemodes import GameMode
+    from app.constants.privileges import Privileges
+    from app.objects.beatmap import Beatmap
+    from app.objects.beatmap import BeatmapSet
+    from app.objects.player import ModeData
+    from app.objects.player import Player
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+MAPS_PER_SET = 4
+
+
+def make_player(idx: int) -> Player:
+    player = Player(
+        id=idx + 3,
+        name=f"bench{idx}",
+        priv=Privileges.UNRESTRICTED,
+        token=f"bench-token-{idx}",
+        login_time=1.0,
+    )
+
+    # online players have their stats loaded for each mode
+    for mode in GameMode:
+        player.stats[mode] = ModeData(
+            tscore=idx,
+            rscore=idx,
+            pp=idx,
+            acc=99.0,
+            plays=idx,
+            playtime=idx,
+            max_combo=idx,
+            total_hits=idx,
+            rank=idx,
+            grades={},
+        )
+
+    return player
+
+
+def make_beatmap_set(set_id: int) -> BeatmapSet:
+    bmap_set = BeatmapSet(id=set_id, server="osu!", last_osuapi_check=datetime.now())
+
+    for idx in range(MAPS_PER_SET):
+        map_id = set_id * MAPS_PER_SET + idx
+        bmap_set.maps.append(
+            Beatmap(
+                map_set=bmap_set,
+                md5=f"{map_id:032x}",
+                id=map_id,
+                set_id=set_id,
+                artist=f"artist {set_id}",
+                title=f"title {set_id}",
+                version=f"version {idx}",
+                creator=f"creator {set_id}",
+                last_update=datetime.now(),
+                total_length=120,
+                max_combo=1000,
+                status=2,
+                plays=idx,
+                passes=idx,
+                mode=0,
+                bpm=180.0,
+                cs=4.0,
+                od=8.0,
+                ar=9.0,
+                hp=5.0,
+                diff=5.5,
+                filename=f"artist {set_id} - title {set_id} [version {idx}].osu",
+            ),
+        )
+
+    return bmap_set
+
+
+def measure(create: Callable[[int], object], count: int) -> tuple[object, float]:
+    """Return the objects created, and the bytes allocated per object."""
+    gc.collect()
+    before, _ = tracemalloc.get_traced_memory()
+    objects = create(count)
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+
+    return objects, (after - before) / count
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-p", "--players", type=int, default=10_000)
+    parser.add_argument("-b", "--beatmaps", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    tracemalloc.start()
+
+    # players are kept in the player list, indexed by id, token & name
+    def create_players(count: int) -> dict[int, Player]:
+        return {idx: make_player(idx) for idx in range(count)}
+
+    # beatmaps are cached by both md5 & id, alongside their sets
+    def create_beatmaps(
+        count: int,
+    ) -> tuple[dict[int, BeatmapSet], dict[object, Beatmap]]:
+        bmap_sets: dict[int, BeatmapSet] = {}
+        bmaps: dict[object, Beatmap] = {}
+
+        for set_id in range(count // MAPS_PER_SET):
+            bmap_set = bmap_sets[set_id] = make_beatmap_set(set_id)
+            for bmap in bmap_set.maps:
+                bmaps[bmap.md5] = bmap
+                bmaps[bmap.id] = bmap
+
+        return bmap_sets, bmaps
+
+    _, per_player = measure(create_players, args.players)
+    print(f"player:  {per_player:>10,.0f} bytes each ({args.players:,} online)")
+
+    _, per_beatmap = measure(create_beatmaps, args.beatmaps)
+    print(f"beatmap: {per_beatmap:>10,.0f} bytes each ({args.beatmaps:,} cached)")
+
+    tracemalloc.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3.9
+"""Benchmark reading bancho client requests (polls/sec on one core)."""
+from __future__ import annotations
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    import app.packets
+    from app.packets import BanchoPacketReader
+    from app.packets import BasePacket
+    from app.packets import ClientPackets
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+
+class ChangeAction(BasePacket):
+    def __init__(self, reader: BanchoPacketReader) -> None:
+        self.action = reader.read_u8()
+        self.info_text = reader.read_string()
+        self.map_md5 = reader.read_string()
+        self.mods = reader.read_u32()
+        self.mode = reader.read_u8()
+        self.map_id = reader.read_i32()
+
+    async def handle(self, player: object) -> None:
+        ...
+
+
+class SendMessage(BasePacket):
+    def __init__(self, reader: BanchoPacketReader) -> None:
+        self.msg = reader.read_message()
+
+    async def handle(self, player: object) -> None:
+        ...
+
+
+class SpectateFrames(BasePacket):
+    def __init__(self, reader: BanchoPacketReader) -> None:
+        self.frame_bundle = reader.read_replayframe_bundle()
+
+    async def handle(self, player: object) -> None:
+        ...
+
+
+class StatsRequest(BasePacket):
+    def __init__(self, reader: BanchoPacketReader) -> None:
+        self.user_ids = reader.read_i32_list_i16l()
+
+    async def handle(self, player: object) -> None:
+        ...
+
+
+class Ping(BasePacket):
+    async def handle(self, player: object) -> None:
+        ...
+
+
+PACKET_MAP = {
+    ClientPackets.CHANGE_ACTION: ChangeAction,
+    ClientPackets.SEND_PUBLIC_MESSAGE: SendMessage,
+    ClientPackets.SPECTATE_FRAMES: SpectateFrames,
+    ClientPackets.USER_STATS_REQUEST: StatsRequest,
+    ClientPackets.PING: Ping,
+}
+
+
+def packet(packet_id: int, body: bytes) -> bytes:
+    return struct.pack("<HxI", packet_id, len(body)) + body
+
+
+def create_poll(num_frames: int) -> bytes:
+    """A poll from a spectated player who's chatting while playing."""
+    change_action = (
+        b"\x02"
+        + app.packets.write_string("Camellia - Exit This Earth's Atomosphere [Evo]")
+        + app.packets.write_string("a" * 32)
+        + struct.pack("<IBi", 64, 0, 2_000_000)
+    )
+    message = app.packets.write_message("", "good luck!", "#osu", 0)
+    user_ids = app.packets.write_i32_list(range(3, 35))
+    frame_bundle = (
+        struct.pack("<iH", 0, num_frames)
+        + b"".join(
+            struct.pack("<BBffi", 1, 0, 256.0, 192.0, idx * 16)
+            for idx in range(num_frames)
+        )
+        + struct.pack("<B", 0)
+        + bytes(29)  # scorev1 score frame
+        + struct.pack("<H", 1)
+    )
+
+    return b"".join(
+        (
+            packet(ClientPackets.CHANGE_ACTION, change_action),
+            packet(ClientPackets.SEND_PUBLIC_MESSAGE, bytes(message)),
+            packet(ClientPackets.SPECTATE_FRAMES, frame_bundle),
+            packet(ClientPackets.USER_STATS_REQUEST, bytes(user_ids)),
+            packet(ClientPackets.RECEIVE_UPDATES, struct.pack("<i", 1)),  # unhandled
+            packet(ClientPackets.PING, b""),
+        ),
+    )
+
+
+def bench(body: bytes, polls: int) -> float:
+    start = time.perf_counter()
+
+    for _ in range(polls):
+        with memoryview(body) as body_view:
+            for _ in BanchoPacketReader(body_view, PACKET_MAP):
+                pass
+
+    return time.perf_counter() - start
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--polls", type=int, default=100_000)
+    parser.add_argument("-f", "--frames", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    body = create_poll(args.frames)
+    elapsed = bench(body, args.polls)
+
+    print(
+        f"{args.polls:,} polls ({len(body):,} bytes each) in {elapsed:.2f}s; "
+        f"{args.polls / elapsed:,.0f} polls/sec",
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3.9
+"""Benchmark channel member-count broadcasts during a reconnect storm."""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    import app.packets
+    import app.state
+    from app.constants.gamemodes import GameMode
+    from app.constants.privileges import Privileges
+    from app.objects.channel import Channel
+    from app.objects.player import ModeData
+    from app.objects.player import Player
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+AUTO_JOIN_CHANNELS = ("#osu", "#announce", "#lobby-chat")
+
+
+def reset_sessions() -> list[Channel]:
+    app.state.sessions.players.clear()
+    app.state.sessions.bot = Player(
+        id=1,
+        name="bot",
+        priv=Privileges.UNRESTRICTED,
+        bot_client=True,
+    )
+
+    for channel in list(app.state.sessions.channels):
+        app.state.sessions.channels.remove(channel)
+
+    channels = [Channel(name=name, topic="bench") for name in AUTO_JOIN_CHANNELS]
+    app.state.sessions.channels.extend(channels)
+    return channels
+
+
+def create_player(idx: int) -> Player:
+    player = Player(id=idx + 3, name=f"bench{idx}", priv=Privileges.UNRESTRICTED)
+    player.stats = {
+        mode: ModeData(0, 0, 0, 0.0, 0, 0, 0, 0, 0, {}) for mode in GameMode
+    }
+    return player
+
+
+def drain() -> int:
+    """Dequeue all pending data, returning the amount of bytes."""
+    total = 0
+    for player in app.state.sessions.players:
+        total += len(player.dequeue() or b"")
+    return total
+
+
+def bench_legacy(num_players: int, logins_per_flush: int) -> tuple[float, int]:
+    """The previous behaviour; broadcast to all players on every join."""
+    channels = reset_sessions()
+    sent = 0
+
+    start = time.perf_counter()
+    for idx in range(num_players):
+        player = create_player(idx)
+        app.state.sessions.players.append(player)
+
+        for channel in channels:
+            channel.append(player)
+            player.channels.append(channel)
+
+            data = app.packets.channel_info(
+                channel.name,
+                channel.topic,
+                len(channel.players),
+            )
+            for o in app.state.sessions.players:
+                if channel.can_read(o.priv):
+                    o.enqueue(data)
+
+        if idx % logins_per_flush == 0:
+            sent += drain()
+
+    sent += drain()
+    return time.perf_counter() - start, sent
+
+
+def bench_debounced(num_players: int, logins_per_flush: int) -> tuple[float, int]:
+    """Mark channels as outdated & flush them periodically."""
+    channels = reset_sessions()
+    sent = 0
+
+    start = time.perf_counter()
+    for idx in range(num_players):
+        player = create_player(idx)
+        app.state.sessions.players.append(player)
+
+        for channel in channels:
+            player.join_channel(channel)
+
+        if idx % logins_per_flush == 0:
+            app.state.sessions.channels.flush_info()
+            sent += drain()
+
+    app.state.sessions.channels.flush_info()
+    sent += drain()
+    return time.perf_counter() - start, sent
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-p", "--players", type=int, default=5_000)
+    parser.add_argument(
+        "-f",
+        "--logins-per-flush",
+        type=int,
+        default=100,
+        help="logins between each broadcast (i.e. logins per interval)",
+    )
+    args = parser.parse_args(argv)
+
+    for name, bench in (("legacy", bench_legacy), ("debounced", bench_debounced)):
+        elapsed, sent = bench(args.players, args.logins_per_flush)
+        print(
+            f"{name:<10} {elapsed:>8.2f}s "
+            f"{args.players / elapsed:>10,.0f} logins/sec "
+            f"{sent / 1024 / 1024:>10,.2f}MiB sent",
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,2 @@
+"""A synthetic osu! client load generator; see __main__.py for usage."""
+from __future__ import annotations
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3.9
+"""Simulate many osu! clients against a local server, reporting its performance.
+
+Run from the tools/ directory, against a server using the same .env:
+
+    python -m loadgen setup --clients 1000
+    python -m loadgen run --clients 1000 --duration 120
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    import aiohttp
+    import bcrypt
+
+    import app.repositories.maps as maps_repo
+    import app.repositories.players as players_repo
+    import app.repositories.stats as stats_repo
+    import app.settings
+    import app.state
+    from app.objects.beatmap import RankedStatus
+    from loadgen.client import Client
+    from loadgen.client import PASSWORD_MD5
+    from loadgen.client import account_name
+    from loadgen.scenario import Roles
+    from loadgen.scenario import Scenario
+    from loadgen.scenario import run_client
+    from loadgen.stats import Stats
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+MAP_POOL_SIZE = 500
+
+
+async def setup(num_clients: int) -> None:
+    """Create the accounts used by the load generator."""
+    # every account shares the same password, so we only need one hash.
+    pw_bcrypt = bcrypt.hashpw(PASSWORD_MD5.encode(), bcrypt.gensalt())
+
+    created = 0
+    for idx in range(num_clients):
+        name = account_name(idx)
+        if await players_repo.fetch_one(name=name) is not None:
+            continue
+
+        player = await players_repo.create(
+            name=name,
+            email=f"{name}@loadgen.invalid",
+            pw_bcrypt=pw_bcrypt,
+            country="xx",
+        )
+        await stats_repo.create_all_modes(player["id"])
+        created += 1
+
+    print(f"Created {created} accounts ({num_clients - created} already existed).")
+
+
+async def run(args: argparse.Namespace) -> None:
+    scenario = Scenario(
+        duration=args.duration,
+        ramp_up=args.ramp_up,
+        poll_interval=args.poll_interval,
+        chat_interval=args.chat_interval,
+        status_interval=args.status_interval,
+        play_interval=args.play_interval,
+        multiplayer_ratio=args.multiplayer_ratio,
+        spectate_ratio=args.spectate_ratio,
+        match_size=args.match_size,
+        match_length=args.match_length,
+    )
+
+    # ranked maps already in the database, for getscores & submission
+    maps = await maps_repo.fetch_many(
+        status=RankedStatus.Ranked,
+        page=1,
+        page_size=MAP_POOL_SIZE,
+    )
+    if not maps:
+        print("No ranked maps in the database; skipping getscores & submission.")
+
+    stats = Stats()
+
+    # by default, connect to the server as configured in the .env
+    if args.url is not None:
+        url = args.url
+        connector = aiohttp.TCPConnector(limit=0)
+    elif app.settings.SERVER_PORT is not None:
+        url = f"http://{app.settings.SERVER_ADDR}:{app.settings.SERVER_PORT}"
+        connector = aiohttp.TCPConnector(limit=0)
+    else:
+        url = "http://localhost"
+        connector = aiohttp.UnixConnector(path=app.settings.SERVER_ADDR, limit=0)
+
+    async with aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=args.timeout),
+    ) as http:
+        clients = [
+            Client(idx, http, stats, url, args.domain) for idx in range(args.clients)
+        ]
+        roles = Roles(clients, scenario)
+
+        start_time = time.time()
+        await asyncio.gather(
+            *[run_client(client, roles, scenario, maps) for client in clients],
+        )
+        elapsed = time.time() - start_time
+
+    print(stats.report(elapsed))
+
+
+async def amain(args: argparse.Namespace) -> None:
+    await app.state.services.database.connect()
+
+    try:
+        if args.command == "setup":
+            await setup(args.clients)
+        else:
+            await run(args)
+    finally:
+        await app.state.services.database.disconnect()
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    setup_parser = subparsers.add_parser("setup", help="create the accounts")
+    setup_parser.add_argument("-c", "--clients", type=int, default=1_000)
+
+    run_parser = subparsers.add_parser("run", help="run the load test")
+    run_parser.add_argument("-c", "--clients", type=int, default=1_000)
+    run_parser.add_argument("-d", "--duration", type=float, default=60.0)
+    run_parser.add_argument("--ramp-up", type=float, default=10.0)
+    run_parser.add_argument("--url", help="defaults to the .env's SERVER_ADDR")
+    run_parser.add_argument("--domain", default=app.settings.DOMAIN)
+    run_parser.add_argument("--timeout", type=float, default=30.0)
+    run_parser.add_argument("--poll-interval", type=float, default=1.0)
+    run_parser.add_argument("--chat-interval", type=float, default=30.0)
+    run_parser.add_argument("--status-interval", type=float, default=20.0)
+    run_parser.add_argument("--play-interval", type=float, default=120.0)
+    run_parser.add_argument("--multiplayer-ratio", type=float, default=0.2)
+    run_parser.add_argument("--spectate-ratio", type=float, default=0.1)
+    run_parser.add_argument("--match-size", type=int, default=8)
+    run_parser.add_argument("--match-length", type=float, default=30.0)
+
+    args = parser.parse_args(argv)
+    asyncio.run(amain(args))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,469 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import random
+import struct
+import time
+from base64 import b64encode
+from datetime import datetime
+from typing import Any
+from typing import Iterator
+from typing import Optional
+
+import aiohttp
+from loadgen.stats import Stats
+from multidict import CIMultiDictProxy
+from py3rijndael import Pkcs7Padding
+from py3rijndael import RijndaelCbc
+
+import app.packets
+from app.packets import ClientPackets
+from app.packets import osuTypes
+from app.packets import ReplayAction
+from app.packets import ScoreFrame
+from app.packets import ServerPackets
+
+OSU_VERSION = "b20230101"
+OSU_VERSION_DATE = OSU_VERSION[1:9]
+
+# all generated accounts share the same password
+PASSWORD = "loadgen-password"
+PASSWORD_MD5 = hashlib.md5(PASSWORD.encode()).hexdigest()
+
+PACKET_HEADER = struct.Struct("<HxI")
+REPLAY_FRAME = struct.Struct("<BBffi")
+
+FRAMES_PER_BUNDLE = 10
+REPLAY_SIZE = 16 * 1024  # bytes
+
+# slot statuses, as sent by the client when creating a match
+SLOT_OPEN = 1
+NUM_SLOTS = 16
+
+
+def account_name(idx: int) -> str:
+    return f"loadgen{idx}"
+
+
+def iter_packets(data: bytes) -> Iterator[tuple[int, memoryview]]:
+    """Yield the id & payload of each packet in a bancho response."""
+    view = memoryview(data)
+    while len(view) >= PACKET_HEADER.size:
+        packet_id, length = PACKET_HEADER.unpack_from(view)
+        end = PACKET_HEADER.size + length
+        yield packet_id, view[PACKET_HEADER.size : end]
+        view = view[end:]
+
+
+class Client:
+    """A synthetic osu! client, speaking the bancho protocol over http."""
+
+    def __init__(
+        self,
+        idx: int,
+        http: aiohttp.ClientSession,
+        stats: Stats,
+        url: str,
+        domain: str,
+    ) -> None:
+        self.idx = idx
+        self.name = account_name(idx)
+        self.http = http
+        self.stats = stats
+        self.url = url
+        self.domain = domain
+
+        self.id: Optional[int] = None
+        self.token: Optional[str] = None
+        self.logged_in = asyncio.Event()
+
+        self.match_id: Optional[int] = None
+        self.match_joined = asyncio.Event()
+        self.match_playing = False
+        self.match_started_at = 0.0
+
+        # packets to be sent with our next poll
+        self._outgoing = bytearray()
+        self._spectate_sequence = 0
+
+        # hardware identifiers; unique per account, so the
+        # server's multi-accounting checks don't link them.
+        self.uninstall_id = f"{self.name}-uninstall"
+        self.disk_signature = f"{self.name}-disk"
+
+        seed = hashlib.md5(self.name.encode()).hexdigest()
+        adapters = "-".join(seed[i : i + 2] for i in range(0, 12, 2)) + "."
+
+        self.client_hash = ":".join(
+            (
+                hashlib.md5(f"{self.name}-path".encode()).hexdigest(),
+                adapters,
+                hashlib.md5(adapters.encode()).hexdigest(),
+                hashlib.md5(self.uninstall_id.encode()).hexdigest(),
+                hashlib.md5(self.disk_signature.encode()).hexdigest(),
+                "",  # trailing ':'
+            ),
+        )
+
+    def __repr__(self) -> str:
+        return f"<{self.name} ({self.id})>"
+
+    async def _request(
+        self,
+        operation: str,
+        method: str,
+        path: str,
+        subdomain: str,
+        **kwargs: Any,
+    ) -> Optional[tuple[CIMultiDictProxy[str], bytes]]:
+        """Perform a timed http request, returning the headers & body."""
+        headers = {
+            "Host": f"{subdomain}.{self.domain}",
+            "User-Agent": "osu!",
+            # the server resolves client ips from these
+            "X-Real-IP": "127.0.0.1",
+            "X-Forwarded-For": "127.0.0.1",
+            **kwargs.pop("headers", {}),
+        }
+
+        if isinstance(kwargs.get("data"), (bytes, bytearray)):
+            self.stats.bytes_out += len(kwargs["data"])
+
+        start_time = time.perf_counter_ns()
+        try:
+            async with self.http.request(
+                method,
+                f"{self.url}{path}",
+                headers=headers,
+                **kwargs,
+            ) as resp:
+                body = await resp.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.stats.record_error(operation)
+            return None
+
+        self.stats.record(operation, time.perf_counter_ns() - start_time)
+        self.stats.bytes_in += len(body)
+
+        if resp.status != 200:
+            self.stats.record_error(operation)
+            return None
+
+        return resp.headers, body
+
+    def _handle_packets(self, data: bytes) -> None:
+        for packet_id, payload in iter_packets(data):
+            if packet_id == ServerPackets.USER_ID:
+                (self.id,) = struct.unpack("<i", payload)
+            elif packet_id == ServerPackets.MATCH_JOIN_SUCCESS:
+                (self.match_id,) = struct.unpack_from("<H", payload)
+                self.match_joined.set()
+            elif packet_id == ServerPackets.MATCH_START:
+                self.match_playing = True
+                self.match_started_at = time.time()
+            elif packet_id == ServerPackets.RESTART:
+                # our session is gone; we'll need to login again.
+                self.token = None
+                self.logged_in.clear()
+
+    """ bancho """
+
+    async def login(self) -> bool:
+        credentials = f"{self.name}\n{PASSWORD_MD5}\n"
+        body = f"{credentials}{OSU_VERSION}|0|0|{self.client_hash}|0\n".encode()
+
+        response = await self._request("login", "POST", "/", "c", data=body)
+        if response is None:
+            return False
+
+        headers, data = response
+        self._handle_packets(data)
+
+        if self.id is None or self.id < 0:
+            self.stats.record_error("login")
+            return False
+
+        self.token = headers["cho-token"]
+        self.logged_in.set()
+        return True
+
+    async def poll(self) -> bool:
+        """Send our queued packets, and handle the server's response."""
+        assert self.token is not None
+
+        body = bytes(self._outgoing)
+        self._outgoing.clear()
+
+        response = await self._request(
+            "poll",
+            "POST",
+            "/",
+            "c",
+            data=body,
+            headers={"osu-token": self.token},
+        )
+        if response is None:
+            return False
+
+        self._handle_packets(response[1])
+        return True
+
+    async def logout(self) -> None:
+        self._outgoing += app.packets.write(ClientPackets.LOGOUT, (0, osuTypes.i32))
+        await self.poll()
+
+        self.token = None
+        self.logged_in.clear()
+
+    def change_action(
+        self,
+        action: int,
+        info_text: str,
+        map_md5: str,
+        mods: int,
+        mode: int,
+        map_id: int,
+    ) -> None:
+        self._outgoing += app.packets.write(
+            ClientPackets.CHANGE_ACTION,
+            (action, osuTypes.u8),
+            (info_text, osuTypes.string),
+            (map_md5, osuTypes.string),
+            (mods, osuTypes.u32),
+            (mode, osuTypes.u8),
+            (map_id, osuTypes.i32),
+        )
+
+    def send_message(self, recipient: str, text: str) -> None:
+        assert self.id is not None
+
+        if recipient.startswith("#"):
+            packet_id = ClientPackets.SEND_PUBLIC_MESSAGE
+        else:
+            packet_id = ClientPackets.SEND_PRIVATE_MESSAGE
+
+        self._outgoing += app.packets.write(
+            packet_id,
+            ((self.name, text, recipient, self.id), osuTypes.message),
+        )
+
+    def join_channel(self, name: str) -> None:
+        self._outgoing += app.packets.write(
+            ClientPackets.CHANNEL_JOIN,
+            (name, osuTypes.string),
+        )
+
+    def start_spectating(self, target_id: int) -> None:
+        self._outgoing += app.packets.write(
+            ClientPackets.START_SPECTATING,
+            (target_id, osuTypes.i32),
+        )
+
+    def spectate_frames(self) -> None:
+        """Send a bundle of replay frames to our spectators."""
+        bundle = bytearray(struct.pack("<iH", 0, FRAMES_PER_BUNDLE))
+        for _ in range(FRAMES_PER_BUNDLE):
+            bundle += REPLAY_FRAME.pack(
+                0,
+                0,
+                random.uniform(0, 512),
+                random.uniform(0, 384),
+                int(time.time() * 1000) & 0x7FFFFFFF,
+            )
+
+        bundle.append(ReplayAction.Standard)
+        bundle += app.packets.write_scoreframe(self._random_scoreframe())
+        bundle += struct.pack("<H", self._spectate_sequence & 0xFFFF)
+        self._spectate_sequence += 1
+
+        self._outgoing += app.packets.write(
+            ClientPackets.SPECTATE_FRAMES,
+            (bundle, osuTypes.raw),
+        )
+
+    """ multiplayer """
+
+    def create_match(self, map_name: str, map_id: int, map_md5: str) -> None:
+        assert self.id is not None
+
+        # the match format, as read by `BanchoPacketReader.read_match`
+        match = bytearray(struct.pack("<HbbI", 0, 0, 0, 0))
+        match += app.packets.write_string(f"{self.name}'s game")
+        match += app.packets.write_string("")  # password
+        match += app.packets.write_string(map_name)
+        match += struct.pack("<i", map_id)
+        match += app.packets.write_string(map_md5)
+        match.extend([SLOT_OPEN] * NUM_SLOTS)
+        match.extend([0] * NUM_SLOTS)  # teams
+        match += struct.pack("<i", self.id)  # host
+        match.extend((0, 0, 0, 0))  # mode, win condition, team type, freemods
+        match += struct.pack("<i", 0)  # seed
+
+        self._outgoing += app.packets.write(
+            ClientPackets.CREATE_MATCH,
+            (match, osuTypes.raw),
+        )
+
+    def join_match(self, match_id: int) -> None:
+        self._outgoing += app.packets.write(
+            ClientPackets.JOIN_MATCH,
+            (match_id, osuTypes.i32),
+            ("", osuTypes.string),
+        )
+
+    def start_match(self) -> None:
+        self._outgoing += app.packets.write(ClientPackets.MATCH_START)
+
+    def match_score_update(self) -> None:
+        self._outgoing += app.packets.write(
+            ClientPackets.MATCH_SCORE_UPDATE,
+            (self._random_scoreframe(), osuTypes.scoreframe),
+        )
+
+    def complete_match(self) -> None:
+        self._outgoing += app.packets.write(ClientPackets.MATCH_COMPLETE)
+        self.match_playing = False
+
+    def _random_scoreframe(self) -> ScoreFrame:
+        return ScoreFrame(
+            time=int(time.time() * 1000) & 0x7FFFFFFF,
+            id=0,
+            num300=random.randint(0, 1000),
+            num100=random.randint(0, 100),
+            num50=random.randint(0, 10),
+            num_geki=random.randint(0, 100),
+            num_katu=random.randint(0, 10),
+            num_miss=random.randint(0, 10),
+            total_score=random.randint(0, 10_000_000),
+            current_combo=random.randint(0, 1000),
+            max_combo=random.randint(0, 1000),
+            perfect=False,
+            current_hp=200,
+            tag_byte=0,
+            score_v2=False,
+        )
+
+    """ web """
+
+    async def get_scores(self, bmap: dict[str, Any]) -> bool:
+        response = await self._request(
+            "getscores",
+            "GET",
+            "/web/osu-osz2-getscores.php",
+            "osu",
+            params={
+                "us": self.name,
+                "ha": PASSWORD_MD5,
+                "s": "0",
+                "vv": "4",
+                "v": "1",
+                "c": bmap["md5"],
+                "f": bmap["filename"],
+                "m": str(bmap["mode"]),
+                "i": str(bmap["set_id"]),
+                "mods": "0",
+                "h": "",
+                "a": "0",
+            },
+        )
+        return response is not None
+
+    async def submit_score(self, bmap: dict[str, Any]) -> bool:
+        n300 = random.randint(100, 1000)
+        n100 = random.randint(0, 100)
+        n50 = random.randint(0, 10)
+        ngeki = random.randint(0, 100)
+        nkatu = random.randint(0, 10)
+        nmiss = random.randint(0, 10)
+        score = random.randint(100_000, 10_000_000)
+        max_combo = random.randint(100, max(bmap["max_combo"], 100))
+        grade = random.choice(("S", "A", "B", "C"))
+        client_time = datetime.now()
+
+        # the same checksum the client computes; see
+        # `Score.compute_online_checksum` on the server.
+        checksum = hashlib.md5(
+            "chickenmcnuggets{0}o15{1}{2}smustard{3}{4}uu{5}{6}{7}{8}{9}{10}{11}Q{12}{13}{15}{14:%y%m%d%H%M%S}{16}{17}".format(
+                n100 + n300,
+                n50,
+                ngeki,
+                nkatu,
+                nmiss,
+                bmap["md5"],
+                max_combo,
+                False,
+                self.name,
+                score,
+                grade,
+                0,
+                True,
+                bmap["mode"],
+                client_time,
+                OSU_VERSION_DATE,
+                self.client_hash,
+                "",
+            ).encode(),
+        ).hexdigest()
+
+        score_data = ":".join(
+            str(value)
+            for value in (
+                bmap["md5"],
+                self.name,
+                checksum,
+                n300,
+                n100,
+                n50,
+                ngeki,
+                nkatu,
+                nmiss,
+                score,
+                max_combo,
+                False,  # perfect
+                grade,
+                0,  # mods
+                True,  # passed
+                bmap["mode"],
+                f"{client_time:%y%m%d%H%M%S}",
+                OSU_VERSION_DATE,
+            )
+        )
+
+        iv = os.urandom(32)
+        aes = RijndaelCbc(
+            key=f"osu!-scoreburgr---------{OSU_VERSION_DATE}".encode(),
+            iv=iv,
+            padding=Pkcs7Padding(32),
+            block_size=32,
+        )
+
+        form = aiohttp.FormData()
+        form.add_field("x", "0")
+        form.add_field("ft", "0")
+        form.add_field("fs", b64encode(os.urandom(16)).decode())
+        form.add_field("bmk", bmap["md5"])
+        form.add_field("iv", b64encode(iv).decode())
+        form.add_field("c1", f"{self.uninstall_id}|{self.disk_signature}")
+        form.add_field("st", str(random.randint(60_000, 300_000)))
+        form.add_field("pass", PASSWORD_MD5)
+        form.add_field("osuver", OSU_VERSION_DATE)
+        form.add_field("s", b64encode(aes.encrypt(self.client_hash.encode())).decode())
+        form.add_field("score", b64encode(aes.encrypt(score_data.encode())).decode())
+        form.add_field(
+            "score",
+            os.urandom(REPLAY_SIZE),
+            filename="score",
+            content_type="application/octet-stream",
+        )
+
+        response = await self._request(
+            "submit",
+            "POST",
+            "/web/osu-submit-modular-selector.php",
+            "osu",
+            data=form,
+            headers={"token": self.token or ""},
+        )
+        return response is not None
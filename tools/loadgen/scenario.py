@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Any
+from typing import Optional
+
+from loadgen.client import Client
+
+from app.constants.gamemodes import GameMode
+from app.objects.player import Action
+
+CHAT_MESSAGES = (
+    "hello",
+    "anyone up for multi?",
+    "that map is insane",
+    "gn everyone",
+    "how do i get better at aim",
+)
+
+IDLE_ACTIONS = (Action.Idle, Action.Afk, Action.Lobby, Action.Editing)
+
+
+@dataclass
+class Scenario:
+    """How often each client performs each kind of operation."""
+
+    duration: float  # seconds each client remains online
+    ramp_up: float  # seconds over which clients log in
+    poll_interval: float
+
+    # mean seconds between operations, per client
+    chat_interval: float
+    status_interval: float
+    play_interval: float  # getscores & score submission
+
+    # the fraction of clients in each role
+    multiplayer_ratio: float
+    spectate_ratio: float
+
+    match_size: int
+    match_length: float  # seconds
+
+
+class Roles:
+    """The multiplayer & spectator relationships between clients."""
+
+    def __init__(self, clients: list[Client], scenario: Scenario) -> None:
+        num_clients = len(clients)
+
+        num_multiplayer = int(num_clients * scenario.multiplayer_ratio)
+        num_multiplayer -= num_multiplayer % scenario.match_size
+        num_spectators = min(
+            int(num_clients * scenario.spectate_ratio) // 2,
+            (num_clients - num_multiplayer) // 2,
+        )
+
+        # {client idx: match host}
+        self.match_hosts: dict[int, Client] = {
+            idx: clients[idx - idx % scenario.match_size]
+            for idx in range(num_multiplayer)
+        }
+
+        # streamers are spectated by the spectators following them
+        streamers = range(num_multiplayer, num_multiplayer + num_spectators)
+        self.streamers = set(streamers)
+        # {client idx: spectated client}
+        self.spectating: dict[int, Client] = {
+            idx + num_spectators: clients[idx] for idx in streamers
+        }
+
+
+def _chance(interval: float, scenario: Scenario) -> bool:
+    """Whether an operation occurring every `interval` (on average) happens this poll."""
+    return interval > 0 and random.random() < scenario.poll_interval / interval
+
+
+async def _wait_for(event: asyncio.Event, deadline: float) -> bool:
+    try:
+        await asyncio.wait_for(event.wait(), timeout=deadline - time.time())
+    except asyncio.TimeoutError:
+        return False
+    else:
+        return True
+
+
+async def run_client(
+    client: Client,
+    roles: Roles,
+    scenario: Scenario,
+    maps: list[dict[str, Any]],
+) -> None:
+    """Run a single client's session for the scenario's duration."""
+    await asyncio.sleep(random.uniform(0, scenario.ramp_up))
+
+    if not await client.login():
+        return
+
+    deadline = time.time() + scenario.duration
+
+    # set up this client's role; these are
+    # sent to the server with the next poll.
+    host: Optional[Client] = roles.match_hosts.get(client.idx)
+    if host is client:
+        bmap = random.choice(maps) if maps else None
+        client.create_match(
+            map_name=bmap["filename"] if bmap else "loadgen",
+            map_id=bmap["id"] if bmap else 0,
+            map_md5=bmap["md5"] if bmap else "0" * 32,
+        )
+    elif host is not None:
+        if await _wait_for(host.match_joined, deadline):
+            assert host.match_id is not None
+            client.join_match(host.match_id)
+
+    streamer = roles.spectating.get(client.idx)
+    if streamer is not None:
+        if await _wait_for(streamer.logged_in, deadline):
+            assert streamer.id is not None
+            client.start_spectating(streamer.id)
+
+    while time.time() < deadline:
+        poll_start = time.time()
+
+        if client.token is None:
+            # the server restarted; login again.
+            if not await client.login():
+                return
+
+        await client.poll()
+
+        if _chance(scenario.chat_interval, scenario):
+            client.send_message("#osu", random.choice(CHAT_MESSAGES))
+
+        if _chance(scenario.status_interval, scenario):
+            if maps:
+                bmap = random.choice(maps)
+                client.change_action(
+                    Action.Playing,
+                    bmap["filename"],
+                    bmap["md5"],
+                    0,
+                    bmap["mode"],
+                    bmap["id"],
+                )
+            else:
+                client.change_action(
+                    random.choice(IDLE_ACTIONS),
+                    "",
+                    "",
+                    0,
+                    random.choice(list(GameMode)[:4]),
+                    0,
+                )
+
+        if client.idx in roles.streamers:
+            client.spectate_frames()
+
+        if client.match_playing:
+            if time.time() - client.match_started_at > scenario.match_length:
+                client.complete_match()
+            else:
+                client.match_score_update()
+        elif host is client and client.match_joined.is_set():
+            client.start_match()
+
+        if maps and _chance(scenario.play_interval, scenario):
+            bmap = random.choice(maps)
+            if await client.get_scores(bmap):
+                await client.submit_score(bmap)
+
+        elapsed = time.time() - poll_start
+        await asyncio.sleep(max(0.0, scenario.poll_interval - elapsed))
+
+    if client.token is not None:
+        await client.logout()
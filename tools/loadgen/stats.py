@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from collections import Counter
+
+from app.metrics import Histogram
+
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class Stats:
+    """Latency & throughput of the operations performed by all clients."""
+
+    def __init__(self) -> None:
+        # {operation: latency histogram}
+        self.histograms: dict[str, Histogram] = {}
+        # {operation: error count}
+        self.errors: Counter[str] = Counter()
+
+        self.bytes_in = 0  # bytes received from the server
+        self.bytes_out = 0  # bytes sent to the server
+
+    def record(self, operation: str, elapsed_ns: int) -> None:
+        histogram = self.histograms.get(operation)
+        if histogram is None:
+            histogram = self.histograms[operation] = Histogram()
+
+        histogram.record(elapsed_ns)
+
+    def record_error(self, operation: str) -> None:
+        self.errors[operation] += 1
+
+    def report(self, duration: float) -> str:
+        """Format a summary of the stats over `duration` seconds."""
+        columns = " ".join(f"{f'p{p:g}':>9}" for p in PERCENTILES)
+        lines = [f"{'operation':<16} {'count':>9} {'errors':>7} {'req/s':>9} {columns}"]
+
+        for operation in sorted(self.histograms.keys() | self.errors.keys()):
+            histogram = self.histograms.get(operation, Histogram())
+            percentiles = " ".join(
+                f"{histogram.percentile(p) * 1000:>7.2f}ms" for p in PERCENTILES
+            )
+            lines.append(
+                f"{operation:<16} {histogram.count:>9,} "
+                f"{self.errors[operation]:>7,} "
+                f"{histogram.count / duration:>9,.1f} {percentiles}",
+            )
+
+        lines.append(
+            f"{self.bytes_out / 1024 / 1024:,.2f}MiB sent, "
+            f"{self.bytes_in / 1024 / 1024:,.2f}MiB received in {duration:,.2f}s",
+        )
+        return "\n".join(lines)
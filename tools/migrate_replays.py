@@ -0,0 +1,107 @@
+#!/usr/bin/env python3.9
+"""Move replays stored as one file per score into replay segments.
+
+The server should be stopped while this runs."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import Any
+from typing import Iterator
+
+sys.path.insert(0, os.path.abspath(os.pardir))
+os.chdir(os.path.abspath(os.pardir))
+
+try:
+    import app.state.services
+    import app.usecases.replays
+    from app.repositories import replays as replays_repo
+except ModuleNotFoundError:
+    print("\x1b[;91mMust run from tools/ directory\x1b[m")
+    raise
+
+BATCH_SIZE = 1000
+
+
+def iter_replay_files() -> Iterator[tuple[int, Path]]:
+    for path in app.usecases.replays.REPLAYS_PATH.glob("*.osr"):
+        if path.stem.isdecimal():
+            yield int(path.stem), path
+
+
+def divide_chunks(values: list, n: int) -> Iterator[list]:
+    for i in range(0, len(values), n):
+        yield values[i : i + n]
+
+
+async def migrate_batch(replay_files: list[tuple[int, Path]], delete: bool) -> int:
+    """Move a batch of replays into segments, returning the number moved."""
+    score_ids = [score_id for score_id, _ in replay_files]
+
+    # skip any replays moved by a previous run
+    migrated = {
+        rec["score_id"]
+        for rec in await app.state.services.database.fetch_all(
+            "SELECT score_id FROM replays WHERE score_id IN :score_ids",
+            {"score_ids": score_ids},
+        )
+    }
+
+    recs: list[dict[str, Any]] = []
+
+    for score_id, path in replay_files:
+        if score_id in migrated:
+            continue
+
+        replay_data = path.read_bytes()
+        segment, offset = app.usecases.replays._append(score_id, replay_data)
+        recs.append(
+            {
+                "score_id": score_id,
+                "segment": segment,
+                "segment_offset": offset,
+                "length": len(replay_data),
+            },
+        )
+
+    await replays_repo.create_many(recs)
+
+    # only remove the files once their replays are in the index
+    if delete:
+        for _, path in replay_files:
+            path.unlink()
+
+    return len(recs)
+
+
+async def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--delete",
+        action="store_true",
+        help="delete each replay file once it's been moved",
+    )
+    args = parser.parse_args(argv)
+
+    replay_files = sorted(iter_replay_files())
+    print(f"Found {len(replay_files):,} replay files.")
+
+    await app.state.services.database.connect()
+
+    moved = 0
+    try:
+        for batch in divide_chunks(replay_files, BATCH_SIZE):
+            moved += await migrate_batch(batch, args.delete)
+            print(f"Moved {moved:,} replays.", end="\r")
+    finally:
+        await app.state.services.database.disconnect()
+
+    print(f"Moved {moved:,} replays into segments.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main(sys.argv[1:])))